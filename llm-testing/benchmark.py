@@ -0,0 +1,184 @@
+"""
+Throughput and token cost of extract_profile_data at different batch sizes.
+
+Batch size 1 calls extract_profile_data once per profile; larger sizes pack
+that many profiles into each extract_profile_data_batch request. Batches
+are sent concurrently (at most --workers at once).
+
+With --concurrency, compares instead the thread-pool approach of
+test_logic.run_in_parallel against logic.aextract_many (asyncio under a
+semaphore, on the shared AsyncOpenAI client) at each concurrency level,
+reporting throughput and peak Python memory.
+
+To run:
+> python benchmark.py --batch-sizes 1 5 10 --num-profiles 40
+> python benchmark.py --concurrency 8 32 100 --num-profiles 1000
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import glob
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+import logic
+
+
+class UsageCountingClient:
+    """Wraps an OpenAI client and tallies calls and token usage."""
+
+    def __init__(self, client):
+        self._client = client
+        self.usage = Counter()
+        self._lock = threading.Lock()
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        response = self._client.chat.completions.create(**kwargs)
+        with self._lock:
+            self.usage["calls"] += 1
+            if response.usage is not None:
+                self.usage["prompt_tokens"] += response.usage.prompt_tokens
+                self.usage["completion_tokens"] += response.usage.completion_tokens
+        return response
+
+
+def run_batch_size(texts: list[str], batch_size: int, workers: int, strict: bool = False) -> dict:
+    counting = UsageCountingClient(logic.client)
+    live_client, logic.client = logic.client, counting
+    try:
+        start = time.perf_counter()
+        if batch_size == 1:
+            single = logic.extract_profile_data_strict if strict else logic.extract_profile_data
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(single, texts))
+            batches = len(texts)
+        else:
+            chunks = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+            with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+                results = [r for chunk in executor.map(lambda c: logic.extract_profile_data_batch(c, strict), chunks)
+                           for r in chunk]
+            batches = len(chunks)
+        elapsed = time.perf_counter() - start
+    finally:
+        logic.client = live_client
+    assert len(results) == len(texts)
+    usage = counting.usage
+    return {
+        "batch_size": batch_size,
+        "seconds": elapsed,
+        "profiles_per_s": len(texts) / elapsed,
+        "calls": usage["calls"],
+        "fallbacks": usage["calls"] - batches,
+        "prompt_tokens_per_profile": usage["prompt_tokens"] / len(texts),
+        "completion_tokens_per_profile": usage["completion_tokens"] / len(texts),
+    }
+
+
+def run_threads(texts: list[str], workers: int, strict: bool = False) -> dict:
+    """One extract_profile_data call per text on a pool of `workers` threads."""
+    single = logic.extract_profile_data_strict if strict else logic.extract_profile_data
+
+    def call(text):
+        try:
+            return single(text)
+        except Exception as e:
+            return e
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(call, texts))
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "mode": "threads",
+        "concurrency": workers,
+        "seconds": elapsed,
+        "peak_mb": peak / 2**20,
+        "errors": sum(isinstance(r, Exception) for r in results),
+        "results": results,
+    }
+
+
+async def run_async(texts: list[str], concurrency_levels: list[int], strict: bool = False) -> list[dict]:
+    """aextract_many at each concurrency level.
+
+    All levels share one event loop, since the shared client's connection
+    pool belongs to the loop it was first used on.
+    """
+    extract = logic.aextract_profile_data_strict if strict else logic.aextract_profile_data
+    reports = []
+    for concurrency in concurrency_levels:
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            results = await logic.aextract_many(texts, extract=extract, concurrency=concurrency)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        reports.append({
+            "mode": "asyncio",
+            "concurrency": concurrency,
+            "seconds": elapsed,
+            "peak_mb": peak / 2**20,
+            "errors": sum(isinstance(r, BaseException) for r in results),
+            "results": results,
+        })
+    return reports
+
+
+def compare_concurrency(texts: list[str], concurrency_levels: list[int], strict: bool = False) -> list[dict]:
+    if max(concurrency_levels) > logic.MAX_CONNECTIONS:
+        print(f"note: asyncio concurrency above logic.MAX_CONNECTIONS={logic.MAX_CONNECTIONS} "
+              "queues on the connection pool")
+    reports = [run_threads(texts, n, strict) for n in concurrency_levels]
+    reports += asyncio.run(run_async(texts, concurrency_levels, strict))
+    for r in reports:
+        r["profiles_per_s"] = len(texts) / r["seconds"]
+    return sorted(reports, key=lambda r: (r["concurrency"], r["mode"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=sorted(glob.glob("data/*.txt")),
+                        help="Profile text files (default: data/*.txt).")
+    parser.add_argument("--num-profiles", type=int, default=20,
+                        help="Total profiles to extract (the files are repeated as needed).")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent requests.")
+    parser.add_argument("--strict", action="store_true", help="Use the strict prompt.")
+    parser.add_argument("--concurrency", type=int, nargs="+",
+                        help="Compare threads vs asyncio at these concurrency levels (ignores --batch-sizes).")
+    args = parser.parse_args()
+
+    if not args.profiles:
+        parser.error("No profile files found; pass --profiles or add data/*.txt")
+    files = [open(path).read() for path in args.profiles]
+    texts = [files[i % len(files)] for i in range(args.num_profiles)]
+
+    if args.concurrency:
+        print(f"{'mode':>8} {'concurrency':>11} {'errors':>6} {'seconds':>8} {'profiles/s':>10} {'peak MB':>8}")
+        for r in compare_concurrency(texts, args.concurrency, args.strict):
+            print(f"{r['mode']:>8} {r['concurrency']:>11} {r['errors']:>6} {r['seconds']:>8.2f} "
+                  f"{r['profiles_per_s']:>10.2f} {r['peak_mb']:>8.2f}")
+        return
+
+    print(f"{'batch':>5} {'calls':>6} {'fallbacks':>9} {'seconds':>8} {'profiles/s':>10} "
+          f"{'prompt tok/profile':>18} {'completion tok/profile':>22}")
+    for batch_size in args.batch_sizes:
+        r = run_batch_size(texts, batch_size, args.workers, args.strict)
+        print(f"{r['batch_size']:>5} {r['calls']:>6} {r['fallbacks']:>9} {r['seconds']:>8.2f} "
+              f"{r['profiles_per_s']:>10.2f} {r['prompt_tokens_per_profile']:>18.0f} "
+              f"{r['completion_tokens_per_profile']:>22.0f}")
+
+
+if __name__ == "__main__":
+    main()
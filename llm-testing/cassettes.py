@@ -0,0 +1,136 @@
+"""
+Record/replay ("cassette") layer for `client.chat.completions.create`.
+
+Wraps an OpenAI client so chat completions are saved to, and served from,
+JSON files in `cassettes/`. Each cassette is keyed by a hash of the
+normalized request (model, messages, response_format, sampling params), so
+changing a prompt changes the key.
+
+Modes:
+    live     call the API, don't touch cassettes (the default)
+    record   call the API and (over)write every cassette
+    replay   serve only from cassettes; a missing cassette is an error, so
+             nothing ever reaches the network
+    refresh  replay cassettes that exist and record the ones that don't
+             (i.e. requests whose prompt changed); add --llm-prune on a full
+             run to delete cassettes no test used any more
+
+Identical requests made several times in one session (e.g. the stability
+test) get one cassette per occurrence, so replayed runs keep the recorded
+variation between calls.
+
+    pytest test_logic.py --llm-mode record    # once, with OPENAI_API_KEY set
+    pytest test_logic.py --llm-mode replay    # offline, in milliseconds
+"""
+import glob
+import hashlib
+import json
+import os
+import textwrap
+import threading
+from collections import Counter
+
+from openai.types.chat import ChatCompletion
+
+MODES = ("live", "record", "replay", "refresh")
+DEFAULT_CASSETTE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cassettes")
+
+# request arguments that don't change what the model returns
+_IGNORED_ARGS = {"timeout", "extra_headers", "extra_query", "extra_body", "user"}
+
+
+class CassetteNotFound(LookupError):
+    pass
+
+
+def _normalize_content(content):
+    if isinstance(content, str):
+        # whitespace-only edits (indentation, trailing spaces) shouldn't invalidate a cassette
+        return "\n".join(line.rstrip() for line in textwrap.dedent(content).strip().splitlines())
+    return content
+
+
+def normalize_request(kwargs: dict) -> dict:
+    """The parts of a `create(**kwargs)` call that determine its response."""
+    request = {k: v for k, v in kwargs.items() if k not in _IGNORED_ARGS}
+    request["messages"] = [
+        {**message, "content": _normalize_content(message.get("content"))}
+        for message in request.get("messages", [])
+    ]
+    return request
+
+
+def request_key(request: dict) -> str:
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class _Completions:
+    def __init__(self, recorder):
+        self._recorder = recorder
+
+    def create(self, **kwargs):
+        return self._recorder.create(**kwargs)
+
+
+class _Chat:
+    def __init__(self, recorder):
+        self.completions = _Completions(recorder)
+
+
+class CassetteClient:
+    """Drop-in stand-in for an OpenAI client that only needs `chat.completions.create`."""
+
+    def __init__(self, client, mode: str = "live", cassette_dir: str = DEFAULT_CASSETTE_DIR):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        self.client = client
+        self.mode = mode
+        self.cassette_dir = cassette_dir
+        self.chat = _Chat(self)
+        self.used = set()
+        self.stats = Counter()
+        self._occurrences = Counter()
+        self._lock = threading.Lock()
+        os.makedirs(cassette_dir, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.cassette_dir, f"{name}.json")
+
+    def create(self, **kwargs):
+        if self.mode == "live":
+            self.stats["live"] += 1
+            return self.client.chat.completions.create(**kwargs)
+
+        request = normalize_request(kwargs)
+        key = request_key(request)
+        with self._lock:
+            name = f"{key}-{self._occurrences[key]}"
+            self._occurrences[key] += 1
+            self.used.add(name)
+        path = self._path(name)
+
+        if self.mode in ("replay", "refresh") and os.path.exists(path):
+            with open(path) as f:
+                cassette = json.load(f)
+            self.stats["replayed"] += 1
+            return ChatCompletion.model_validate(cassette["response"])
+        if self.mode == "replay":
+            raise CassetteNotFound(
+                f"No cassette {name} for this request; re-record with --llm-mode record or refresh"
+            )
+
+        response = self.client.chat.completions.create(**kwargs)
+        with open(path, "w") as f:
+            json.dump({"request": request, "response": response.model_dump(mode="json")}, f, indent=2)
+        self.stats["recorded"] += 1
+        return response
+
+    def prune_unused(self) -> list[str]:
+        """Delete cassettes not used this session (call after a full run)."""
+        removed = []
+        for path in glob.glob(os.path.join(self.cassette_dir, "*.json")):
+            name = os.path.splitext(os.path.basename(path))[0]
+            if name not in self.used:
+                os.remove(path)
+                removed.append(name)
+        return removed
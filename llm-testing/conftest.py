@@ -0,0 +1,79 @@
+"""
+Shared pytest options and fixtures for the LLM tests.
+
+    pytest -vv -rP test_logic.py --eval-repeats 5 --eval-workers 16
+    pytest -vv -rP test_logic.py --no-eval-cache   # always call the LLM
+    pytest -vv -rP test_logic.py --llm-mode replay # offline, from cassettes/
+"""
+import os
+
+import pytest
+
+from cassettes import DEFAULT_CASSETTE_DIR, MODES, CassetteClient
+from eval_runner import DEFAULT_CACHE_DIR, DEFAULT_MAX_WORKERS, EvalCache, EvalRunner
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("llm evaluation")
+    group.addoption("--eval-repeats", type=int, default=1,
+                    help="Run every parametrized LLM case this many times.")
+    group.addoption("--eval-workers", type=int, default=DEFAULT_MAX_WORKERS,
+                    help="Maximum number of concurrent LLM calls.")
+    group.addoption("--eval-cache-dir", default=DEFAULT_CACHE_DIR,
+                    help="Where LLM outputs are cached.")
+    group.addoption("--no-eval-cache", action="store_true",
+                    help="Don't read or write cached LLM outputs.")
+    group.addoption("--llm-mode", choices=MODES, default=os.getenv("LLM_MODE", "live"),
+                    help="Record/replay chat completions to cassettes (default: $LLM_MODE or live).")
+    group.addoption("--llm-cassette-dir", default=DEFAULT_CASSETTE_DIR,
+                    help="Where cassettes are stored.")
+    group.addoption("--llm-prune", action="store_true",
+                    help="After the run, delete cassettes that no test used.")
+
+
+def pytest_configure(config):
+    # logic.py builds its client at import time; replay never calls the API, so no key is needed
+    if config.getoption("--llm-mode") == "replay":
+        os.environ.setdefault("OPENAI_API_KEY", "replay")
+
+
+def pytest_generate_tests(metafunc):
+    # tests that ask for `repetition` are run once per --eval-repeats
+    if "repetition" in metafunc.fixturenames:
+        metafunc.parametrize("repetition", range(metafunc.config.getoption("--eval-repeats")))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def llm_cassettes(pytestconfig):
+    """Route logic.client through a CassetteClient unless --llm-mode is live."""
+    mode = pytestconfig.getoption("--llm-mode")
+    if mode == "live":
+        yield None
+        return
+    import logic
+    live_client = logic.client
+    logic.client = CassetteClient(live_client, mode=mode, cassette_dir=pytestconfig.getoption("--llm-cassette-dir"))
+    yield logic.client
+    stats = dict(logic.client.stats)
+    if pytestconfig.getoption("--llm-prune"):
+        stats["pruned"] = len(logic.client.prune_unused())
+    print(f"\nCassettes ({mode}): {stats}")
+    logic.client = live_client
+
+
+@pytest.fixture(scope="session")
+def make_eval_runner(pytestconfig):
+    """Factory for an EvalRunner configured from the command-line options.
+
+    Pass `cached=False` for runs that must draw fresh samples, such as variance profiling.
+    """
+    cache = None
+    # with cassettes every call has to reach the CassetteClient, so the output cache is skipped
+    if not pytestconfig.getoption("--no-eval-cache") and pytestconfig.getoption("--llm-mode") == "live":
+        cache = EvalCache(pytestconfig.getoption("--eval-cache-dir"))
+
+    def make(fn, model, cached=True):
+        return EvalRunner(fn, model=model, max_workers=pytestconfig.getoption("--eval-workers"),
+                          cache=cache if cached else None)
+
+    return make
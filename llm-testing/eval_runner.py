@@ -0,0 +1,144 @@
+"""
+Concurrent, cached evaluation runner for LLM functions.
+
+Runs a function such as `logic.extract_profile_data` over every input x N
+repetitions on a bounded thread pool, and caches each output on disk keyed by
+(prompt version, input hash, model, repetition). The prompt version is a hash
+of the function's source, so editing the prompt invalidates its cache
+entries while unchanged cases are never re-billed.
+
+Used by test_logic.py through the fixtures in conftest.py, or directly:
+
+    runner = EvalRunner(logic.extract_profile_data, model=logic.MODEL)
+    results = runner.run(["...profile text..."], repetitions=5)
+"""
+import concurrent.futures
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import threading
+
+DEFAULT_CACHE_DIR = ".eval_cache"
+DEFAULT_MAX_WORKERS = 8  # concurrent LLM calls
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _source(fn) -> str:
+    """`fn`'s source, or for functions without one (defined in a REPL or
+    `python -c`, builtins) its name plus, if it has any, its bytecode and
+    constants, which include the prompt strings."""
+    try:
+        return inspect.getsource(fn)
+    except (OSError, TypeError):
+        code = getattr(fn, "__code__", None)
+        name = f"{getattr(fn, '__module__', '')}.{getattr(fn, '__qualname__', repr(fn))}"
+        if code is None:
+            return name
+        return f"{name}\n{code.co_code.hex()}\n{code.co_consts!r}"
+
+
+def prompt_version(fn) -> str:
+    """Short hash of the function source (prompt included).
+
+    Functions from the same module that `fn` calls by name (such as the
+    `_profile_messages` prompt builders in logic.py) are hashed too.
+    """
+    source = _source(fn)
+    code = getattr(fn, "__code__", None)
+    for name in code.co_names if code else ():
+        helper = fn.__globals__.get(name)
+        if inspect.isfunction(helper) and helper.__module__ == fn.__module__ and helper is not fn:
+            source += _source(helper)
+    return _sha256(source)[:12]
+
+
+class EvalCache:
+    """JSON-file-per-entry cache of LLM outputs."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(version: str, input_text: str, model: str, repetition: int) -> str:
+        return _sha256(json.dumps([version, _sha256(input_text), model, repetition]))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str):
+        """Return the cached output, or None if there isn't one."""
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)["output"]
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return None
+
+    def set(self, key: str, output, **info) -> None:
+        # write-then-rename so concurrent workers never see half a file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"output": output, **info}, f)
+        os.replace(tmp_path, self._path(key))
+
+
+class EvalRunner:
+    """Runs `fn(input_text)` for many inputs and repetitions under a concurrency cap."""
+
+    def __init__(self, fn, model: str, max_workers: int = DEFAULT_MAX_WORKERS, cache: EvalCache | None = None):
+        self.fn = fn
+        self.model = model
+        self.max_workers = max_workers
+        self.cache = cache
+        self.version = prompt_version(fn)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _call(self, input_text: str, repetition: int):
+        key = None
+        if self.cache is not None:
+            key = self.cache.key(self.version, input_text, self.model, repetition)
+            output = self.cache.get(key)
+            if output is not None:
+                with self._lock:
+                    self.hits += 1
+                return output
+        output = self.fn(input_text)
+        with self._lock:
+            self.misses += 1
+        if key is not None:
+            self.cache.set(key, output, function=self.fn.__name__, prompt_version=self.version,
+                           model=self.model, repetition=repetition)
+        return output
+
+    def run(self, inputs: list[str], repetitions: int = 1, start: int = 0) -> list[list]:
+        """Return outputs as `results[input_index][repetition]`.
+
+        Repetitions are numbered from `start`, so a caller sampling in rounds
+        gets fresh (separately cached) outputs for each round.
+
+        Every (input, repetition) pair is submitted up front, so at most
+        `max_workers` calls are in flight at once. A call that raises leaves
+        its exception in place of the output, so one failure doesn't hide
+        the other results.
+        """
+        results = [[None] * repetitions for _ in inputs]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._call, input_text, start + repetition): (i, repetition)
+                for i, input_text in enumerate(inputs)
+                for repetition in range(repetitions)
+            }
+            for future in concurrent.futures.as_completed(futures):
+                i, repetition = futures[future]
+                try:
+                    results[i][repetition] = future.result()
+                except Exception as e:
+                    results[i][repetition] = e
+        return results
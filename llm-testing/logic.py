@@ -1,20 +1,32 @@
+import asyncio
 import json
+from collections import Counter
 
+import httpx
 import openai
+from pydantic import BaseModel, ValidationError, ValidationInfo, model_validator
 
 client = openai.Client()
 
+# One shared async client for the aextract_* functions. Its connection pool is
+# the real cap on in-flight requests, so keep it at least as large as the
+# concurrency passed to aextract_many.
+MAX_CONNECTIONS = 100
+aclient = openai.AsyncOpenAI(
+    http_client=openai.DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+    ),
+)
+
+MODEL = "gpt-4o-mini"
+
 def addition(a : int, b : int) -> int:
     """Dummy logic function"""
     return a + b
 
 
-def extract_profile_data(linkedin_text: str) -> dict:
-    """
-    Original version: Extract structured data from LinkedIn text with
-    less strict constraints.
-    """
-    messages = [
+def _profile_messages(linkedin_text: str) -> list[dict]:
+    return [
         {"role": "system",
          "content": "You are an expert in extracting structured information "
                     "from text."},
@@ -32,21 +44,10 @@ Text:
 Output the result as a JSON object.
 """}
     ]
-    # LLM call
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        response_format={"type": "json_object"},
-        messages=messages
-    )
-    return json.loads(response.choices[0].message.content)
 
 
-def extract_profile_data_strict(linkedin_text: str) -> dict:
-    """
-    New version: Extract structured data with stricter constraints
-    (e.g., one role, specific formatting).
-    """
-    messages = [
+def _profile_messages_strict(linkedin_text: str) -> list[dict]:
+    return [
         {"role": "system",
          "content": "You are an expert in extracting structured "
                     "information from text."},
@@ -65,11 +66,158 @@ Output the result as a JSON object. Ensure the structure matches the requested f
 """}
     ]
 
+
+def extract_profile_data(linkedin_text: str) -> dict:
+    """
+    Original version: Extract structured data from LinkedIn text with
+    less strict constraints.
+    """
+    # LLM call
+    response = client.chat.completions.create(
+        model=MODEL,
+        response_format={"type": "json_object"},
+        messages=_profile_messages(linkedin_text)
+    )
+    return json.loads(response.choices[0].message.content)
+
+
+def extract_profile_data_strict(linkedin_text: str) -> dict:
+    """
+    New version: Extract structured data with stricter constraints
+    (e.g., one role, specific formatting).
+    """
     # LLM call with deterministic settings
     response = client.chat.completions.create(
-        model="gpt-4o-mini",
+        model=MODEL,
         #temperature=0,  # Ensures deterministic behavior
         response_format={"type": "json_object"},
+        messages=_profile_messages_strict(linkedin_text)
+    )
+    return json.loads(response.choices[0].message.content)
+
+
+async def aextract_profile_data(linkedin_text: str) -> dict:
+    """Async version of extract_profile_data, on the shared `aclient`."""
+    response = await aclient.chat.completions.create(
+        model=MODEL,
+        response_format={"type": "json_object"},
+        messages=_profile_messages(linkedin_text)
+    )
+    return json.loads(response.choices[0].message.content)
+
+
+async def aextract_profile_data_strict(linkedin_text: str) -> dict:
+    """Async version of extract_profile_data_strict, on the shared `aclient`."""
+    response = await aclient.chat.completions.create(
+        model=MODEL,
+        response_format={"type": "json_object"},
+        messages=_profile_messages_strict(linkedin_text)
+    )
+    return json.loads(response.choices[0].message.content)
+
+
+async def aextract_many(linkedin_texts: list[str], extract=aextract_profile_data,
+                        concurrency: int = MAX_CONNECTIONS) -> list:
+    """
+    Run `extract` over every text with at most `concurrency` calls in flight.
+
+    Results come back in input order. A call that raises leaves its exception
+    in place of the result, so one failure doesn't cancel thousands of others.
+
+        results = asyncio.run(aextract_many(texts, concurrency=50))
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(text):
+        async with semaphore:
+            return await extract(text)
+
+    return await asyncio.gather(*(bounded(text) for text in linkedin_texts), return_exceptions=True)
+
+class ProfileBatch(BaseModel):
+    """A batched extraction reply: one entry per input profile, tagged with its index."""
+    profiles: list[dict]
+
+    @model_validator(mode="after")
+    def validate_profiles(self, info: ValidationInfo):
+        count = (info.context or {}).get("count")
+        if count is not None and len(self.profiles) != count:
+            raise ValueError(f"The number of profiles ({len(self.profiles)}) must match the number of inputs ({count}).")
+        indices = [p.get("index") for p in self.profiles]
+        if count is not None and sorted(i for i in indices if isinstance(i, int)) != list(range(count)):
+            raise ValueError(f"Profile indices {indices} must be exactly 0..{count - 1}.")
+        return self
+
+
+_BATCH_GUIDELINES = {
+    False: """- Name
+- Current Role
+- Location
+- Previous Roles
+- Education""",
+    True: """- Name: Include only the person's full name.
+- Current Role: Include only the most recent job title and company (one role and one company only).
+- Location: Include only the city, state, and country.
+- Previous Roles: List only the titles and companies (one entry per previous role, no additional details).
+- Education: List only degree, field, and institution (one entry per degree).""",
+}
+
+
+def extract_profile_data_batch(linkedin_texts: list[str], strict: bool = False) -> list[dict]:
+    """
+    Batched version: extract structured data for several profiles in one call.
+
+    Results come back in input order. If the reply doesn't validate (wrong
+    count or indices), every profile that did come back intact is kept and
+    only the missing ones are re-extracted one at a time with
+    extract_profile_data / extract_profile_data_strict.
+    """
+    if not linkedin_texts:
+        return []
+    profiles_rendered = "\n".join(
+        f'<profile index="{i}">\n{text}\n</profile>' for i, text in enumerate(linkedin_texts)
+    )
+    messages = [
+        {"role": "system",
+         "content": "You are an expert in extracting structured information "
+                    "from text."},
+        {"role": "user", "content": f"""
+Extract the following structured information from each of the {len(linkedin_texts)} profiles below:
+{_BATCH_GUIDELINES[strict]}
+
+Profiles:
+{profiles_rendered}
+
+Output the result as a JSON object of the form {{"profiles": [...]}} with exactly {len(linkedin_texts)} entries,
+one per profile in the same order. Each entry is a JSON object with an "index" key holding the profile's index
+and one key per field above.
+"""}
+    ]
+    response = client.chat.completions.create(
+        model=MODEL,
+        response_format={"type": "json_object"},
         messages=messages
     )
-    return json.loads(response.choices[0].message.content)
\ No newline at end of file
+    content = response.choices[0].message.content
+
+    results = [None] * len(linkedin_texts)
+    try:
+        batch = ProfileBatch.model_validate_json(content, context={"count": len(linkedin_texts)})
+        for profile in batch.profiles:
+            results[profile.pop("index")] = profile
+    except ValidationError:
+        # keep whatever came back with a usable, unique index
+        try:
+            profiles = json.loads(content).get("profiles", [])
+        except (json.JSONDecodeError, AttributeError):
+            profiles = []
+        seen = Counter(p.get("index") for p in profiles if isinstance(p, dict))
+        for profile in profiles:
+            if not isinstance(profile, dict):
+                continue
+            index = profile.pop("index", None)
+            if isinstance(index, int) and 0 <= index < len(results) and seen[index] == 1:
+                results[index] = profile
+
+    single = extract_profile_data_strict if strict else extract_profile_data
+    return [result if result is not None else single(text) for result, text in zip(results, linkedin_texts)]
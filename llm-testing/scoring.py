@@ -0,0 +1,170 @@
+"""
+Field-level scoring for `extract_profile_data` outputs.
+
+Each field of an output is scored three ways against the expected value:
+
+    exact       actual == expected (what test_logic.py has always checked)
+    normalized  equal after lower-casing, stripping punctuation and collapsing
+                whitespace; lists are compared as multisets, so order doesn't
+                matter
+    fuzzy       token-set similarity in [0, 1]; list fields (e.g. "Previous
+                Roles") pair each expected item with its best-matching actual
+                item, so order doesn't matter and missing or extra items
+                lower the score
+
+Scores are collected in a `ScoreTable` (NumPy arrays, one row per case and
+repetition) so aggregation is vectorized, and rows can be written to CSV as
+they are scored with `StreamingCsvWriter` rather than building a frame.
+"""
+import csv
+import json
+import re
+
+import numpy as np
+
+FIELDS = ["Name", "Current Role", "Location", "Previous Roles", "Education"]
+METRICS = ("exact", "normalized", "fuzzy")
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def to_text(value) -> str:
+    """Flatten a field value (string, dict or list) into one string."""
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return " ".join(to_text(value[k]) for k in sorted(value))
+    if isinstance(value, (list, tuple)):
+        return " ".join(to_text(v) for v in value)
+    return str(value)
+
+
+def normalize_text(value) -> str:
+    text = _PUNCTUATION.sub(" ", to_text(value).lower())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def token_set_score(a, b) -> float:
+    """Dice overlap of the two values' token sets (1.0 when both are empty)."""
+    tokens_a = set(normalize_text(a).split())
+    tokens_b = set(normalize_text(b).split())
+    if not tokens_a and not tokens_b:
+        return 1.0
+    return 2 * len(tokens_a & tokens_b) / (len(tokens_a) + len(tokens_b))
+
+
+def list_match_score(expected: list, actual: list) -> float:
+    """Order-insensitive similarity of two lists.
+
+    Items are paired greedily by highest token-set score; the sum of the
+    paired scores is divided by the longer list's length, so unmatched items
+    count as zero.
+    """
+    if not expected and not actual:
+        return 1.0
+    if not expected or not actual:
+        return 0.0
+    similarity = np.array([[token_set_score(e, a) for a in actual] for e in expected])
+    total = 0.0
+    for _ in range(min(similarity.shape)):
+        i, j = np.unravel_index(np.argmax(similarity), similarity.shape)
+        total += similarity[i, j]
+        similarity[i, :] = -1.0
+        similarity[:, j] = -1.0
+    return total / max(len(expected), len(actual))
+
+
+def normalized_equal(expected, actual) -> bool:
+    if isinstance(expected, list) and isinstance(actual, list):
+        return sorted(map(normalize_text, expected)) == sorted(map(normalize_text, actual))
+    return normalize_text(expected) == normalize_text(actual)
+
+
+def score_field(expected, actual) -> dict:
+    if isinstance(expected, list) or isinstance(actual, list):
+        as_list = lambda v: v if isinstance(v, list) else ([] if v is None else [v])  # noqa: E731
+        fuzzy = list_match_score(as_list(expected), as_list(actual))
+    else:
+        fuzzy = token_set_score(expected, actual)
+    return {
+        "exact": expected == actual,
+        "normalized": normalized_equal(expected, actual),
+        "fuzzy": fuzzy,
+    }
+
+
+def score_case(expected: dict, actual: dict, fields=FIELDS) -> dict:
+    """{field: {"exact", "normalized", "fuzzy"}}; a missing field scores zero."""
+    actual = actual if isinstance(actual, dict) else {}
+    return {field: score_field(expected.get(field), actual.get(field)) for field in fields}
+
+
+class ScoreTable:
+    """Per-case field scores held as (n_cases, n_fields) arrays, one per metric."""
+
+    def __init__(self, fields=FIELDS, capacity: int = 64):
+        self.fields = list(fields)
+        self.n = 0
+        self._scores = {metric: np.zeros((capacity, len(self.fields))) for metric in METRICS}
+        self._groups = np.zeros(capacity, dtype=np.int64)
+        self.group_names = []
+        self._group_codes = {}
+
+    def add(self, case_scores: dict, group=None) -> None:
+        if self.n == len(self._groups):
+            # grow by doubling so adding stays amortized O(1)
+            for metric in METRICS:
+                self._scores[metric] = np.concatenate([self._scores[metric], np.zeros_like(self._scores[metric])])
+            self._groups = np.concatenate([self._groups, np.zeros_like(self._groups)])
+        for metric in METRICS:
+            self._scores[metric][self.n] = [case_scores[field][metric] for field in self.fields]
+        if group not in self._group_codes:
+            self._group_codes[group] = len(self.group_names)
+            self.group_names.append(group)
+        self._groups[self.n] = self._group_codes[group]
+        self.n += 1
+
+    def scores(self, metric: str) -> np.ndarray:
+        return self._scores[metric][:self.n]
+
+    def accuracy(self, metric: str = "exact") -> dict:
+        """Mean score per field, as a percentage."""
+        means = self.scores(metric).mean(axis=0) * 100.0 if self.n else np.zeros(len(self.fields))
+        return dict(zip(self.fields, means.tolist()))
+
+    def accuracy_by_group(self, metric: str = "exact") -> dict:
+        """{group: {field: percentage}} computed with one bincount per field."""
+        groups = self._groups[:self.n]
+        counts = np.bincount(groups, minlength=len(self.group_names))
+        scores = self.scores(metric)
+        sums = np.stack([np.bincount(groups, weights=scores[:, f], minlength=len(self.group_names))
+                         for f in range(len(self.fields))], axis=1)
+        means = sums / np.maximum(counts, 1)[:, None] * 100.0
+        return {name: dict(zip(self.fields, means[g].tolist())) for g, name in enumerate(self.group_names)}
+
+
+class StreamingCsvWriter:
+    """Writes rows to CSV as they arrive; dicts and lists are stored as JSON."""
+
+    def __init__(self, path: str, columns: list):
+        self.path = path
+        self.columns = columns
+        self.rows_written = 0
+
+    def __enter__(self):
+        self._file = open(self.path, "w", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, quoting=csv.QUOTE_ALL,
+                                      extrasaction="ignore")
+        self._writer.writeheader()
+        return self
+
+    def write_row(self, row: dict) -> None:
+        self._writer.writerow({
+            key: json.dumps(value) if isinstance(value, (dict, list)) else value
+            for key, value in row.items()
+        })
+        self.rows_written += 1
+
+    def __exit__(self, *exc):
+        self._file.close()
@@ -0,0 +1,77 @@
+"""
+To run:
+> pytest -vv test_scoring.py
+"""
+import csv
+
+import pytest
+
+import scoring
+
+
+@pytest.mark.parametrize(
+    "expected,actual,exact,normalized", [
+        ("Stefan Krawczyk", "Stefan Krawczyk", True, True),
+        ("CEO @ DAGWorks Inc.", "ceo dagworks inc", False, True),
+        ("San Francisco, California", "California, San Francisco", False, False),
+        ([], [], True, True),
+])
+def test_score_field_exact_and_normalized(expected, actual, exact, normalized):
+    scores = scoring.score_field(expected, actual)
+    assert scores["exact"] == exact
+    assert scores["normalized"] == normalized
+
+
+def test_token_set_score_ignores_order_and_punctuation():
+    assert scoring.token_set_score("San Francisco, California", "California San Francisco") == 1.0
+    assert scoring.token_set_score("", "") == 1.0
+    assert scoring.token_set_score("a b", "c d") == 0.0
+
+
+def test_list_fields_are_order_insensitive():
+    roles = [
+        {"Title": "Head of Developer Relations", "Company": "Outerbounds"},
+        {"Title": "Head of Data Science Evangelism and Marketing", "Company": "Coiled"},
+    ]
+    scores = scoring.score_field(roles, list(reversed(roles)))
+    assert scores["exact"] is False
+    assert scores["normalized"] is True
+    assert scores["fuzzy"] == pytest.approx(1.0)
+
+
+def test_list_fields_penalize_missing_items():
+    roles = [{"Title": "A", "Company": "X"}, {"Title": "B", "Company": "Y"}]
+    assert scoring.list_match_score(roles, roles[:1]) == pytest.approx(0.5)
+    assert scoring.list_match_score(roles, []) == 0.0
+
+
+def test_score_case_handles_missing_fields():
+    expected = {"Name": "Stefan Krawczyk", "Previous Roles": []}
+    scores = scoring.score_case(expected, {"Name": "Stefan Krawczyk"}, fields=["Name", "Previous Roles"])
+    assert scores["Name"]["exact"] is True
+    # None vs [] is neither exact nor, as a list, fuzzy-different
+    assert scores["Previous Roles"]["exact"] is False
+    assert scores["Previous Roles"]["fuzzy"] == 1.0
+
+
+def test_score_table_aggregates_by_field_and_group():
+    table = scoring.ScoreTable(fields=["Name"], capacity=1)
+    for name, group in [("Stefan", "a"), ("Stefan", "a"), ("Someone else", "b"), ("Stefan", "b")]:
+        table.add(scoring.score_case({"Name": "Stefan"}, {"Name": name}, fields=["Name"]), group=group)
+    assert table.n == 4
+    assert table.accuracy("exact") == {"Name": 75.0}
+    assert table.accuracy_by_group("exact") == {"a": {"Name": 100.0}, "b": {"Name": 50.0}}
+
+
+def test_streaming_csv_writer(tmp_path):
+    path = tmp_path / "results.csv"
+    with scoring.StreamingCsvWriter(str(path), ["test_id", "actual"]) as writer:
+        writer.write_row({"test_id": "t1", "actual": {"Name": "Stefan"}, "ignored": 1})
+        writer.write_row({"test_id": "t2", "actual": ["x"]})
+    with open(path) as f:
+        rows = list(csv.DictReader(f))
+    assert writer.rows_written == 2
+    assert rows == [
+        {"test_id": "t1", "actual": '{"Name": "Stefan"}'},
+        {"test_id": "t2", "actual": '["x"]'},
+    ]
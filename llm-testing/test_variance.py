@@ -0,0 +1,95 @@
+"""
+To run:
+> pytest -vv test_variance.py
+"""
+import itertools
+import threading
+
+import pytest
+
+import variance
+from eval_runner import EvalRunner, prompt_version
+
+
+def make_fake(outputs):
+    """A fake extraction function that cycles through `outputs` and counts calls."""
+    cycle = itertools.cycle(outputs)
+    lock = threading.Lock()
+
+    def fake_extract(linkedin_text):
+        with lock:
+            fake_extract.calls += 1
+            return dict(next(cycle))
+    fake_extract.calls = 0
+    return fake_extract
+
+
+def test_stable_output_stops_early():
+    fake = make_fake([{"Name": "Stefan", "Education": []}])
+    report, = variance.profile_variance(EvalRunner(fake, model="fake"), ["text"], max_samples=10)
+    assert report["stop_reason"] == "all fields stable"
+    assert report["samples"] == fake.calls == 4
+    assert report["calls_saved"] == 6
+    assert variance.variable_fields(report) == {}
+    assert report["fields"]["Name"]["distribution"] == {'"Stefan"': 4}
+
+
+def test_variance_is_confirmed_without_using_every_call():
+    fake = make_fake([{"Name": "Stefan", "Location": "SF"}, {"Name": "Stefan", "Location": "San Francisco"}])
+    report, = variance.profile_variance(EvalRunner(fake, model="fake"), ["text"], max_samples=10)
+    assert report["stop_reason"] == "variance confirmed"
+    assert report["samples"] < 10
+    assert set(variance.variable_fields(report)) == {"Location"}
+    assert report["fields"]["Name"]["status"] == "stable"
+
+
+def test_missing_field_counts_as_variance():
+    fake = make_fake([{"Name": "Stefan"}, {"Name": "Stefan", "Location": "SF"}])
+    report, = variance.profile_variance(EvalRunner(fake, model="fake"), ["text"], max_samples=6)
+    assert report["fields"]["Location"]["distribution"][variance.MISSING] >= 1
+    assert "Location" in variance.variable_fields(report)
+
+
+def test_undetermined_distribution_runs_to_max_samples():
+    fake = make_fake([{"Name": str(i)} for i in range(100)])
+    report, = variance.profile_variance(
+        EvalRunner(fake, model="fake"), ["text"], max_samples=6, stop_on_variance=False
+    )
+    assert report["stop_reason"] == "reached max_samples=6"
+    assert report["calls_saved"] == 0
+    assert report["fields"]["Name"]["status"] == "undetermined"
+
+
+def test_profiles_are_sampled_independently():
+    stable = make_fake([{"Name": "Stefan"}])
+    runner = EvalRunner(stable, model="fake")
+    reports = variance.profile_variance(runner, ["a", "b", "c"], max_samples=10)
+    assert [r["samples"] for r in reports] == [4, 4, 4]
+    assert stable.calls == 12
+
+
+@pytest.mark.parametrize("counts,expected", [
+    ({"a": 4}, 0.2),
+    ({"a": 1, "b": 1}, 1.0),
+    ({"a": 3, "b": 1}, 0.4),
+])
+def test_unseen_probability(counts, expected):
+    assert variance.unseen_probability(variance.Counter(counts)) == pytest.approx(expected)
+
+
+def test_all_calls_failing_raises():
+    def failing_extract(linkedin_text):
+        raise ValueError("no output")
+    with pytest.raises(ValueError, match="no output"):
+        variance.profile_variance(EvalRunner(failing_extract, model="fake"), ["text"], max_samples=4)
+
+
+def test_prompt_version_without_source():
+    # as if typed into a REPL: inspect.getsource can't find these
+    v1 = eval('lambda linkedin_text: {"Name": "Stefan"}')
+    v2 = eval('lambda linkedin_text: {"Name": "Hugo"}')
+    assert prompt_version(v1) != prompt_version(v2)
+    assert prompt_version(v1) == prompt_version(eval('lambda linkedin_text: {"Name": "Stefan"}'))
+    assert len(prompt_version(len)) == 12
+    report, = variance.profile_variance(EvalRunner(v1, model="fake"), ["text"], max_samples=4)
+    assert report["fields"]["Name"]["distribution"] == {'"Stefan"': report["samples"]}
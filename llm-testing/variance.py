@@ -0,0 +1,134 @@
+"""
+Adaptive output-variance profiler for LLM extraction functions.
+
+Instead of always firing a fixed number of identical calls, samples are
+drawn in small concurrent rounds and each output field is tracked as a
+distribution of distinct (JSON-serialized) values. A field is resolved once
+
+    variable  it has produced two or more distinct values (variance is
+              confirmed; with `stop_on_variance=False` we keep sampling
+              until its distribution has settled, as below), or
+    stable    the estimated chance that another call produces a value not
+              seen yet is at most `tolerance`. The estimate is the
+              add-one Good-Turing missing mass (singletons + 1) / (n + 1),
+              so a constant field needs about 1/tolerance calls.
+
+Sampling stops for a profile when every field is resolved, or at
+`max_samples`. Several profiles are sampled in lock-step so each round is
+one batch on the EvalRunner's bounded pool, and its cache means re-profiling
+unchanged prompts is free.
+
+    runner = EvalRunner(logic.extract_profile_data, model=logic.MODEL)
+    reports = profile_variance(runner, [text_a, text_b])
+"""
+import json
+from collections import Counter
+
+DEFAULT_MIN_SAMPLES = 3
+DEFAULT_MAX_SAMPLES = 10
+DEFAULT_BATCH_SIZE = 2  # calls per profile per round
+DEFAULT_TOLERANCE = 0.2
+MISSING = "<missing>"
+
+
+def unseen_probability(counts: Counter) -> float:
+    """Smoothed Good-Turing estimate of the chance the next value is new."""
+    n = sum(counts.values())
+    singletons = sum(1 for c in counts.values() if c == 1)
+    return (singletons + 1) / (n + 1)
+
+
+class _ProfileState:
+    def __init__(self, input_text: str):
+        self.input_text = input_text
+        self.n = 0
+        self.fields = {}  # field -> Counter of JSON-serialized values
+        self.errors = 0
+        self.last_error = None
+
+    def add(self, output) -> None:
+        if isinstance(output, Exception):
+            self.errors += 1
+            self.last_error = output
+            return
+        for field in set(self.fields) | set(output):
+            # a field absent from some outputs is itself a kind of variance
+            value = json.dumps(output[field], sort_keys=True) if field in output else MISSING
+            counts = self.fields.setdefault(field, Counter({MISSING: self.n} if self.n else {}))
+            counts[value] += 1
+        self.n += 1
+
+    def status(self, field: str, tolerance: float, stop_on_variance: bool) -> str:
+        counts = self.fields[field]
+        settled = unseen_probability(counts) <= tolerance
+        if len(counts) > 1:
+            return "variable" if stop_on_variance or settled else "undetermined"
+        return "stable" if settled else "undetermined"
+
+    def resolved(self, min_samples: int, tolerance: float, stop_on_variance: bool) -> bool:
+        if self.n < min_samples:
+            return False
+        return all(self.status(f, tolerance, stop_on_variance) != "undetermined" for f in self.fields)
+
+
+def profile_variance(runner, inputs: list[str], min_samples: int = DEFAULT_MIN_SAMPLES,
+                     max_samples: int = DEFAULT_MAX_SAMPLES, batch_size: int = DEFAULT_BATCH_SIZE,
+                     tolerance: float = DEFAULT_TOLERANCE, stop_on_variance: bool = True) -> list[dict]:
+    """Profile output variance for each input; returns one report per input.
+
+    Each report has `samples`, `calls_saved` (against always making
+    `max_samples` calls), `stop_reason`, `errors` and per-field `status`,
+    `distinct`, `unseen` and `distribution` ({JSON value: count}). If every
+    call for an input failed, its last error is raised instead.
+    """
+    states = [_ProfileState(text) for text in inputs]
+    done = 0
+    while done < max_samples:
+        active = [s for s in states if not s.resolved(min_samples, tolerance, stop_on_variance)]
+        if not active:
+            break
+        repetitions = min(batch_size, max_samples - done)
+        outputs = runner.run([s.input_text for s in active], repetitions=repetitions, start=done)
+        for state, samples in zip(active, outputs):
+            for output in samples:
+                state.add(output)
+        done += repetitions
+
+    reports = []
+    for state in states:
+        if state.n == 0 and state.last_error is not None:
+            # no output to profile; an empty report would look perfectly stable
+            raise state.last_error
+        resolved = state.resolved(min_samples, tolerance, stop_on_variance)
+        fields = {
+            field: {
+                "status": state.status(field, tolerance, stop_on_variance),
+                "distinct": len(counts),
+                "unseen": round(unseen_probability(counts), 3),
+                "distribution": dict(counts.most_common()),
+            }
+            for field, counts in state.fields.items()
+        }
+        if not resolved:
+            stop_reason = f"reached max_samples={max_samples}"
+        elif any(f["status"] == "variable" for f in fields.values()):
+            stop_reason = "variance confirmed"
+        else:
+            stop_reason = "all fields stable"
+        reports.append({
+            "samples": state.n + state.errors,
+            "calls_saved": max_samples - state.n - state.errors,
+            "stop_reason": stop_reason,
+            "errors": state.errors,
+            "fields": fields,
+        })
+    return reports
+
+
+def variable_fields(report: dict) -> dict:
+    """{field: [distinct values]} for the fields whose outputs varied."""
+    return {
+        field: list(info["distribution"])
+        for field, info in report["fields"].items()
+        if info["distinct"] > 1
+    }
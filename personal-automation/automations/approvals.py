@@ -0,0 +1,152 @@
+"""
+Async waiting for HumanLayer approvals.
+
+`ApprovalWaiter` multiplexes any number of pending approvals over a single
+poller task instead of blocking a thread per approval. Each pending call is
+polled with exponential backoff (1s, 2s, 4s, ... capped at 30s), and calls
+that come due together are fetched concurrently. If a HumanLayer webhook is
+configured, pass each delivered `FunctionCall` to `notify()` and the waiting
+coroutine resumes immediately; polling then only acts as a fallback.
+
+    waiter = ApprovalWaiter(AsyncHumanLayer(verbose=True))
+    status = await waiter.request("categorize_gmail_emails", x=rendered)
+    print(waiter.latency_stats())
+"""
+
+import asyncio
+import functools
+import statistics
+from dataclasses import dataclass, field
+
+from humanlayer import AsyncHumanLayer, FunctionCall, FunctionCallSpec, FunctionCallStatus
+
+INITIAL_INTERVAL = 1.0  # seconds before the first poll of a new call
+MAX_INTERVAL = 30.0
+BACKOFF = 2.0
+
+
+@dataclass
+class _Pending:
+    name: str
+    future: asyncio.Future
+    created_at: float
+    next_poll: float
+    interval: float
+    polls: int = field(default=0)
+
+
+class ApprovalWaiter:
+    """Waits on many HumanLayer function calls with one poller task."""
+
+    def __init__(
+        self,
+        hl_instance=None,
+        initial_interval: float = INITIAL_INTERVAL,
+        max_interval: float = MAX_INTERVAL,
+        backoff: float = BACKOFF,
+    ):
+        self.hl = hl_instance or _get_default_async_humanlayer()
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.latencies: list[float] = []
+        self.polls = 0
+        self._pending: dict[str, _Pending] = {}
+        self._poller: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+
+    async def request(self, name: str, **kwargs) -> FunctionCallStatus:
+        """Create an approval request for `name` and wait for the human's decision."""
+        call: FunctionCall = await self.hl.create_function_call(
+            spec=FunctionCallSpec(fn=name, kwargs=kwargs),
+        )
+        if call.status is not None and call.status.approved is not None:
+            return call.status
+
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        pending = _Pending(name=name, future=loop.create_future(), created_at=now,
+                           next_poll=now + self.initial_interval, interval=self.initial_interval)
+        self._pending[call.call_id] = pending
+        print(f"Waiting for approval of {name}, id: {call.call_id}")
+        if self._poller is None or self._poller.done():
+            # created per poller, so the waiter can be reused from a later event loop
+            self._wakeup = asyncio.Event()
+            self._poller = loop.create_task(self._poll())
+        self._wakeup.set()
+        try:
+            return await pending.future
+        finally:
+            self._pending.pop(call.call_id, None)
+
+    def notify(self, call: FunctionCall) -> bool:
+        """Resolve a pending approval from a pushed update (e.g. a webhook).
+
+        Returns True if it resolved a call this waiter was waiting on.
+        """
+        pending = self._pending.get(call.call_id)
+        if pending is None or pending.future.done() or call.status is None or call.status.approved is None:
+            return False
+        latency = asyncio.get_running_loop().time() - pending.created_at
+        self.latencies.append(latency)
+        print(f"{'Approved' if call.status.approved else 'Rejected'} {pending.name} "
+              f"after {latency:.1f}s ({pending.polls} polls), id: {call.call_id}")
+        pending.future.set_result(call.status)
+        return True
+
+    async def _poll_one(self, call_id: str, pending: _Pending) -> None:
+        pending.polls += 1
+        self.polls += 1
+        try:
+            call = await self.hl.get_function_call(call_id=call_id)
+        except Exception as e:
+            print(f"Polling approval {call_id} failed, retrying later: {e}")
+            call = None
+        if call is None or not self.notify(call):
+            pending.interval = min(pending.interval * self.backoff, self.max_interval)
+            pending.next_poll = asyncio.get_running_loop().time() + pending.interval
+
+    async def _poll(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            self._wakeup.clear()
+            now = loop.time()
+            due = [(call_id, p) for call_id, p in list(self._pending.items())
+                   if p.next_poll <= now and not p.future.done()]
+            if due:
+                await asyncio.gather(*(self._poll_one(call_id, p) for call_id, p in due))
+                continue
+            waiting = [p.next_poll for p in self._pending.values() if not p.future.done()]
+            if not waiting:
+                # everything left was resolved; let the awaiting coroutines clean up
+                await asyncio.sleep(0)
+                continue
+            try:
+                # sleep until the next call is due, or until a new request arrives
+                await asyncio.wait_for(self._wakeup.wait(), timeout=min(waiting) - now)
+            except asyncio.TimeoutError:
+                pass
+
+    def latency_stats(self) -> dict:
+        """Approval latency (seconds) over every decision this waiter has seen."""
+        if not self.latencies:
+            return {"count": 0, "polls": self.polls}
+        return {
+            "count": len(self.latencies),
+            "mean": statistics.mean(self.latencies),
+            "median": statistics.median(self.latencies),
+            "max": max(self.latencies),
+            "polls": self.polls,
+        }
+
+
+@functools.lru_cache(maxsize=1)
+def _get_default_async_humanlayer():
+    """Get default AsyncHumanLayer instance."""
+    return AsyncHumanLayer(verbose=True)
+
+
+@functools.lru_cache(maxsize=1)
+def get_default_approval_waiter() -> ApprovalWaiter:
+    """Shared waiter, so every ahitl_validation call is served by the same poller."""
+    return ApprovalWaiter()
@@ -4,23 +4,52 @@ Composable decorators for batch LLM classification with human-in-the-loop valida
 This module provides decorators that can be composed with existing Mirascope decorators:
 - @batch/@abatch: Enables batch processing of items through LLM functions
 - @hitl_validation/@ahitl_validation: Adds human-in-the-loop validation to classification results
+- @batched_hitl_validation: Classifies every batch, then asks for a single human review of all of them
 """
 
+import asyncio
+import concurrent.futures
+import contextvars
 import functools
+import re
 from functools import reduce, wraps
-from typing import Any, Callable, Optional, TypeVar, TypeAlias
+from collections import Counter
+from typing import Any, Awaitable, Callable, Hashable, Optional, TypeVar, TypeAlias
 from humanlayer import HumanLayer, FunctionCallSpec, FunctionCallStatus, FunctionCall
+import lilypad
 import time
 
+from automations.approvals import BACKOFF, INITIAL_INTERVAL, ApprovalWaiter, get_default_approval_waiter
+
 JSON: TypeAlias = dict[str, "JSON"] | list["JSON"] | str | int | float | bool | None
 
 T = TypeVar('T')  # Input item type
 R = TypeVar('R')  # Response/classification type
 
+# The blocking path polls for its own call only, so backing off further (like
+# ApprovalWaiter does) would just delay noticing a decision
+SYNC_MAX_INTERVAL = 5.0  # seconds
+
+
+def _chunks(items: list[T], batch_size: int) -> list[list[T]]:
+    return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+
+def _run_batches(func: Callable[..., R], calls: list[tuple[list[T], dict]], args: tuple, max_workers: int) -> list[R]:
+    """Call `func(items, *args, **kwargs)` for each (items, kwargs), returning results in order."""
+    if max_workers <= 1 or len(calls) <= 1:
+        return [func(batch_items, *args, **kwargs) for batch_items, kwargs in calls]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(calls))) as executor:
+        # each batch runs in a copy of the caller's context so trace spans nest under it
+        futures = [executor.submit(contextvars.copy_context().run, func, batch_items, *args, **kwargs)
+                   for batch_items, kwargs in calls]
+        return [future.result() for future in futures]
+
 
 def batch(
     batch_size: int,
-    reduce_fn: Optional[Callable[[R, R], R]] = None
+    reduce_fn: Optional[Callable[[R, R], R]] = None,
+    max_workers: int = 1
 ) -> Callable:
     """
     Decorator that enables batch processing of items through a sync LLM function.
@@ -28,9 +57,11 @@ def batch(
     Args:
         batch_size: Maximum items per batch
         reduce_fn: Function that merges two results into one. Defaults to addition.
+        max_workers: Number of batches to run at once on a thread pool. Defaults to 1 (sequential).
+            Results are always reduced in input order.
     
     Example:
-        @batch(batch_size=5, reduce_fn=lambda a, b: a + b)
+        @batch(batch_size=5, reduce_fn=lambda a, b: a + b, max_workers=4)
         @llm.call(model="gpt-4", response_model=list[str])
         def classify_items(items: list[str]) -> list[str]:
             return items
@@ -44,12 +75,53 @@ def batch(
                 return func(items, *args, **kwargs)
             
             # Multi-batch case
-            results = []
-            for i in range(0, len(items), batch_size):
-                batch_items = items[i:i + batch_size]
-                batch_result = func(batch_items, *args, **kwargs)
-                results.append(batch_result)
+            results = _run_batches(func, [(batch_items, kwargs) for batch_items in _chunks(items, batch_size)],
+                                   args, max_workers)
+            return reduce(reduce_fn, results)
+        
+        return wrapper
+    return decorator
+
+
+def abatch(
+    batch_size: int,
+    reduce_fn: Optional[Callable[[R, R], R]] = None,
+    max_concurrency: int | None = None
+) -> Callable:
+    """
+    Decorator that enables batch processing of items through an async LLM function.
+    
+    Batches run concurrently with `asyncio.gather`; results are reduced in input order.
+    
+    Args:
+        batch_size: Maximum items per batch
+        reduce_fn: Function that merges two results into one. Defaults to addition.
+        max_concurrency: Maximum number of batches in flight at once. Defaults to no limit.
+    
+    Example:
+        @abatch(batch_size=5, reduce_fn=lambda a, b: a + b, max_concurrency=4)
+        @llm.call(model="gpt-4", response_model=list[str])
+        async def classify_items(items: list[str]) -> list[str]:
+            return items
+    """
+    if reduce_fn is None:
+        reduce_fn = lambda a, b: a + b # noqa: E731
+    
+    def decorator(func: Callable[[list[T]], Awaitable[R]]) -> Callable[[list[T]], Awaitable[R]]:
+        async def wrapper(items: list[T], *args, **kwargs) -> R:
+            if len(items) <= batch_size:
+                return await func(items, *args, **kwargs)
             
+            # Multi-batch case
+            semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+            async def run_batch(batch_items: list[T]) -> R:
+                if semaphore is None:
+                    return await func(batch_items, *args, **kwargs)
+                async with semaphore:
+                    return await func(batch_items, *args, **kwargs)
+
+            results = await asyncio.gather(*(run_batch(batch_items) for batch_items in _chunks(items, batch_size)))
             return reduce(reduce_fn, results)
         
         return wrapper
@@ -100,31 +172,241 @@ def hitl_validation(
     return decorator
 
 
+_BATCH_FEEDBACK = re.compile(r"^\s*batch\s+(\d+)\s*[:\-]\s*(.*)$", re.IGNORECASE | re.MULTILINE)
+
+
+def _parse_batch_feedback(comment: str | None, pending: list[int]) -> dict[int, str]:
+    """Map a reviewer's comment to {batch index: feedback}.
+
+    Lines like "batch 3: the newsletter should be archived" reject only the
+    batches they name (numbered from 1, as shown to the reviewer). A comment
+    that names no batch rejects every batch shown this round (`pending`) with
+    the whole comment; batches approved in earlier rounds are never re-run.
+    """
+    comment = comment or ""
+    feedback: dict[int, str] = {}
+    for match in _BATCH_FEEDBACK.finditer(comment):
+        index = int(match.group(1)) - 1
+        if index in pending:
+            feedback[index] = "\n".join(filter(None, [feedback.get(index), match.group(2).strip()]))
+    if not feedback:
+        return {index: comment for index in pending}
+    return feedback
+
+
+def batched_hitl_validation(
+    batch_size: int,
+    reduce_fn: Optional[Callable[[R, R], R]] = None,
+    max_steps: int = 3,
+    render_fn: Callable[[R], JSON] | None = None,
+    max_workers: int = 1,
+    hl_instance: Optional[Any] = None
+) -> Callable:
+    """
+    Decorator combining @batch and @hitl_validation with one human review per round.
+    
+    Every batch is classified first (concurrently, up to `max_workers`), then all of them
+    are sent in a single approval request, rendered as {"batch 1": ..., "batch 2": ...}.
+    If the reviewer rejects, only the batches named in the comment ("batch 2: ...", one per
+    line) are re-run with `prev_result` and `feedback`; a comment naming no batch re-runs
+    every batch shown that round. Later rounds only show the re-run batches.
+    
+    Args:
+        batch_size: Maximum items per batch
+        reduce_fn: Function that merges two results into one. Defaults to addition.
+        max_steps: Maximum number of human approval rounds
+        render_fn: Renders one batch's result for the reviewer
+        max_workers: Number of batches to run at once on a thread pool
+        hl_instance: HumanLayer instance (defaults to global)
+    
+    Example:
+        @batched_hitl_validation(batch_size=7, reduce_fn=lambda a, b: a + b, max_workers=8)
+        @llm.call(model="gpt-4", response_model=list[str])
+        def classify_with_approval(items: list[str], *, 
+                                   prev_result: list[str] = None, 
+                                   feedback: str = None) -> list[str]:
+            return items
+    """
+    if reduce_fn is None:
+        reduce_fn = lambda a, b: a + b # noqa: E731
+    if render_fn is None:
+        render_fn = lambda x: x # noqa: E731
+
+    def decorator(func: Callable[..., R]) -> Callable[..., R]:
+        def wrapper(items: list[T], *args, **kwargs) -> R:
+            if not items:
+                # nothing to review
+                return func(items, *args, **kwargs)
+            chunks = _chunks(items, batch_size)
+            calls = {index: kwargs for index in range(len(chunks))}
+            results: dict[int, R] = {}
+            for i in range(max_steps):
+                print(f"Attempt {i+1} of {max_steps} for human approval of {func.__name__} "
+                      f"({len(calls)} of {len(chunks)} batches)")
+                pending = sorted(calls)
+                outputs = _run_batches(func, [(chunks[index], calls[index]) for index in pending], args, max_workers)
+                results.update(zip(pending, outputs))
+
+                print(f"Getting approval for {func.__name__}")
+                approval = _get_approval_status(
+                    func.__name__,
+                    x={f"batch {index + 1}": render_fn(results[index]) for index in pending},
+                    hl_instance=hl_instance,
+                )
+                if approval.approved:
+                    return reduce(reduce_fn, [results[index] for index in range(len(chunks))])
+
+                # If rejected, re-run only the batches the feedback names
+                feedback = _parse_batch_feedback(approval.comment, pending)
+                calls = {
+                    index: {**kwargs, 'prev_result': results[index], 'feedback': batch_feedback}
+                    for index, batch_feedback in feedback.items()
+                }
+
+            raise ValueError(f"Failed to get human approval after {max_steps} attempts")
+        
+        return wrapper
+    return decorator
+
+
+def ahitl_validation(
+    max_steps: int = 3,
+    render_fn: Callable[[R], JSON] | None = None,
+    waiter: Optional[ApprovalWaiter] = None
+) -> Callable:
+    """
+    Decorator that adds human-in-the-loop validation to async classification results.
+    
+    Waiting doesn't block a thread: every pending approval is served by one shared
+    ApprovalWaiter poller (or resolved immediately by its webhook `notify`).
+    
+    Args:
+        max_steps: Maximum number of human approval rounds
+        render_fn: Renders the result for the approver
+        waiter: ApprovalWaiter to use (defaults to the shared one)
+    
+    Example:
+        @ahitl_validation(max_steps=2)
+        @llm.call(model="gpt-4", response_model=list[str])
+        async def classify_with_approval(items: list[str], *, 
+                                         prev_result: list[str] = None, 
+                                         feedback: str = None) -> list[str]:
+            return items
+    """
+    if render_fn is None:
+        render_fn = lambda x: x # noqa: E731
+
+    def decorator(func: Callable[..., Awaitable[R]]) -> Callable[..., Awaitable[R]]:
+        async def wrapper(*args, **kwargs) -> R:
+            approvals = waiter or get_default_approval_waiter()
+            for i in range(max_steps):
+                print(f"Attempt {i+1} of {max_steps} for human approval of {func.__name__}")
+                result = await func(*args, **kwargs)
+                print(f"Getting approval for {func.__name__}")
+                with lilypad.span(f"hitl_approval.{func.__name__}") as span:
+                    start = time.perf_counter()
+                    approval = await approvals.request(func.__name__, x=render_fn(result))
+                    span.metadata(**{
+                        "hitl.attempt": i + 1,
+                        "hitl.approved": bool(approval.approved),
+                        "hitl.approval_latency_s": time.perf_counter() - start,
+                    })
+                if approval.approved:
+                    return result
+
+                # If rejected, add feedback for next iteration
+                kwargs['prev_result'] = result
+                kwargs['feedback'] = approval.comment
+                    
+            raise ValueError(f"Failed to get human approval after {max_steps} attempts")
+        
+        return wrapper
+    return decorator
+
+
+def _decided(votes: list[Counter], remaining: int) -> bool:
+    """True when no position's leading vote can be overturned (or tied) by `remaining` more samples."""
+    for counts in votes:
+        top = counts.most_common(2) + [(None, 0)]
+        if top[0][1] <= top[1][1] + remaining:
+            return False
+    return True
+
+
+def _samples_to_decide(votes: list[Counter], remaining: int) -> int:
+    """Fewest extra samples that could settle every position if they all agreed with its leader."""
+    needed = 1
+    for counts in votes:
+        top = counts.most_common(2) + [(None, 0), (None, 0)]
+        leader, runner_up = top[0][1], top[1][1]
+        needed = max(needed, (runner_up + remaining - leader) // 2 + 1)
+    return min(needed, remaining)
+
+
 def self_consistency(
     k: int,
-    aggregate_fn: Callable[[list[R]], R]
+    aggregate_fn: Callable[[list[R]], R],
+    vote_fn: Callable[[R], list[Hashable]] | None = None,
+    early_exit: bool = False,
+    max_workers: int | None = None
 ) -> Callable:
     """
     Decorator that calls the function k times and aggregates results for self-consistency.
     
+    Samples run concurrently on a thread pool. With `early_exit`, they are drawn in rounds
+    and sampling stops as soon as the remaining samples could no longer change the majority
+    vote (e.g. the first 2 of k=3 agree), so only the calls that can matter are made.
+    The number of samples, calls saved and latency are recorded on a lilypad span.
+    
     Args:
         k: Number of times to call the function
-        aggregate_fn: Function that combines k results into a single result
+        aggregate_fn: Function that combines the results into a single result
+        vote_fn: Maps one result to its votes, one per classified item (required for early_exit)
+        early_exit: Stop once the majority vote for every item is decided
+        max_workers: Maximum concurrent calls. Defaults to k.
     
     Example:
-        @self_consistency(k=3, aggregate_fn=lambda results: max(set(results), key=results.count))
+        @self_consistency(k=3, aggregate_fn=lambda results: max(set(results), key=results.count),
+                          vote_fn=lambda result: [result], early_exit=True)
         @llm.call(model="gpt-4", response_model=str)
         def classify_item(item: str) -> str:
             return "classification"
     """
+    if early_exit and vote_fn is None:
+        raise ValueError("early_exit requires a vote_fn")
+
     def decorator(func: Callable[..., R]) -> Callable[..., R]:
         def wrapper(*args, **kwargs) -> R:
-            print(f"Running {func.__name__} {k} times for self-consistency")
-            results = []
-            for _ in range(k):
-                result = func(*args, **kwargs)
-                results.append(result)
-            
+            print(f"Running {func.__name__} up to {k} times for self-consistency")
+            with lilypad.span(f"self_consistency.{func.__name__}") as span:
+                start = time.perf_counter()
+                results = []
+                with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers or k) as executor:
+                    def sample(n: int) -> list[R]:
+                        futures = [executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+                                   for _ in range(n)]
+                        return [future.result() for future in futures]
+
+                    if not early_exit:
+                        results = sample(k)
+                    else:
+                        # the first round is the smallest that could produce a majority
+                        results = sample(k // 2 + 1)
+                        while len(results) < k:
+                            votes = [Counter(position) for position in zip(*map(vote_fn, results))]
+                            remaining = k - len(results)
+                            if _decided(votes, remaining):
+                                break
+                            results += sample(_samples_to_decide(votes, remaining))
+
+                span.metadata(**{
+                    "self_consistency.k": k,
+                    "self_consistency.samples": len(results),
+                    "self_consistency.calls_saved": k - len(results),
+                    "self_consistency.latency_s": time.perf_counter() - start,
+                })
+            if len(results) < k:
+                print(f"Majority decided after {len(results)} of {k} samples for {func.__name__}")
             return aggregate_fn(results)
         
         return wrapper
@@ -139,10 +421,12 @@ def _get_approval_status(name: str, *, hl_instance: HumanLayer | None = None, **
             kwargs=kwargs,
         ),
     )
-    # loop until the call is approved
+    # poll with exponential backoff, capped at SYNC_MAX_INTERVAL, until the call is approved or rejected
+    interval = INITIAL_INTERVAL
     while (not call.status) or (call.status.approved is None):
         print(f"Waiting for approval of {name}, id: {call.call_id}")
-        time.sleep(5)
+        time.sleep(interval)
+        interval = min(interval * BACKOFF, SYNC_MAX_INTERVAL)
         call = hl.get_function_call(call_id=call.call_id)
     
     return call.status
@@ -0,0 +1,326 @@
+"""
+Cheap pre-classification ahead of the LLM email categorizer.
+
+Some of the categorizer's own rules can be decided from a thread's headers
+and snippet alone: if I sent the last message (an unsent draft, such as one
+`process_inbox` wrote, doesn't count), the thread is archived, and
+so are reminders, mail from no-reply senders and promotions. On top of those
+rules, an optional TF-IDF + logistic regression model (scikit-learn, see the
+`prefilter` extra) is trained on past human-approved classifications and
+decides the threads it is confident about. Only the remaining, ambiguous
+threads are sent to the LLM.
+
+Rules only ever archive. The model can also choose `draft_reply`, but only
+at `CONFIDENCE` or above. Decisions made here are printed along with the
+rule that made them and sent for human approval alongside the LLM's
+review; a rejected decision sends its thread to the LLM. Skipping that
+approval (`auto_approve`) is opt-in.
+
+    prefilter = EmailPrefilter(model=PrefilterModel.from_examples(load_examples()))
+    classify = prefilter.wrap(categorize_gmail_emails, metadata)
+    response = classify(threads)
+    prefilter.stats()  # includes the fraction of LLM calls avoided
+"""
+
+import concurrent.futures
+import contextvars
+import json
+import os
+import re
+import sys
+from collections import Counter
+from typing import Callable
+
+from automations.decorators import _get_approval_status
+from automations.gmail_batch import get_threads
+from automations.gmail_categorization import BATCH_SIZE, GmailClassification, GmailClassificationResponse
+from automations.gmail_types import GmailThreadHeader, GmailThreadMetadata
+
+DEFAULT_EXAMPLES_PATH = os.path.join(os.environ.get("HOME", "."), ".gmail-mcp", "approved_classifications.jsonl")
+CONFIDENCE = 0.95  # the model's minimum probability for a decision
+MIN_EXAMPLES = 50  # per class, before the model is trained at all
+
+_REMINDER = re.compile(r"\breminder\b|\bstarts (?:soon|in \d+)", re.IGNORECASE)
+_NO_REPLY = re.compile(r"\b(?:no-?reply|do-?not-?reply|notifications?|mailer-daemon)@", re.IGNORECASE)
+_BULK_LABELS = {"CATEGORY_PROMOTIONS", "CATEGORY_SOCIAL"}
+_EMAIL_FEEDBACK = re.compile(r"^\s*email\s+(\d+)\s*[:\-]", re.IGNORECASE | re.MULTILINE)
+
+
+def _already_replied(m: GmailThreadMetadata) -> str | None:
+    if "SENT" in m.labels:
+        return "I sent the last message in this thread"
+
+
+def _reminder(m: GmailThreadMetadata) -> str | None:
+    if _REMINDER.search(m.subject) or _REMINDER.search(m.snippet):
+        return "Reminder emails are always archived"
+
+
+def _no_reply_sender(m: GmailThreadMetadata) -> str | None:
+    if _NO_REPLY.search(m.sender):
+        return "Sent from a no-reply address, so there is no human on the other end"
+
+
+def _bulk(m: GmailThreadMetadata) -> str | None:
+    if _BULK_LABELS & set(m.labels):
+        return "Promotional or social notification"
+
+
+# (name, rule); each returns the reason to archive, or None. First match wins.
+RULES: list[tuple[str, Callable[[GmailThreadMetadata], str | None]]] = [
+    ("already_replied", _already_replied),
+    ("reminder", _reminder),
+    ("no_reply_sender", _no_reply_sender),
+    ("bulk", _bulk),
+]
+
+
+def match_rule(m: GmailThreadMetadata, rules=RULES) -> tuple[str, str] | None:
+    """(rule name, reason) of the first rule that archives the thread, if any."""
+    for name, rule in rules:
+        reason = rule(m)
+        if reason:
+            return name, reason
+    return None
+
+
+def _last_message(thread: dict) -> dict | None:
+    """The thread's last message that isn't a draft (Gmail lists drafts among a thread's messages)."""
+    messages = [m for m in thread.get('messages', []) if 'DRAFT' not in m.get('labelIds', [])]
+    return messages[-1] if messages else None
+
+
+def thread_metadata(thread: dict) -> GmailThreadMetadata:
+    """Map a `threads.get` response (any format with headers) to GmailThreadMetadata.
+
+    Describes the last message that isn't a draft.
+    """
+    last_message = _last_message(thread)
+    headers = {h['name'].lower(): h['value'] for h in last_message.get('payload', {}).get('headers', [])}
+    return GmailThreadMetadata(
+        id=thread['id'],
+        sender=headers.get('from', ''),
+        subject=headers.get('subject', ''),
+        snippet=last_message.get('snippet', ''),
+        labels=last_message.get('labelIds', []),
+    )
+
+
+def fetch_thread_metadata(service, thread_ids: list[str]) -> dict[str, GmailThreadMetadata]:
+    """Headers and labels of the last message of each thread, in batched requests.
+
+    Threads that fail to load, or only hold drafts, are left out (and so go to the LLM).
+    """
+    results = get_threads(service, thread_ids, format='metadata', metadataHeaders=['From', 'Subject'])
+    return {thread_id: thread_metadata(result) for thread_id, result in results.items()
+            if not isinstance(result, Exception) and _last_message(result)}
+
+
+def _text(m: GmailThreadMetadata) -> str:
+    return f"{m.sender}\n{m.subject}\n{m.snippet}"
+
+
+def load_examples(path: str = DEFAULT_EXAMPLES_PATH) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def record_examples(response: GmailClassificationResponse, metadata: dict[str, GmailThreadMetadata],
+                    path: str = DEFAULT_EXAMPLES_PATH) -> None:
+    """Append human-approved classifications as training examples for the model."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        for email, classification in zip(response.emails, response.classifications):
+            m = metadata.get(email.id) or GmailThreadMetadata(
+                id=email.id, sender="", subject="", snippet=email.snippet, labels=[])
+            f.write(json.dumps({**m.model_dump(), "classification": classification.classification}) + "\n")
+
+
+class PrefilterModel:
+    """TF-IDF + logistic regression over sender, subject and snippet."""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    @classmethod
+    def from_examples(cls, examples: list[dict]) -> "PrefilterModel | None":
+        """Train on recorded examples; None without scikit-learn or enough examples of each class."""
+        counts = Counter(e["classification"] for e in examples)
+        if len(counts) < 2 or min(counts.values()) < MIN_EXAMPLES:
+            return None
+        try:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            from sklearn.linear_model import LogisticRegression
+            from sklearn.pipeline import make_pipeline
+        except ImportError:
+            print("scikit-learn is not installed; the email prefilter only uses its rules")
+            return None
+        pipeline = make_pipeline(
+            TfidfVectorizer(ngram_range=(1, 2), min_df=2, sublinear_tf=True),
+            LogisticRegression(max_iter=1000, class_weight="balanced"),
+        )
+        pipeline.fit([_text(GmailThreadMetadata(**e)) for e in examples], [e["classification"] for e in examples])
+        return cls(pipeline)
+
+    def predict(self, metadata: list[GmailThreadMetadata]) -> list[tuple[str, float]]:
+        """(classification, probability) for each thread."""
+        probabilities = self.pipeline.predict_proba([_text(m) for m in metadata])
+        classes = self.pipeline.classes_
+        return [(classes[row.argmax()], float(row.max())) for row in probabilities]
+
+
+class EmailPrefilter:
+    def __init__(self, model: PrefilterModel | None = None, confidence: float = CONFIDENCE, rules=RULES,
+                 auto_approve: bool = False, hl_instance=None):
+        self.model = model
+        self.confidence = confidence
+        self.rules = rules
+        self.auto_approve = auto_approve
+        self.hl_instance = hl_instance
+        self._counts = Counter()
+
+    def split(self, threads: list[GmailThreadHeader], metadata: dict[str, GmailThreadMetadata]
+              ) -> tuple[dict[str, GmailClassification], list[GmailThreadHeader]]:
+        """Decide what can be decided cheaply: ({thread id: classification}, threads left for the LLM)."""
+        decided = {}
+        undecided = []
+        for thread in threads:
+            m = metadata.get(thread.id)
+            if m is None:
+                continue
+            match = match_rule(m, self.rules)
+            if match:
+                name, reason = match
+                decided[thread.id] = GmailClassification(reason=reason, classification="archive")
+                self._counts[name] += 1
+            else:
+                undecided.append(m)
+        if self.model and undecided:
+            for m, (label, probability) in zip(undecided, self.model.predict(undecided)):
+                if probability >= self.confidence:
+                    decided[m.id] = GmailClassification(
+                        reason=f"Local model is {probability:.0%} sure", classification=label)
+                    self._counts["model"] += 1
+        ambiguous = [thread for thread in threads if thread.id not in decided]
+        self._counts["threads"] += len(threads)
+        self._counts["llm_threads"] += len(ambiguous)
+        # categorize_gmail_emails makes (up to k sampled) LLM calls per batch of BATCH_SIZE threads
+        self._counts["llm_batches_without_prefilter"] += -(-len(threads) // BATCH_SIZE)
+        self._counts["llm_batches"] += -(-len(ambiguous) // BATCH_SIZE)
+        return decided, ambiguous
+
+    def review(self, threads: list[GmailThreadHeader], decided: dict[str, GmailClassification]
+               ) -> list[GmailThreadHeader]:
+        """Ask a human to approve the prefilter's decisions; returns the threads whose decision was rejected.
+
+        Decisions are shown as {"email 1": ..., "email 2": ...}. A rejection whose
+        comment names emails ("email 2: ...", one per line) rejects only those;
+        otherwise it rejects all of them.
+        """
+        shown = [thread for thread in threads if thread.id in decided]
+        approval = _get_approval_status(
+            "prefilter_gmail_emails",
+            x={f"email {i + 1}": {"id": thread.id, "snippet": thread.snippet, **decided[thread.id].model_dump()}
+               for i, thread in enumerate(shown)},
+            hl_instance=self.hl_instance,
+        )
+        if approval.approved:
+            return []
+        named = {int(n) - 1 for n in _EMAIL_FEEDBACK.findall(approval.comment or "")}
+        rejected = [thread for i, thread in enumerate(shown) if i in named] or shown
+        self._counts["rejected"] += len(rejected)
+        self._counts["llm_threads"] += len(rejected)
+        self._counts["llm_batches"] += -(-len(rejected) // BATCH_SIZE)
+        return rejected
+
+    def wrap(self, classify: Callable[[list[GmailThreadHeader]], GmailClassificationResponse],
+             metadata: dict[str, GmailThreadMetadata], examples_path: str | None = DEFAULT_EXAMPLES_PATH):
+        """`classify`, but only called on the threads the prefilter can't decide.
+
+        Unless `auto_approve` is set, the prefilter's decisions go to a human
+        for approval, requested while `classify` runs; the threads whose
+        decision is rejected are classified by `classify` too. The LLM's
+        (human-approved) classifications are recorded to `examples_path` for
+        training the model next time.
+        """
+        def classify_and_record(threads: list[GmailThreadHeader]) -> GmailClassificationResponse:
+            response = classify(threads)
+            if examples_path:
+                record_examples(response, metadata, examples_path)
+            return response
+
+        def classify_with_prefilter(threads: list[GmailThreadHeader]) -> GmailClassificationResponse:
+            decided, ambiguous = self.split(threads, metadata)
+            for thread in threads:
+                if thread.id in decided:
+                    print(f"Prefiltered thread {thread.id} as {decided[thread.id].classification}: "
+                          f"{decided[thread.id].reason}")
+            responses = []
+            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+                review = None
+                if decided and not self.auto_approve:
+                    review = executor.submit(contextvars.copy_context().run, self.review, threads, decided)
+                if ambiguous:
+                    responses.append(classify_and_record(ambiguous))
+                rejected = review.result() if review else []
+            if rejected:
+                print(f"Prefilter decisions rejected for {len(rejected)} emails; classifying them with the LLM")
+                responses.append(classify_and_record(rejected))
+            thinking = f"{len(decided) - len(rejected)} of {len(threads)} emails decided by the prefilter."
+            for response in responses:
+                decided |= {email.id: c for email, c in zip(response.emails, response.classifications)}
+                thinking += "\n\n" + response.thinking
+            return GmailClassificationResponse(
+                emails=threads, thinking=thinking, classifications=[decided[thread.id] for thread in threads])
+
+        return classify_with_prefilter
+
+    def stats(self) -> dict:
+        counts = self._counts
+        decided = counts["threads"] - counts["llm_threads"]
+        batches = counts["llm_batches_without_prefilter"]
+        return {
+            "threads": counts["threads"],
+            "prefiltered": decided,
+            "by_rule": {name: counts[name] for name, _ in self.rules if counts[name]},
+            "by_model": counts["model"],
+            "rejected": counts["rejected"],
+            "llm_threads": counts["llm_threads"],
+            "llm_calls_avoided": (batches - counts["llm_batches"]) / batches if batches else 0.0,
+        }
+
+
+def print_prefilter_report(stats: dict) -> None:
+    print(f"Prefilter decided {stats['prefiltered']} of {stats['threads']} emails "
+          f"(rules: {stats['by_rule']}, model: {stats['by_model']}, rejected on review: {stats['rejected']}); "
+          f"{stats['llm_calls_avoided']:.0%} of LLM calls avoided")
+
+
+def evaluate(examples: list[dict], folds: int = 5, confidence: float = CONFIDENCE) -> None:
+    """Cross-validated coverage and accuracy of the rules and the model on recorded examples."""
+    from sklearn.model_selection import StratifiedKFold
+
+    labels = [e["classification"] for e in examples]
+    metadata = [GmailThreadMetadata(**e) for e in examples]
+    ruled = {i for i, m in enumerate(metadata) if match_rule(m)}
+    correct = sum(labels[i] == "archive" for i in ruled)
+    print(f"rules: decided {len(ruled)}/{len(examples)}, accuracy {correct / max(len(ruled), 1):.1%}")
+
+    decided = correct = 0
+    for train, test in StratifiedKFold(folds, shuffle=True, random_state=0).split(metadata, labels):
+        model = PrefilterModel.from_examples([examples[i] for i in train])
+        if model is None:
+            print("not enough examples to train the model")
+            return
+        for i, (label, probability) in zip(test, model.predict([metadata[i] for i in test])):
+            if probability >= confidence and i not in ruled:
+                decided += 1
+                correct += label == labels[i]
+    print(f"model at {confidence:.0%}: decided {decided}/{len(examples) - len(ruled)} of the rest, "
+          f"accuracy {correct / max(decided, 1):.1%}")
+
+
+if __name__ == "__main__":
+    evaluate(load_examples(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_EXAMPLES_PATH))
@@ -0,0 +1,268 @@
+"""
+A local fake of the Gmail API for exercising the Gmail code offline.
+
+`fake_gmail_service()` returns a real `googleapiclient` discovery service
+(built from the bundled static Gmail discovery document), whose HTTP
+transport is `FakeGmailHttp` instead of Google. Requests, including
+multipart batch requests from `new_batch_http_request()`, are answered from
+an in-memory `FakeMailbox`, so the code under test runs unchanged.
+
+Supported: users.getProfile, users.threads.list/get/modify,
+users.drafts.create and users.history.list. `FakeGmailHttp.requests` counts
+HTTP round trips ("single" vs "batch") and `FakeMailbox.fail_next()` makes
+the next request for a thread fail (e.g. with 429); `FakeMailbox.reply()` adds
+a message to a thread, by default one the user sent.
+
+    mailbox = FakeMailbox()
+    thread_id = mailbox.add_thread("alice@example.com", "Lunch?", "Are you free on Friday?")
+    service = fake_gmail_service(mailbox)
+    service.users().threads().get(userId='me', id=thread_id).execute()
+"""
+
+import base64
+import email
+import json
+import re
+import threading
+import urllib.parse
+from collections import Counter
+from email.generator import Generator
+from email.mime.multipart import MIMEMultipart
+from email.mime.nonmultipart import MIMENonMultipart
+from email.parser import FeedParser
+from io import StringIO
+
+import httplib2
+from googleapiclient.discovery import build
+
+_ROUTES = [
+    ("GET", re.compile(r"/gmail/v1/users/me/profile$"), "get_profile"),
+    ("GET", re.compile(r"/gmail/v1/users/me/threads$"), "list_threads"),
+    ("GET", re.compile(r"/gmail/v1/users/me/threads/(?P<id>[^/]+)$"), "get_thread"),
+    ("POST", re.compile(r"/gmail/v1/users/me/threads/(?P<id>[^/]+)/modify$"), "modify_thread"),
+    ("POST", re.compile(r"/gmail/v1/users/me/drafts$"), "create_draft"),
+    ("GET", re.compile(r"/gmail/v1/users/me/history$"), "list_history"),
+]
+
+
+class FakeApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class FakeMailbox:
+    """In-memory threads, labels, drafts and history for one Gmail user."""
+
+    def __init__(self, address: str = "me@skylarbpayne.com"):
+        self.address = address
+        self.threads: dict[str, dict] = {}
+        self.drafts: list[dict] = []
+        self.history: list[dict] = []
+        self.history_id = 1000
+        self.oldest_history_id = 1000  # history.list 404s before this
+        self._failures: dict[str, list[int]] = {}
+        self._ids = 0
+        self._lock = threading.Lock()
+
+    def _next_id(self) -> str:
+        self._ids += 1
+        return f"{self._ids:016x}"
+
+    def _record(self, kind: str, message: dict, **extra) -> None:
+        self.history_id += 1
+        message["historyId"] = str(self.history_id)
+        self.threads[message["threadId"]]["historyId"] = str(self.history_id)
+        change = {"message": {"id": message["id"], "threadId": message["threadId"],
+                              "labelIds": list(message["labelIds"])}, **extra}
+        self.history.append({"id": str(self.history_id), kind: [change]})
+
+    def add_thread(self, sender: str, subject: str, body: str, labels=("INBOX", "UNREAD")) -> str:
+        """Deliver a new single-message thread; returns its id."""
+        with self._lock:
+            thread_id = self._next_id()
+            self.threads[thread_id] = {"id": thread_id, "historyId": "", "messages": []}
+            self._add_message(thread_id, sender, subject, body, list(labels))
+            return thread_id
+
+    def _add_message(self, thread_id: str, sender: str, subject: str, body: str, labels: list[str]) -> dict:
+        message = {
+            "id": self._next_id(),
+            "threadId": thread_id,
+            "labelIds": labels,
+            "snippet": body[:100],
+            "payload": {
+                "mimeType": "text/plain",
+                "headers": [{"name": "From", "value": sender}, {"name": "Subject", "value": subject}],
+                "body": {"data": base64.urlsafe_b64encode(body.encode()).decode()},
+            },
+        }
+        self.threads[thread_id]["messages"].append(message)
+        self._record("messagesAdded", message)
+        return message
+
+    def reply(self, thread_id: str, sender: str, body: str, labels=("SENT",)) -> None:
+        """Add a message to an existing thread (by default, one sent by the user)."""
+        with self._lock:
+            subject = self.threads[thread_id]["messages"][0]["payload"]["headers"][1]["value"]
+            self._add_message(thread_id, sender, f"Re: {subject}", body, list(labels))
+
+    def fail_next(self, thread_id: str, status: int = 429, times: int = 1) -> None:
+        """Make the next `times` requests that touch `thread_id` fail with `status`."""
+        self._failures.setdefault(thread_id, []).extend([status] * times)
+
+    def inbox(self) -> list[str]:
+        return [t["id"] for t in self._threads_with_label("INBOX")]
+
+    def _threads_with_label(self, label: str) -> list[dict]:
+        matching = [t for t in self.threads.values() if any(label in m["labelIds"] for m in t["messages"])]
+        return sorted(matching, key=lambda t: int(t["historyId"]), reverse=True)
+
+    def _thread(self, thread_id: str) -> dict:
+        if self._failures.get(thread_id):
+            raise FakeApiError(self._failures[thread_id].pop(0), "Injected failure")
+        if thread_id not in self.threads:
+            raise FakeApiError(404, "Requested entity was not found.")
+        return self.threads[thread_id]
+
+    # --- API methods, called by FakeGmailHttp
+
+    def get_profile(self, query: dict, body: dict) -> dict:
+        return {"emailAddress": self.address, "historyId": str(self.history_id)}
+
+    def list_threads(self, query: dict, body: dict) -> dict:
+        label = query.get("labelIds", ["INBOX"])[0]
+        if "in:inbox" in query.get("q", [""])[0]:
+            label = "INBOX"
+        threads = self._threads_with_label(label)
+        start = int(query.get("pageToken", ["0"])[0])
+        size = int(query.get("maxResults", ["100"])[0])
+        page = threads[start:start + size]
+        response = {
+            "threads": [{"id": t["id"], "snippet": t["messages"][-1]["snippet"], "historyId": t["historyId"]}
+                        for t in page],
+            "resultSizeEstimate": len(threads),
+        }
+        if start + size < len(threads):
+            response["nextPageToken"] = str(start + size)
+        return response
+
+    def get_thread(self, query: dict, body: dict, id: str) -> dict:
+        thread = json.loads(json.dumps(self._thread(id)))
+        format = query.get("format", ["full"])[0]
+        if format == "minimal":
+            for message in thread["messages"]:
+                message.pop("payload")
+        elif format == "metadata":
+            names = {name.lower() for name in query.get("metadataHeaders", [])}
+            for message in thread["messages"]:
+                headers = message["payload"]["headers"]
+                message["payload"] = {"mimeType": message["payload"]["mimeType"],
+                                      "headers": [h for h in headers if not names or h["name"].lower() in names]}
+        return thread
+
+    def modify_thread(self, query: dict, body: dict, id: str) -> dict:
+        thread = self._thread(id)
+        add, remove = body.get("addLabelIds", []), body.get("removeLabelIds", [])
+        for message in thread["messages"]:
+            removed = [label for label in remove if label in message["labelIds"]]
+            added = [label for label in add if label not in message["labelIds"]]
+            message["labelIds"] = [label for label in message["labelIds"] if label not in remove] + added
+            if removed:
+                self._record("labelsRemoved", message, labelIds=removed)
+            if added:
+                self._record("labelsAdded", message, labelIds=added)
+        return {"id": id, "historyId": thread["historyId"], "messages": thread["messages"]}
+
+    def create_draft(self, query: dict, body: dict) -> dict:
+        message = body["message"]
+        parsed = email.message_from_bytes(base64.urlsafe_b64decode(message["raw"]))
+        thread_id = message.get("threadId")
+        if thread_id:
+            self._thread(thread_id)
+        else:
+            thread_id = self._next_id()
+            self.threads[thread_id] = {"id": thread_id, "historyId": "", "messages": []}
+        draft_message = self._add_message(thread_id, parsed["From"] or self.address, parsed["Subject"] or "",
+                                          parsed.get_payload(), ["DRAFT"])
+        draft = {"id": f"r{self._next_id()}", "message": {"id": draft_message["id"], "threadId": thread_id,
+                                                           "labelIds": ["DRAFT"]}}
+        self.drafts.append({**draft, "to": parsed["To"], "subject": parsed["Subject"],
+                            "content": parsed.get_payload()})
+        return draft
+
+    def list_history(self, query: dict, body: dict) -> dict:
+        start = int(query["startHistoryId"][0])
+        if start < self.oldest_history_id:
+            raise FakeApiError(404, "Requested entity was not found.")
+        records = [r for r in self.history if int(r["id"]) > start]
+        offset = int(query.get("pageToken", ["0"])[0])
+        size = int(query.get("maxResults", ["100"])[0])
+        response = {"history": records[offset:offset + size], "historyId": str(self.history_id)}
+        if offset + size < len(records):
+            response["nextPageToken"] = str(offset + size)
+        return response
+
+    def handle(self, method: str, uri: str, body: str | None) -> tuple[int, dict]:
+        """Dispatch one API request; returns (status, JSON body)."""
+        parsed = urllib.parse.urlparse(uri)
+        query = urllib.parse.parse_qs(parsed.query)
+        payload = json.loads(body) if body else {}
+        for route_method, pattern, handler in _ROUTES:
+            match = pattern.search(parsed.path)
+            if match and method == route_method:
+                try:
+                    with self._lock:
+                        return 200, getattr(self, handler)(query, payload, **match.groupdict())
+                except FakeApiError as e:
+                    return e.status, {"error": {"code": e.status, "message": str(e)}}
+        return 404, {"error": {"code": 404, "message": f"No fake for {method} {parsed.path}"}}
+
+
+class FakeGmailHttp:
+    """httplib2.Http stand-in that answers Gmail API requests from a FakeMailbox."""
+
+    def __init__(self, mailbox: FakeMailbox):
+        self.mailbox = mailbox
+        self.requests = Counter()
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=None, connection_type=None):
+        if isinstance(body, bytes):
+            body = body.decode("utf-8")
+        if urllib.parse.urlparse(uri).path.split("/")[1] == "batch":
+            self.requests["batch"] += 1
+            return self._batch(body, headers or {})
+        self.requests["single"] += 1
+        status, payload = self.mailbox.handle(method, uri, body)
+        return httplib2.Response({"status": status, "content-type": "application/json"}), json.dumps(payload).encode()
+
+    def _batch(self, body: str, headers: dict):
+        content_type = {k.lower(): v for k, v in headers.items()}["content-type"]
+        parser = FeedParser()
+        parser.feed(f"content-type: {content_type}\r\n\r\n{body}")
+        response = MIMEMultipart("mixed")
+        for part in parser.close().get_payload():
+            request_line, _, rest = part.get_payload().partition("\n")
+            method, path, _ = request_line.strip().split(" ", 2)
+            part_body = rest.split("\r\n\r\n", 1)[1] if "\r\n\r\n" in rest else rest.split("\n\n", 1)[-1]
+            status, payload = self.mailbox.handle(method, "https://gmail.googleapis.com" + path,
+                                                  part_body.strip() or None)
+            reply = MIMENonMultipart("application", "http")
+            reply["Content-ID"] = "<response-" + part["Content-ID"][1:]
+            reply.set_payload(f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\n"
+                              f"Content-Type: application/json\r\n\r\n{json.dumps(payload)}")
+            response.attach(reply)
+        out = StringIO()
+        # HTTP framing needs CRLF line endings inside each part
+        Generator(out, mangle_from_=False).flatten(response, unixfrom=False, linesep="\r\n")
+        # the boundary and parts, without the outer message headers
+        content = out.getvalue().split("\r\n\r\n", 1)[1]
+        return (httplib2.Response({"status": 200,
+                                   "content-type": f'multipart/mixed; boundary="{response.get_boundary()}"'}),
+                content.encode())
+
+
+def fake_gmail_service(mailbox: FakeMailbox | None = None):
+    """A Gmail discovery service backed by `mailbox` (a new, empty one by default)."""
+    http = FakeGmailHttp(mailbox or FakeMailbox())
+    return build('gmail', 'v1', http=http, static_discovery=True, cache_discovery=False)
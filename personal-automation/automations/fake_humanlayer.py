@@ -0,0 +1,82 @@
+"""
+An in-memory stand-in for AsyncHumanLayer, for exercising approval flows offline.
+
+`FakeHumanLayer` implements the two calls the approval code uses
+(`create_function_call` and `get_function_call`) and keeps every call in
+memory. Decisions come from `decide()`, or automatically from a `respond`
+policy that returns (delay_seconds, approved, comment) for each request. If
+`webhook` is set, it is called with each decided call, like a HumanLayer
+webhook delivery.
+
+    uv run python -m automations.fake_humanlayer           # polling only
+    uv run python -m automations.fake_humanlayer --webhook # push + polling
+"""
+
+import argparse
+import asyncio
+import datetime
+import random
+from collections import Counter
+from typing import Callable
+
+from humanlayer import FunctionCall, FunctionCallSpec, FunctionCallStatus
+
+
+class FakeHumanLayer:
+    def __init__(
+        self,
+        respond: Callable[[FunctionCallSpec], tuple[float, bool, str | None]] | None = None,
+        webhook: Callable[[FunctionCall], object] | None = None,
+    ):
+        self.respond = respond
+        self.webhook = webhook
+        self.calls: dict[str, FunctionCall] = {}
+        self.requests = Counter()  # API calls by method, to compare polling strategies
+
+    async def create_function_call(self, spec: FunctionCallSpec, call_id: str | None = None) -> FunctionCall:
+        self.requests["create_function_call"] += 1
+        call_id = call_id or f"call-{len(self.calls) + 1}"
+        call = FunctionCall(
+            run_id="fake-run",
+            call_id=call_id,
+            spec=spec,
+            status=FunctionCallStatus(requested_at=datetime.datetime.now(datetime.timezone.utc)),
+        )
+        self.calls[call_id] = call
+        if self.respond is not None:
+            delay, approved, comment = self.respond(spec)
+            asyncio.get_running_loop().call_later(delay, self.decide, call_id, approved, comment)
+        return call.model_copy(deep=True)
+
+    async def get_function_call(self, call_id: str) -> FunctionCall:
+        self.requests["get_function_call"] += 1
+        return self.calls[call_id].model_copy(deep=True)
+
+    def decide(self, call_id: str, approved: bool, comment: str | None = None) -> None:
+        """Record the human's decision (and deliver the webhook, if any)."""
+        call = self.calls[call_id]
+        call.status.approved = approved
+        call.status.comment = comment
+        call.status.responded_at = datetime.datetime.now(datetime.timezone.utc)
+        if self.webhook is not None:
+            self.webhook(call.model_copy(deep=True))
+
+
+async def _demo(n: int, webhook: bool) -> None:
+    from automations.approvals import ApprovalWaiter
+
+    rng = random.Random(0)
+    hl = FakeHumanLayer(respond=lambda spec: (rng.uniform(0.5, 5.0), True, None))
+    waiter = ApprovalWaiter(hl, initial_interval=0.5, max_interval=4.0)
+    if webhook:
+        hl.webhook = waiter.notify
+    await asyncio.gather(*(waiter.request(f"task_{i}", x=i) for i in range(n)))
+    print(f"{n} approvals, one poller: {waiter.latency_stats()}, API calls: {dict(hl.requests)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wait on many fake approvals at once.")
+    parser.add_argument("-n", type=int, default=20, help="Number of concurrent approvals.")
+    parser.add_argument("--webhook", action="store_true", help="Deliver decisions by webhook too.")
+    args = parser.parse_args()
+    asyncio.run(_demo(args.n, args.webhook))
@@ -0,0 +1,109 @@
+"""
+Batched Gmail API calls.
+
+Many thread reads, label changes or draft creations are sent as Gmail HTTP
+batch requests (`service.new_batch_http_request()`, at most `BATCH_LIMIT`
+calls per batch) instead of one round trip each. Calls that fail with a
+rate-limit or server error are retried in a later batch with backoff; other
+errors are returned in place of the result, so one bad thread doesn't sink
+the rest.
+
+`googleapiclient` is blocking, so the `a*` variants run the batch in a worker
+thread (`asyncio.to_thread`) to keep the event loop free. The discovery
+service's HTTP transport isn't thread-safe, so those calls hold `_SERVICE_LOCK`.
+
+    threads = get_threads(service, thread_ids)                  # {id: thread or HttpError}
+    await aarchive_threads(service, thread_ids)
+"""
+
+import asyncio
+import threading
+import time
+from typing import Callable
+
+from googleapiclient.errors import HttpError
+
+BATCH_LIMIT = 50  # Gmail rejects larger batches with 429s, and recommends staying under this
+RETRY_STATUSES = {429, 500, 502, 503}
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 1.0  # seconds, doubled per attempt
+
+_SERVICE_LOCK = threading.Lock()
+
+
+def execute_batched(service, requests: dict[str, object]) -> dict[str, object]:
+    """Execute {key: HttpRequest} in batches; returns {key: response or HttpError}."""
+    results: dict[str, object] = {}
+    pending = dict(requests)
+    for attempt in range(MAX_ATTEMPTS):
+        retry = {}
+
+        def callback(request_id, response, exception):
+            if (isinstance(exception, HttpError) and exception.resp.status in RETRY_STATUSES
+                    and attempt < MAX_ATTEMPTS - 1):
+                retry[request_id] = pending[request_id]
+            else:
+                results[request_id] = exception if exception is not None else response
+
+        keys = list(pending)
+        for i in range(0, len(keys), BATCH_LIMIT):
+            batch = service.new_batch_http_request(callback=callback)
+            for key in keys[i:i + BATCH_LIMIT]:
+                batch.add(pending[key], request_id=key)
+            batch.execute()
+
+        if not retry:
+            break
+        print(f"Retrying {len(retry)} Gmail calls after rate-limit/server errors")
+        time.sleep(RETRY_BACKOFF * 2 ** attempt)
+        pending = retry
+    return {key: results[key] for key in requests}
+
+
+def get_threads(service, thread_ids: list[str], format: str = 'full', **params) -> dict[str, object]:
+    return execute_batched(service, {
+        thread_id: service.users().threads().get(userId='me', id=thread_id, format=format, **params)
+        for thread_id in thread_ids
+    })
+
+
+def modify_threads(service, thread_ids: list[str], body: dict) -> dict[str, object]:
+    return execute_batched(service, {
+        thread_id: service.users().threads().modify(userId='me', id=thread_id, body=body)
+        for thread_id in thread_ids
+    })
+
+
+def archive_threads(service, thread_ids: list[str]) -> dict[str, object]:
+    return modify_threads(service, thread_ids, {'removeLabelIds': ['INBOX']})
+
+
+def create_drafts(service, drafts: list[dict]) -> list[object]:
+    """Create drafts from `users.drafts.create` bodies; results are in input order."""
+    results = execute_batched(service, {
+        str(i): service.users().drafts().create(userId='me', body=body)
+        for i, body in enumerate(drafts)
+    })
+    return [results[str(i)] for i in range(len(drafts))]
+
+
+def _run_locked(fn: Callable, *args, **kwargs):
+    with _SERVICE_LOCK:
+        return fn(*args, **kwargs)
+
+
+async def run_blocking(fn: Callable, *args, **kwargs):
+    """Run a blocking Gmail client call in a worker thread, one at a time."""
+    return await asyncio.to_thread(_run_locked, fn, *args, **kwargs)
+
+
+async def aget_threads(service, thread_ids: list[str], format: str = 'full') -> dict[str, object]:
+    return await run_blocking(get_threads, service, thread_ids, format)
+
+
+async def aarchive_threads(service, thread_ids: list[str]) -> dict[str, object]:
+    return await run_blocking(archive_threads, service, thread_ids)
+
+
+async def acreate_drafts(service, drafts: list[dict]) -> list[object]:
+    return await run_blocking(create_drafts, service, drafts)
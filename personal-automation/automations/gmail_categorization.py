@@ -5,10 +5,12 @@ from typing import Literal, Annotated
 from automations.gmail_types import GmailThreadHeader
 from mirascope.retries.tenacity import collect_errors
 from tenacity import retry, stop_after_attempt
-from automations.decorators import batch, hitl_validation, self_consistency
+from automations.decorators import batched_hitl_validation, self_consistency
 import lilypad
 from collections import defaultdict
 
+BATCH_SIZE = 7  # emails per LLM call
+
 
 class GmailClassification(BaseModel):
     reason: str = Field(description="The reason for the classification.")
@@ -86,10 +88,12 @@ def _gmail_aggregate_fn(responses: list[GmailClassificationResponse]) -> GmailCl
                         for i, v in enumerate(votes)]
     )
 
+def _gmail_vote_fn(response: GmailClassificationResponse) -> list[str]:
+    return [c.classification for c in response.classifications]
+
 @lilypad.trace(versioning='automatic')
-@batch(batch_size=7, reduce_fn=_gmail_reduce_fn)
-@hitl_validation(max_steps=2)
-@self_consistency(k=3, aggregate_fn=_gmail_aggregate_fn)
+@batched_hitl_validation(batch_size=BATCH_SIZE, reduce_fn=_gmail_reduce_fn, max_steps=2, max_workers=16)
+@self_consistency(k=3, aggregate_fn=_gmail_aggregate_fn, vote_fn=_gmail_vote_fn, early_exit=True)
 @retry(stop=stop_after_attempt(3), after=collect_errors(ValidationError), reraise=True)
 @llm.call(provider="openai", model="gpt-4o-mini", response_model=GmailClassificationResponse)
 @prompt_template(_PROMPT_TEMPLATE)
@@ -0,0 +1,179 @@
+"""
+Incremental Gmail inbox sync.
+
+The first sync pages through every inbox thread (`threads.list` +
+`nextPageToken`) and stores the headers in a local SQLite database along
+with the mailbox's `historyId`. Later syncs call `users.history.list` from
+that `historyId` and only re-fetch the threads that changed (in batched
+requests), so a repeated triage run costs a few API calls instead of a full
+listing. If the stored `historyId` is too old (Gmail answers 404), it falls
+back to a full sync.
+
+    store = GmailSyncStore()
+    result = sync_inbox(get_gmail_service(), store)
+    threads = store.inbox_threads()
+"""
+
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+
+from googleapiclient.errors import HttpError
+
+from automations.gmail_batch import BATCH_LIMIT, get_threads
+from automations.gmail_types import GmailThreadHeader
+
+DEFAULT_DB_PATH = os.path.join(os.environ.get("HOME", "."), ".gmail-mcp", "sync.db")
+INBOX_LABEL = "INBOX"
+PAGE_SIZE = 500  # the maximum threads.list and history.list allow
+
+
+@dataclass
+class SyncResult:
+    mode: str  # "full" or "incremental"
+    api_calls: int
+    updated: int  # threads added to or refreshed in the inbox
+    removed: int  # threads no longer in the inbox
+    history_id: str
+
+
+class GmailSyncStore:
+    """SQLite store of inbox thread headers and the last synced historyId."""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS threads ("
+                "id TEXT PRIMARY KEY, snippet TEXT NOT NULL, history_id INTEGER NOT NULL)"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def get_history_id(self) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM state WHERE key = 'history_id'").fetchone()
+        return row[0] if row else None
+
+    def history_ids(self, thread_ids: list[str]) -> dict[str, str]:
+        """{thread id: historyId} for the given threads that are in the inbox."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, history_id FROM threads WHERE id IN ({','.join('?' * len(thread_ids))})", thread_ids,
+            ).fetchall()
+        return {thread_id: str(history_id) for thread_id, history_id in rows}
+
+    def inbox_threads(self) -> list[GmailThreadHeader]:
+        """Inbox threads, most recently changed first (the order threads.list uses)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT id, snippet, history_id FROM threads ORDER BY history_id DESC").fetchall()
+        return [GmailThreadHeader(id=id, snippet=snippet, historyId=str(history_id)) for id, snippet, history_id in rows]
+
+    def replace_all(self, threads: list[GmailThreadHeader], history_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM threads")
+            self._upsert(threads)
+            self._set_history_id(history_id)
+
+    def apply_changes(self, updated: list[GmailThreadHeader], removed: list[str], history_id: str) -> None:
+        with self._lock, self._conn:
+            self._upsert(updated)
+            self._conn.executemany("DELETE FROM threads WHERE id = ?", [(thread_id,) for thread_id in removed])
+            self._set_history_id(history_id)
+
+    def _upsert(self, threads: list[GmailThreadHeader]) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO threads (id, snippet, history_id) VALUES (?, ?, ?)",
+            [(t.id, t.snippet, int(t.historyId)) for t in threads],
+        )
+
+    def _set_history_id(self, history_id: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES ('history_id', ?)", (history_id,))
+
+
+def full_sync(service, store: GmailSyncStore) -> SyncResult:
+    # read the mailbox historyId first, so changes made while we page are picked up next time
+    history_id = service.users().getProfile(userId='me').execute()['historyId']
+    api_calls = 1
+    threads, page_token = [], None
+    while True:
+        response = service.users().threads().list(
+            userId='me', labelIds=[INBOX_LABEL], maxResults=PAGE_SIZE, pageToken=page_token,
+        ).execute()
+        api_calls += 1
+        threads += [GmailThreadHeader(**thread) for thread in response.get('threads', [])]
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+    store.replace_all(threads, history_id)
+    return SyncResult(mode="full", api_calls=api_calls, updated=len(threads), removed=0, history_id=history_id)
+
+
+def _changed_thread_ids(history: list[dict]) -> set[str]:
+    thread_ids = set()
+    for record in history:
+        for key in ("messagesAdded", "messagesDeleted", "labelsAdded", "labelsRemoved"):
+            for change in record.get(key, []):
+                thread_ids.add(change['message']['threadId'])
+    return thread_ids
+
+
+def incremental_sync(service, store: GmailSyncStore) -> SyncResult:
+    """Apply the changes since the stored historyId; falls back to a full sync if it has expired."""
+    start_history_id = store.get_history_id()
+    if start_history_id is None:
+        return full_sync(service, store)
+
+    history, page_token, api_calls = [], None, 0
+    try:
+        while True:
+            response = service.users().history().list(
+                userId='me', startHistoryId=start_history_id, maxResults=PAGE_SIZE, pageToken=page_token,
+                historyTypes=["messageAdded", "messageDeleted", "labelAdded", "labelRemoved"],
+            ).execute()
+            api_calls += 1
+            history += response.get('history', [])
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+    except HttpError as e:
+        if e.resp.status != 404:
+            raise
+        # the historyId is too old for Gmail to replay; start over
+        result = full_sync(service, store)
+        result.api_calls += api_calls + 1
+        return result
+    history_id = response.get('historyId', start_history_id)
+
+    updated, removed = [], []
+    changed = sorted(_changed_thread_ids(history))
+    api_calls += -(-len(changed) // BATCH_LIMIT)  # one HTTP round trip per batch
+    for thread_id, thread in get_threads(service, changed, format='minimal').items():
+        if isinstance(thread, HttpError):
+            if thread.resp.status != 404:
+                raise thread
+            removed.append(thread_id)  # deleted
+            continue
+        if any(INBOX_LABEL in message.get('labelIds', []) for message in thread.get('messages', [])):
+            updated.append(GmailThreadHeader(
+                id=thread['id'],
+                snippet=thread.get('snippet') or thread['messages'][-1].get('snippet', ''),
+                historyId=thread['historyId'],
+            ))
+        else:
+            removed.append(thread_id)  # archived
+    store.apply_changes(updated, removed, history_id)
+    return SyncResult(mode="incremental", api_calls=api_calls, updated=len(updated), removed=len(removed),
+                      history_id=history_id)
+
+
+def sync_inbox(service, store: GmailSyncStore, full: bool = False) -> SyncResult:
+    """Bring `store` up to date with the Gmail inbox, incrementally when possible."""
+    result = full_sync(service, store) if full else incremental_sync(service, store)
+    print(f"Gmail {result.mode} sync: {result.updated} updated, {result.removed} removed, "
+          f"{result.api_calls} API calls")
+    return result
@@ -11,4 +11,12 @@ class GmailThread(BaseModel):
     id: str = Field(description="The ID of the email thread.")
     reply_email: str = Field(description="The email address of the last sender.")
     reply_subject: str = Field(description="The subject of the email.")
-    reply_content: str = Field(description="The content of the email as simple text.")
\ No newline at end of file
+    reply_content: str = Field(description="The content of the email as simple text.")
+
+
+class GmailThreadMetadata(BaseModel):
+    id: str = Field(description="The ID of the email thread.")
+    sender: str = Field(description="The From header of the last message.")
+    subject: str = Field(description="The subject of the last message.")
+    snippet: str = Field(description="The snippet of the last message.")
+    labels: list[str] = Field(description="The label IDs of the last message.")
@@ -9,10 +9,17 @@ import base64
 from email.message import EmailMessage
 from automations.gmail_categorization import categorize_gmail_emails, draft_reply
 from automations.gmail_types import GmailThreadHeader, GmailThread
+from automations.gmail_sync import GmailSyncStore, sync_inbox
+from automations.email_prefilter import EmailPrefilter, PrefilterModel, fetch_thread_metadata, load_examples, print_prefilter_report
+from automations.gmail_batch import aarchive_threads, acreate_drafts, aget_threads, run_blocking
+from automations.inbox_pipeline import DRAFT_CONCURRENCY, run_inbox_pipeline
+from automations.thread_cache import ThreadCache
 
 
 mcp = FastMCP('Gmail')
 
+MY_EMAIL = 'me@skylarbpayne.com'
+
 SCOPES = [
     'https://www.googleapis.com/auth/gmail.modify',
     'https://www.googleapis.com/auth/gmail.compose',
@@ -65,12 +72,22 @@ def get_gmail_service():
     return build('gmail', 'v1', credentials=creds)
 
 
-# WARNING: this api has pagination we are not using, so you might not get all the results!
+@functools.lru_cache(maxsize=1)
+def get_sync_store() -> GmailSyncStore:
+    return GmailSyncStore()
+
+
+@functools.lru_cache(maxsize=1)
+def get_thread_cache() -> ThreadCache:
+    return ThreadCache()
+
+
 @mcp.tool()
-async def get_inbox_threads() -> list[GmailThreadHeader]:
-    service = get_gmail_service()
-    results = service.users().threads().list(userId='me', q="in:inbox").execute()
-    return [GmailThreadHeader(**thread) for thread in results.get('threads', [])]
+async def get_inbox_threads(full_sync: bool = False) -> list[GmailThreadHeader]:
+    """All inbox threads. Only changes since the last call are fetched, unless `full_sync` is set."""
+    store = get_sync_store()
+    await run_blocking(sync_inbox, get_gmail_service(), store, full=full_sync)
+    return store.inbox_threads()
 
 
 def _extract_text_from_payload(payload):
@@ -119,53 +136,149 @@ def _map_thread_to_gmail_thread(thread_data) -> GmailThread:
         reply_content=reply_content
     )
 
+async def _read_gmail_threads(thread_ids: list[str], sync: bool = True) -> dict[str, GmailThread | Exception]:
+    """Read threads, serving unchanged ones from the thread cache.
+
+    The inbox sync store knows each inbox thread's current historyId, so a
+    cached thread at that historyId is returned without calling Gmail. For
+    cached threads the store doesn't know, the current historyId comes from
+    a batched `format='minimal'` get. The rest are fetched in batches, parsed, and cached under the historyId of the
+    response. With `sync`, the store is first brought up to date (usually one
+    history.list call) so replies that arrived since the last sync aren't
+    missed; pass False right after a sync.
+    """
+    if sync:
+        await run_blocking(sync_inbox, get_gmail_service(), get_sync_store())
+    cache = get_thread_cache()
+    history_ids = get_sync_store().history_ids(thread_ids)
+    unknown = [thread_id for thread_id in cache.cached_ids(thread_ids) if thread_id not in history_ids]
+    if unknown:
+        # not in the inbox store (e.g. archived): a minimal get tells whether the cached copy is current
+        for thread_id, result in (await aget_threads(get_gmail_service(), unknown, format='minimal')).items():
+            if not isinstance(result, Exception):
+                history_ids[thread_id] = result['historyId']
+    threads = {}
+    for thread_id in thread_ids:
+        cached = cache.get(thread_id, history_ids.get(thread_id))
+        if cached is not None:
+            threads[thread_id] = cached
+    missing = [thread_id for thread_id in thread_ids if thread_id not in threads]
+    if missing:
+        for thread_id, result in (await aget_threads(get_gmail_service(), missing)).items():
+            if isinstance(result, Exception):
+                threads[thread_id] = result
+                continue
+            try:
+                threads[thread_id] = _map_thread_to_gmail_thread(result)
+            except ValueError as e:
+                threads[thread_id] = e
+                continue
+            cache.put(thread_id, result['historyId'], threads[thread_id])
+    return {thread_id: threads[thread_id] for thread_id in thread_ids}
+
+
 @mcp.tool()
 async def read_thread(threadId: str) -> GmailThread:
-    service = get_gmail_service()
-    results = service.users().threads().get(userId='me', id=threadId, format='full').execute()
-    return _map_thread_to_gmail_thread(results)
+    result = (await _read_gmail_threads([threadId]))[threadId]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+@mcp.tool()
+async def read_threads(threadIds: list[str]) -> list[GmailThread]:
+    """Read several threads with batched requests; raises if any of them failed."""
+    results = await _read_gmail_threads(threadIds)
+    for thread_id, result in results.items():
+        if isinstance(result, Exception):
+            raise ValueError(f"Failed to read thread {thread_id}: {result}")
+    return [results[thread_id] for thread_id in threadIds]
+
+
+@mcp.tool()
+async def thread_cache_stats() -> dict:
+    """Hit rate, size and evictions of the local thread cache."""
+    return get_thread_cache().stats()
 
 
 @mcp.tool()
 async def archive_thead(threadId: str):
     service = get_gmail_service()
-    service.users().threads().modify(userId='me', id=threadId, body={'removeLabelIds': ['INBOX']}).execute()
+    await run_blocking(service.users().threads().modify(userId='me', id=threadId, body={'removeLabelIds': ['INBOX']}).execute)
     return True
 
 
 @mcp.tool()
-async def write_draft_reply(threadId: str, to_email: str, subject: str, content: str):
-    service = get_gmail_service()
+async def archive_threads(threadIds: list[str]) -> list[str]:
+    """Archive several threads with batched requests; returns the ids that failed."""
+    results = await aarchive_threads(get_gmail_service(), threadIds)
+    return [thread_id for thread_id, result in results.items() if isinstance(result, Exception)]
+
+
+def _draft_body(threadId: str, to_email: str, subject: str, content: str) -> dict:
     message = EmailMessage()
     message.set_content(content)
 
     message['To'] = to_email
-    message['From'] = 'me@skylarbpayne.com'
+    message['From'] = MY_EMAIL
     message['Subject'] = subject
     
-    create_message = {
+    return {
         'message': {
             'threadId': threadId,
             'raw': base64.urlsafe_b64encode(message.as_bytes()).decode()
         }
     }
-    service.users().drafts().create(userId='me', body=create_message).execute()
+
+
+@mcp.tool()
+async def write_draft_reply(threadId: str, to_email: str, subject: str, content: str):
+    service = get_gmail_service()
+    create_message = _draft_body(threadId, to_email, subject, content)
+    await run_blocking(service.users().drafts().create(userId='me', body=create_message).execute)
     return True
         
 
+async def _draft_reply_body(thread: GmailThread) -> dict:
+    reply = await draft_reply(thread.reply_content)
+    return _draft_body(thread.id, thread.reply_email, thread.reply_subject, reply.content)
+
+
 @mcp.tool()
-async def process_inbox(max_emails: int | None = None):
+async def process_inbox(max_emails: int | None = None, classify_chunk_size: int | None = None,
+                        draft_concurrency: int = DRAFT_CONCURRENCY, prefilter: bool = True,
+                        prefilter_auto_approve: bool = False) -> dict:
+    """Triage the inbox: classify, then draft replies and archive concurrently.
+
+    Returns per-stage throughput and latency. Set `classify_chunk_size` to start
+    drafting before the whole inbox is classified (one human review per chunk).
+    With `prefilter`, emails that rules or a local model can decide from their
+    headers skip the LLM (see automations/email_prefilter.py). Their decisions
+    are still sent for human approval, unless `prefilter_auto_approve` is set.
+    """
     # Note: the `.fn` is due to how the @mcp.tool() decorator works.
     threads = await get_inbox_threads.fn()
     max_emails = max_emails or len(threads)
-    clf_response = categorize_gmail_emails(threads[:max_emails])
-    for email, classification in zip(clf_response.emails, clf_response.classifications):
-        if classification.classification == "draft_reply":
-            print(f"Drafting reply for thread {email.id}: {email.snippet}")
-            thread = await read_thread.fn(email.id)
-            reply = await draft_reply(thread.reply_content)
-            await write_draft_reply.fn(email.id, thread.reply_email, thread.reply_subject, reply.content)
-        elif classification.classification == "archive":
-            print(f"Archiving thread {email.id}: {email.snippet}")
-            await archive_thead.fn(email.id)
-    return True
\ No newline at end of file
+    threads = threads[:max_emails]
+    service = get_gmail_service()
+    classify = categorize_gmail_emails
+    if prefilter:
+        metadata = await run_blocking(fetch_thread_metadata, service, [thread.id for thread in threads])
+        email_prefilter = EmailPrefilter(model=PrefilterModel.from_examples(load_examples()),
+                                        auto_approve=prefilter_auto_approve)
+        classify = email_prefilter.wrap(categorize_gmail_emails, metadata)
+    report = await run_inbox_pipeline(
+        threads,
+        classify=classify,
+        # the inbox was synced just above, so the cache can be trusted as is
+        read_threads=functools.partial(_read_gmail_threads, sync=False),
+        draft_reply=_draft_reply_body,
+        write_drafts=lambda drafts: acreate_drafts(service, drafts),
+        archive_threads=lambda thread_ids: aarchive_threads(service, thread_ids),
+        classify_chunk_size=classify_chunk_size,
+        draft_concurrency=draft_concurrency,
+    )
+    if prefilter:
+        report["prefilter"] = email_prefilter.stats()
+        print_prefilter_report(report["prefilter"])
+    return report
@@ -0,0 +1,198 @@
+"""
+Pipelined inbox triage.
+
+`process_inbox` used to handle each email in turn. Here every step is an
+asyncio stage connected by bounded queues, so the stages overlap:
+
+    classify ──► read threads ──► draft workers (xN) ──► write drafts
+        └──────► archive
+
+Classification chunks are streamed downstream as soon as each one is
+approved. Reading, writing drafts and archiving are batchers: they gather
+up to `batch_size` items (waiting at most `linger` seconds for a batch to
+fill) and make one batched Gmail call. Drafting replies, the slow LLM step,
+runs on `draft_concurrency` workers. Every queue holds at most `queue_size`
+items, so a slow stage makes the ones feeding it wait instead of piling up
+work in memory.
+
+Each stage records items, calls, throughput and per-item latency (for a
+batch, the batch's duration) in a `StageStats`.
+"""
+
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from automations.gmail_types import GmailThread, GmailThreadHeader
+
+DRAFT_CONCURRENCY = 8
+QUEUE_SIZE = 100
+BATCH_SIZE = 50  # Gmail's per-batch limit
+BATCH_LINGER = 0.5  # seconds
+
+_DONE = object()  # end-of-stream marker
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    calls: int = 0
+    failures: int = 0
+    first_start: float | None = None
+    last_end: float | None = None
+    latencies: list[float] = field(default_factory=list)
+
+    def record(self, start: float, items: int = 1, failures: int = 0) -> None:
+        end = time.perf_counter()
+        self.first_start = start if self.first_start is None else min(self.first_start, start)
+        self.last_end = end if self.last_end is None else max(self.last_end, end)
+        self.items += items
+        self.calls += 1
+        self.failures += failures
+        self.latencies += [end - start] * items
+
+    def summary(self) -> dict:
+        if not self.calls:
+            return {"items": 0, "calls": 0}
+        elapsed = self.last_end - self.first_start
+        return {
+            "items": self.items,
+            "calls": self.calls,
+            "failures": self.failures,
+            "items_per_s": self.items / elapsed if elapsed > 0 else float("inf"),
+            "latency_mean_s": statistics.mean(self.latencies) if self.latencies else 0.0,
+            "latency_max_s": max(self.latencies, default=0.0),
+        }
+
+
+async def _batches(queue: asyncio.Queue, batch_size: int, linger: float):
+    """Yield lists of up to `batch_size` items from `queue` until `_DONE`."""
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await queue.get()
+        if item is _DONE:
+            return
+        batch, deadline = [item], loop.time() + linger
+        while len(batch) < batch_size:
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout=max(deadline - loop.time(), 0))
+            except asyncio.TimeoutError:
+                break
+            if item is _DONE:
+                yield batch
+                return
+            batch.append(item)
+        yield batch
+
+
+async def run_inbox_pipeline(
+    threads: list[GmailThreadHeader],
+    *,
+    classify: Callable[[list[GmailThreadHeader]], object],
+    read_threads: Callable[[list[str]], Awaitable[dict[str, GmailThread | Exception]]],
+    draft_reply: Callable[[GmailThread], Awaitable[dict]],
+    write_drafts: Callable[[list[dict]], Awaitable[list[object]]],
+    archive_threads: Callable[[list[str]], Awaitable[dict[str, object]]],
+    classify_chunk_size: int | None = None,
+    draft_concurrency: int = DRAFT_CONCURRENCY,
+    queue_size: int = QUEUE_SIZE,
+    batch_size: int = BATCH_SIZE,
+    linger: float = BATCH_LINGER,
+) -> dict[str, dict]:
+    """Triage `threads` and return per-stage stats.
+
+    `classify` is the blocking classifier (run in a worker thread) and gets
+    `classify_chunk_size` threads at a time (default: all, i.e. one human
+    review). `draft_reply` turns a thread into a `users.drafts.create` body.
+    Results of the batched calls that are exceptions count as failures.
+    """
+    stats = {name: StageStats(name) for name in ("classify", "read", "draft", "write", "archive")}
+    read_queue, draft_queue = asyncio.Queue(queue_size), asyncio.Queue(queue_size)
+    write_queue, archive_queue = asyncio.Queue(queue_size), asyncio.Queue(queue_size)
+    chunk_size = classify_chunk_size or max(len(threads), 1)
+
+    async def classify_stage():
+        for i in range(0, len(threads), chunk_size):
+            start = time.perf_counter()
+            response = await asyncio.to_thread(classify, threads[i:i + chunk_size])
+            stats["classify"].record(start, items=len(response.emails))
+            for email, classification in zip(response.emails, response.classifications):
+                if classification.classification == "draft_reply":
+                    print(f"Drafting reply for thread {email.id}: {email.snippet}")
+                    await read_queue.put(email.id)
+                elif classification.classification == "archive":
+                    print(f"Archiving thread {email.id}: {email.snippet}")
+                    await archive_queue.put(email.id)
+        await read_queue.put(_DONE)
+        await archive_queue.put(_DONE)
+
+    async def read_stage():
+        async for thread_ids in _batches(read_queue, batch_size, linger):
+            start = time.perf_counter()
+            results = await read_threads(thread_ids)
+            failed = {thread_id for thread_id, result in results.items() if isinstance(result, Exception)}
+            stats["read"].record(start, items=len(thread_ids), failures=len(failed))
+            for thread_id in failed:
+                print(f"Failed to read thread {thread_id}: {results[thread_id]}")
+            for thread_id in thread_ids:
+                if thread_id not in failed:
+                    await draft_queue.put(results[thread_id])
+        for _ in range(draft_concurrency):
+            await draft_queue.put(_DONE)
+
+    async def draft_worker():
+        while (thread := await draft_queue.get()) is not _DONE:
+            start = time.perf_counter()
+            try:
+                body = await draft_reply(thread)
+            except Exception as e:
+                print(f"Failed to draft a reply for thread {thread.id}: {e}")
+                stats["draft"].record(start, failures=1)
+                continue
+            stats["draft"].record(start)
+            await write_queue.put(body)
+
+    async def draft_stage():
+        await asyncio.gather(*(draft_worker() for _ in range(draft_concurrency)))
+        await write_queue.put(_DONE)
+
+    async def write_stage():
+        async for drafts in _batches(write_queue, batch_size, linger):
+            start = time.perf_counter()
+            results = await write_drafts(drafts)
+            failed = [result for result in results if isinstance(result, Exception)]
+            for result in failed:
+                print(f"Failed to write draft: {result}")
+            stats["write"].record(start, items=len(drafts), failures=len(failed))
+
+    async def archive_stage():
+        async for thread_ids in _batches(archive_queue, batch_size, linger):
+            start = time.perf_counter()
+            results = await archive_threads(thread_ids)
+            failed = [thread_id for thread_id, result in results.items() if isinstance(result, Exception)]
+            for thread_id in failed:
+                print(f"Failed to archive thread {thread_id}: {results[thread_id]}")
+            stats["archive"].record(start, items=len(thread_ids), failures=len(failed))
+
+    start = time.perf_counter()
+    # a stage that raises cancels the rest instead of leaving them waiting on its queue
+    async with asyncio.TaskGroup() as group:
+        for stage in (classify_stage, read_stage, draft_stage, write_stage, archive_stage):
+            group.create_task(stage())
+    report = {name: stage.summary() for name, stage in stats.items()}
+    report["total"] = {"items": len(threads), "seconds": time.perf_counter() - start}
+    print_pipeline_report(report)
+    return report
+
+
+def print_pipeline_report(report: dict[str, dict]) -> None:
+    print(f"{'stage':<8} {'items':>6} {'calls':>6} {'failed':>6} {'items/s':>8} {'mean s':>7} {'max s':>7}")
+    for name, s in report.items():
+        if name == "total" or not s.get("calls"):
+            continue
+        print(f"{name:<8} {s['items']:>6} {s['calls']:>6} {s['failures']:>6} {s['items_per_s']:>8.1f} "
+              f"{s['latency_mean_s']:>7.2f} {s['latency_max_s']:>7.2f}")
+    print(f"{report['total']['items']} emails in {report['total']['seconds']:.2f}s")
@@ -0,0 +1,157 @@
+"""
+Shared, long-lived MCP client sessions.
+
+Opening a `fastmcp.Client` means a new SSE connection plus the MCP
+initialize handshake, which is most of the cost of a small tool call.
+`MCPClientPool` keeps up to `size` sessions to one server open and spreads
+calls over them (an MCP session multiplexes concurrent requests, so a few
+sessions go a long way). A call that fails because its connection dropped
+reconnects that session and is retried once.
+
+Given the `FastMCP` server it runs in, the pool calls that server's tools
+(including those of mounted servers) in-process, through one long-lived
+client on fastmcp's in-memory transport (`Client(server)`).
+
+    pool = get_pool(SERVER_URL, server=mcp)
+    result = await pool.call_tool("gmail_process_inbox", {"max_emails": 5})
+    tool_client = ToolClient(pool)  # same interface as a Client
+"""
+
+import asyncio
+import contextlib
+import functools
+from collections import Counter
+
+import anyio
+import httpx
+from fastmcp import Client, FastMCP
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, Tool
+
+POOL_SIZE = 4
+# failures that mean the session is gone, rather than that the tool failed
+CONNECTION_ERRORS = (
+    httpx.TransportError,
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    ConnectionError,
+)
+
+
+def _connection_lost(e: Exception) -> bool:
+    return isinstance(e, CONNECTION_ERRORS) or (isinstance(e, McpError) and e.error.code == CONNECTION_CLOSED)
+
+
+class MCPClientPool:
+    def __init__(self, url: str, size: int = POOL_SIZE, server: FastMCP | None = None, **client_kwargs):
+        self.url = url
+        self.size = size
+        self.server = server
+        self._client_kwargs = client_kwargs
+        self._clients: list[Client | None] = [None] * size
+        self._locks = [asyncio.Lock() for _ in range(size)]
+        self._local: Client | None = None
+        self._local_lock = asyncio.Lock()
+        self._loop = None
+        self._next = 0
+        self._counts = Counter()
+
+    async def call_tool(self, name: str, arguments: dict | None = None):
+        """Same as `Client.call_tool`: the tool's content, or a ToolError."""
+        if self.server is not None and name in await self.server.get_tools():
+            self._counts["in_process"] += 1
+            client = await self._local_session()
+            return await client.call_tool(name, arguments or {})
+        return await self._call(lambda client: client.call_tool(name, arguments or {}))
+
+    async def list_tools(self) -> list[Tool]:
+        return await self._call(lambda client: client.list_tools())
+
+    async def _call(self, fn):
+        slot = self._next
+        self._next = (self._next + 1) % self.size
+        for attempt in range(2):
+            client = await self._session(slot)
+            try:
+                result = await fn(client)
+            except Exception as e:
+                if not _connection_lost(e):
+                    raise
+                await self._drop(slot, client)
+                if attempt:
+                    raise
+                print(f"MCP session to {self.url} failed ({e!r}); reconnecting")
+                self._counts["reconnects"] += 1
+                continue
+            self._counts["remote"] += 1
+            return result
+
+    def _check_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # sessions belong to the event loop that opened them
+            self._close_stale_sessions()
+            self._clients = [None] * self.size
+            self._locks = [asyncio.Lock() for _ in range(self.size)]
+            self._local = None
+            self._local_lock = asyncio.Lock()
+            self._loop = loop
+
+    async def _local_session(self) -> Client:
+        self._check_loop()
+        async with self._local_lock:
+            if self._local is None or not self._local.is_connected():
+                self._local = Client(self.server)
+                await self._local.__aenter__()
+            return self._local
+
+    async def _session(self, slot: int) -> Client:
+        self._check_loop()
+        async with self._locks[slot]:
+            client = self._clients[slot]
+            if client is None or not client.is_connected():
+                client = Client(self.url, **self._client_kwargs)
+                await client.__aenter__()
+                self._clients[slot] = client
+                self._counts["connects"] += 1
+            return client
+
+    async def _drop(self, slot: int, client: Client) -> None:
+        async with self._locks[slot]:
+            if self._clients[slot] is client:
+                self._clients[slot] = None
+        with contextlib.suppress(Exception):
+            await client.close()
+
+    def _close_stale_sessions(self) -> None:
+        """Close the sessions opened on a previous event loop, on that loop."""
+        stale = [client for client in self._clients + [self._local] if client is not None]
+        if not stale or self._loop is None:
+            return
+        if self._loop.is_running():
+            # e.g. a loop in another thread: close there, where the sessions run
+            for client in stale:
+                asyncio.run_coroutine_threadsafe(client.close(), self._loop)
+        # otherwise the loop has stopped, and asyncio.run cancelled the session
+        # tasks (closing their connections) on the way out
+
+    async def close(self) -> None:
+        self._check_loop()  # sessions from an earlier event loop are already gone
+        for slot, client in enumerate(self._clients):
+            if client is not None:
+                await self._drop(slot, client)
+        if self._local is not None:
+            client, self._local = self._local, None
+            with contextlib.suppress(Exception):
+                await client.close()
+
+    def stats(self) -> dict:
+        return {"connects": self._counts["connects"], "reconnects": self._counts["reconnects"],
+                "remote_calls": self._counts["remote"], "in_process_calls": self._counts["in_process"]}
+
+
+@functools.lru_cache(maxsize=None)
+def get_pool(url: str, server: FastMCP | None = None, size: int = POOL_SIZE) -> MCPClientPool:
+    """The process-wide pool for `url` (and, if given, the server it runs in)."""
+    return MCPClientPool(url, size=size, server=server)
@@ -1,9 +1,10 @@
-from fastmcp import FastMCP, Client
+from fastmcp import FastMCP
 import asyncio
 from dotenv import load_dotenv
 import lilypad
 import json
 from automations.utils import ToolClient
+from automations.mcp_pool import get_pool
 from automations.browsermcp import mcp as browser_mcp
 from automations.browser_tasks import run_browser_task, get_linkedin_analytics, LinkedInAnalytics
 from automations.config import SERVER_URL
@@ -31,24 +32,22 @@ async def summarize_linkedin_analytics() -> LinkedInAnalytics:
 
 @mcp.tool()
 async def weekly_review():
-    async with Client(SERVER_URL) as client:
-        tool_client = ToolClient(client)
-        # Note: we have max_emails=5 for purposes of a live demo!
-        await tool_client.gmail_process_inbox(max_emails=5)
-        res = await tool_client.summarize_linkedin_analytics()
-        return res
+    # these tools are mounted on this server, so the pool calls them in-process
+    tool_client = ToolClient(get_pool(SERVER_URL, server=mcp))
+    # Note: we have max_emails=5 for purposes of a live demo!
+    await tool_client.gmail_process_inbox(max_emails=5)
+    res = await tool_client.summarize_linkedin_analytics()
+    return res
 
 
 async def list_tools():
-    async with Client(SERVER_URL) as client:
-        result = await client.list_tools()
-        return result
+    result = await get_pool(SERVER_URL).list_tools()
+    return result
 
 async def call_tool(name: str, args: dict):
-    async with Client(SERVER_URL) as client:
-        tool_client = ToolClient(client)
-        result = await getattr(tool_client, name)(**args)
-        return result
+    tool_client = ToolClient(get_pool(SERVER_URL))
+    result = await getattr(tool_client, name)(**args)
+    return result
 
 
 async def main():
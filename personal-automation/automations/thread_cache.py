@@ -0,0 +1,106 @@
+"""
+Persistent cache of parsed Gmail threads.
+
+A thread's content only changes when its `historyId` does, so parsed
+`GmailThread`s are stored in SQLite keyed by (thread id, historyId). The
+inbox sync store already knows every inbox thread's current historyId, so a
+cache hit costs no Gmail call and no MIME parsing (for other threads, a
+`format='minimal'` get tells the current historyId). An entry whose historyId
+is out of date counts as stale and is replaced on the next fetch.
+
+The cache is bounded by the total size of the stored JSON; when a write
+takes it over `max_bytes`, the least recently used entries are evicted.
+
+    cache = ThreadCache()
+    thread = cache.get(thread_id, history_id)  # None on a miss
+    cache.put(thread_id, history_id, thread)
+    cache.stats()
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from automations.gmail_types import GmailThread
+
+DEFAULT_DB_PATH = os.path.join(os.environ.get("HOME", "."), ".gmail-mcp", "thread_cache.db")
+DEFAULT_MAX_BYTES = 50 * 2**20
+
+
+class ThreadCache:
+    def __init__(self, path: str = DEFAULT_DB_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._counts = Counter()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS threads ("
+                "id TEXT PRIMARY KEY, history_id TEXT NOT NULL, data TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS threads_last_used ON threads (last_used)")
+            self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM threads").fetchone()[0]
+
+    def get(self, thread_id: str, history_id: str | None) -> GmailThread | None:
+        """The cached thread if it is still at `history_id`, else None."""
+        if history_id is None:
+            self._counts["misses"] += 1
+            return None
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT history_id, data FROM threads WHERE id = ?", (thread_id,)).fetchone()
+            if row is None or row[0] != history_id:
+                self._counts["stale" if row else "misses"] += 1
+                return None
+            self._conn.execute("UPDATE threads SET last_used = ? WHERE id = ?", (time.time(), thread_id))
+        self._counts["hits"] += 1
+        return GmailThread.model_validate_json(row[1])
+
+    def cached_ids(self, thread_ids: list[str]) -> set[str]:
+        """The ids among `thread_ids` with an entry, at any historyId."""
+        with self._lock:
+            return {row[0] for row in self._conn.execute(
+                f"SELECT id FROM threads WHERE id IN ({','.join('?' * len(thread_ids))})", thread_ids)}
+
+    def put(self, thread_id: str, history_id: str, thread: GmailThread) -> None:
+        data = thread.model_dump_json()
+        with self._lock, self._conn:
+            old = self._conn.execute("SELECT size FROM threads WHERE id = ?", (thread_id,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO threads (id, history_id, data, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (thread_id, history_id, data, len(data), time.time()),
+            )
+            self._bytes += len(data) - (old[0] if old else 0)
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes:
+            rows = self._conn.execute("SELECT id, size FROM threads ORDER BY last_used LIMIT 100").fetchall()
+            if not rows:
+                break
+            for thread_id, size in rows:
+                if self._bytes <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM threads WHERE id = ?", (thread_id,))
+                self._bytes -= size
+                self._counts["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+        lookups = self._counts["hits"] + self._counts["misses"] + self._counts["stale"]
+        return {
+            "hits": self._counts["hits"],
+            "misses": self._counts["misses"],
+            "stale": self._counts["stale"],
+            "hit_rate": self._counts["hits"] / lookups if lookups else 0.0,
+            "evictions": self._counts["evictions"],
+            "entries": entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,75 @@
+"""
+Per-call overhead of MCP tool calls: a new client per call vs the shared pool.
+
+Usage (start the minimal server first):
+    uv run uvicorn minimal_fastmcp:sse_app --port 8082
+    uv run benchmark_mcp.py --calls 50
+
+Modes:
+    fresh             a new Client (SSE connection + handshake) per call, as tools used to do
+    pooled            calls through a long-lived MCPClientPool, one at a time
+    pooled_concurrent the same calls issued at once through the pool
+    in_process        the pool calling the FastMCP server in this process over the in-memory transport
+
+`sum_of_squares` (which calls `square` twice and `add` once) is timed as well,
+so running this before and after a server change shows its end-to-end cost.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from fastmcp import Client
+
+from automations.mcp_pool import MCPClientPool
+from minimal_fastmcp import SERVER_URL, mcp
+
+
+async def _timed(call) -> float:
+    start = time.perf_counter()
+    await call()
+    return time.perf_counter() - start
+
+
+def _report(mode: str, latencies: list[float], wall: float) -> None:
+    ms = sorted(latency * 1000 for latency in latencies)
+    print(f"{mode:<18} {len(ms):>5} {statistics.mean(ms):>9.2f} {ms[len(ms) // 2]:>9.2f} "
+          f"{ms[int(len(ms) * 0.95)]:>9.2f} {len(ms) / wall:>9.1f}")
+
+
+async def bench(url: str, calls: int) -> None:
+    args = {"a": 3}
+
+    async def fresh():
+        async with Client(url) as client:
+            await client.call_tool("square", args)
+
+    pool = MCPClientPool(url)
+    local_pool = MCPClientPool(url, server=mcp)
+    await pool.call_tool("square", args)  # open the first session outside the timings
+
+    print(f"{'mode':<18} {'calls':>5} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'calls/s':>9}")
+    for mode, call in [
+        ("fresh", fresh),
+        ("pooled", lambda: pool.call_tool("square", args)),
+        ("in_process", lambda: local_pool.call_tool("square", args)),
+        ("sum_of_squares", lambda: pool.call_tool("sum_of_squares", {"a": 3, "b": 4})),
+    ]:
+        start = time.perf_counter()
+        latencies = [await _timed(call) for _ in range(calls)]
+        _report(mode, latencies, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(_timed(lambda: pool.call_tool("square", args)) for _ in range(calls)))
+    _report("pooled_concurrent", latencies, time.perf_counter() - start)
+    print(pool.stats())
+    await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=SERVER_URL)
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(bench(args.url, args.calls))
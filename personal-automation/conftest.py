@@ -0,0 +1,20 @@
+import datetime
+
+from humanlayer import FunctionCall, FunctionCallStatus
+
+
+class ScriptedHumanLayer:
+    """Answers each approval request with the next (approved, comment) decision."""
+
+    def __init__(self, decisions):
+        self.decisions = list(decisions)
+        self.requests = []
+
+    def create_function_call(self, spec):
+        self.requests.append(spec.kwargs["x"])
+        approved, comment = self.decisions.pop(0)
+        return FunctionCall(
+            run_id="test", call_id=f"call-{len(self.requests)}", spec=spec,
+            status=FunctionCallStatus(requested_at=datetime.datetime.now(datetime.timezone.utc),
+                                      approved=approved, comment=comment),
+        )
@@ -14,11 +14,14 @@ import argparse
 import json
 import lilypad
 from dotenv import load_dotenv
+from automations.mcp_pool import get_pool
 
 load_dotenv()
 
 lilypad.configure(auto_llm=True)
 
+SERVER_URL = "http://127.0.0.1:8082/sse"
+
 mcp = FastMCP("My MCP Server")
 sse_app = mcp.sse_app()
 
@@ -44,14 +47,14 @@ async def square(a: int) -> int:
 @mcp.tool()
 @lilypad.trace(versioning="automatic")
 async def sum_of_squares(a: int, b: int) -> int:
-    async with Client("http://127.0.0.1:8082/sse") as client:
-        a2 = parse_as_json(await client.call_tool("square", {"a": a}))
-        b2 = parse_as_json(await client.call_tool("square", {"a": b}))
-        res = parse_as_json(await client.call_tool("add", {"a": a2, "b": b2}))
-        return res
+    # the tools live on this server, so the pool calls them in-process
+    pool = get_pool(SERVER_URL, server=mcp)
+    a2, b2 = await asyncio.gather(pool.call_tool("square", {"a": a}), pool.call_tool("square", {"a": b}))
+    res = parse_as_json(await pool.call_tool("add", {"a": parse_as_json(a2), "b": parse_as_json(b2)}))
+    return res
 
 async def main(tool: str | None = None, **kwargs):
-    async with Client("http://127.0.0.1:8082/sse") as client:
+    async with Client(SERVER_URL) as client:
         if tool:
             result = await client.call_tool(tool, kwargs)
             print(result)
@@ -0,0 +1,54 @@
+from automations import decorators
+from automations.decorators import batched_hitl_validation
+from conftest import ScriptedHumanLayer
+
+
+def _classifier(hl, runs):
+    @batched_hitl_validation(batch_size=2, max_steps=3, hl_instance=hl)
+    def classify(items, *, prev_result=None, feedback=None):
+        runs.append((list(items), feedback))
+        return [f"{item}:{len(runs)}" for item in items]
+    return classify
+
+
+def test_batched_hitl_validation_empty_input_skips_review():
+    hl, runs = ScriptedHumanLayer([]), []
+    assert _classifier(hl, runs)([]) == []
+    assert hl.requests == []
+    assert runs == [([], None)]
+
+
+def test_batched_hitl_validation_unnamed_rejection_reruns_only_pending_batches():
+    hl = ScriptedHumanLayer([(False, "batch 2: wrong"), (False, "still wrong"), (True, None)])
+    runs = []
+    result = _classifier(hl, runs)(["a", "b", "c", "d", "e"])
+
+    assert list(hl.requests[1]) == ["batch 2"]
+    assert list(hl.requests[2]) == ["batch 2"]
+    assert runs[3:] == [(["c", "d"], "wrong"), (["c", "d"], "still wrong")]
+    assert result == ["a:1", "b:1", "c:5", "d:5", "e:3"]
+
+
+class SlowHumanLayer(ScriptedHumanLayer):
+    """Approves after `polls` get_function_call polls."""
+
+    def __init__(self, polls):
+        super().__init__([(None, None)])
+        self.polls = polls
+
+    def create_function_call(self, spec):
+        self.call = super().create_function_call(spec)
+        return self.call
+
+    def get_function_call(self, call_id):
+        self.polls -= 1
+        self.call.status.approved = True if self.polls <= 0 else None
+        return self.call
+
+
+def test_sync_approval_polls_at_least_every_5s(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(decorators.time, "sleep", sleeps.append)
+    decorators._get_approval_status("classify", x=[], hl_instance=SlowHumanLayer(polls=8))
+    assert len(sleeps) == 8
+    assert max(sleeps) == decorators.SYNC_MAX_INTERVAL == 5.0
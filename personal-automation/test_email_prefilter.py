@@ -0,0 +1,83 @@
+from automations.email_prefilter import EmailPrefilter, fetch_thread_metadata, match_rule
+from automations.fake_gmail import FakeMailbox, fake_gmail_service
+from automations.gmail_categorization import GmailClassification, GmailClassificationResponse
+from automations.gmail_types import GmailThreadHeader
+from automations.gmailmcp import MY_EMAIL, _draft_body
+from conftest import ScriptedHumanLayer
+
+
+def _headers(mailbox: FakeMailbox) -> list[GmailThreadHeader]:
+    return [GmailThreadHeader(id=t["id"], snippet=t["messages"][-1]["snippet"], historyId=t["historyId"])
+            for t in mailbox.threads.values()]
+
+
+def _fake_classify(calls):
+    def classify(threads):
+        calls.append([thread.id for thread in threads])
+        return GmailClassificationResponse(
+            emails=threads, thinking="fake",
+            classifications=[GmailClassification(reason="human", classification="draft_reply") for _ in threads])
+    return classify
+
+
+def test_draft_reply_is_not_already_replied():
+    mailbox = FakeMailbox()
+    thread_id = mailbox.add_thread("alice@example.com", "Lunch?", "Are you free on Friday?")
+    service = fake_gmail_service(mailbox)
+    assert match_rule(fetch_thread_metadata(service, [thread_id])[thread_id]) is None
+
+    service.users().drafts().create(userId='me', body=_draft_body(thread_id, "alice@example.com", "Re: Lunch?",
+                                                                    "Friday works.")).execute()
+    metadata = fetch_thread_metadata(service, [thread_id])[thread_id]
+    assert metadata.sender == "alice@example.com"
+    assert match_rule(metadata) is None
+
+    mailbox.reply(thread_id, MY_EMAIL, "Friday works.")
+    assert match_rule(fetch_thread_metadata(service, [thread_id])[thread_id])[0] == "already_replied"
+
+
+def test_draft_only_thread_is_left_to_the_llm():
+    mailbox = FakeMailbox()
+    service = fake_gmail_service(mailbox)
+    service.users().drafts().create(userId='me', body=_draft_body("", "bob@example.com", "Hi", "Hello")).execute()
+    assert fetch_thread_metadata(service, list(mailbox.threads)) == {}
+
+
+def _inbox():
+    mailbox = FakeMailbox()
+    reminder = mailbox.add_thread("alice@example.com", "Reminder: dentist", "Your appointment is tomorrow")
+    human = mailbox.add_thread("bob@example.com", "Question", "Can you review my draft?")
+    service = fake_gmail_service(mailbox)
+    return reminder, human, _headers(mailbox), fetch_thread_metadata(service, [reminder, human])
+
+
+def test_rejected_prefilter_decisions_go_to_the_llm():
+    reminder, human, threads, metadata = _inbox()
+    hl, calls = ScriptedHumanLayer([(False, "email 1: this is a real person")]), []
+    prefilter = EmailPrefilter(hl_instance=hl)
+    response = prefilter.wrap(_fake_classify(calls), metadata, examples_path=None)(threads)
+
+    assert hl.requests[0]["email 1"]["id"] == reminder
+    assert calls == [[human], [reminder]]
+    assert [c.classification for c in response.classifications] == ["draft_reply", "draft_reply"]
+    assert prefilter.stats()["prefiltered"] == 0
+    assert prefilter.stats()["rejected"] == 1
+
+
+def test_approved_prefilter_decisions_skip_the_llm():
+    reminder, human, threads, metadata = _inbox()
+    hl, calls = ScriptedHumanLayer([(True, None)]), []
+    response = EmailPrefilter(hl_instance=hl).wrap(_fake_classify(calls), metadata, examples_path=None)(threads)
+
+    assert calls == [[human]]
+    assert [c.classification for c in response.classifications] == ["archive", "draft_reply"]
+
+
+def test_auto_approve_skips_review():
+    reminder, human, threads, metadata = _inbox()
+    hl, calls = ScriptedHumanLayer([]), []
+    prefilter = EmailPrefilter(auto_approve=True, hl_instance=hl)
+    prefilter.wrap(_fake_classify(calls), metadata, examples_path=None)(threads)
+
+    assert hl.requests == []
+    assert calls == [[human]]
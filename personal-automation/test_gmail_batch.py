@@ -0,0 +1,61 @@
+import pytest
+from googleapiclient.errors import HttpError
+
+from automations import gmail_batch
+from automations.fake_gmail import FakeMailbox, fake_gmail_service
+from automations.gmailmcp import _draft_body
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(gmail_batch, "RETRY_BACKOFF", 0)
+
+
+def _mailbox(n):
+    mailbox = FakeMailbox()
+    thread_ids = [mailbox.add_thread(f"sender{i}@example.com", f"Subject {i}", f"Body {i}") for i in range(n)]
+    return mailbox, fake_gmail_service(mailbox), thread_ids
+
+
+def test_get_threads_splits_into_batches_of_50():
+    mailbox, service, thread_ids = _mailbox(120)
+    results = gmail_batch.get_threads(service, thread_ids)
+    assert list(results) == thread_ids
+    assert all(results[thread_id]["id"] == thread_id for thread_id in thread_ids)
+    assert service._http.requests == {"batch": 3}
+
+
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_rate_limit_and_server_errors_are_retried(status):
+    mailbox, service, thread_ids = _mailbox(3)
+    mailbox.fail_next(thread_ids[1], status)
+    results = gmail_batch.get_threads(service, thread_ids)
+    assert all(not isinstance(result, Exception) for result in results.values())
+    assert service._http.requests == {"batch": 2}
+
+
+def test_retries_give_up_after_max_attempts():
+    mailbox, service, thread_ids = _mailbox(2)
+    mailbox.fail_next(thread_ids[0], 429, times=gmail_batch.MAX_ATTEMPTS)
+    results = gmail_batch.get_threads(service, thread_ids)
+    assert isinstance(results[thread_ids[0]], HttpError) and results[thread_ids[0]].resp.status == 429
+    assert results[thread_ids[1]]["id"] == thread_ids[1]
+    assert service._http.requests == {"batch": gmail_batch.MAX_ATTEMPTS}
+
+
+def test_other_errors_are_returned_without_retry():
+    mailbox, service, thread_ids = _mailbox(1)
+    results = gmail_batch.get_threads(service, thread_ids + ["missing"])
+    assert isinstance(results["missing"], HttpError) and results["missing"].resp.status == 404
+    assert service._http.requests == {"batch": 1}
+
+
+def test_archive_and_create_drafts():
+    mailbox, service, thread_ids = _mailbox(3)
+    gmail_batch.archive_threads(service, thread_ids[:2])
+    assert mailbox.inbox() == [thread_ids[2]]
+
+    drafts = [_draft_body(thread_id, f"sender{i}@example.com", "Re", f"Reply {i}") for i, thread_id in enumerate(thread_ids)]
+    results = gmail_batch.create_drafts(service, drafts)
+    assert [result["message"]["threadId"] for result in results] == thread_ids
+    assert [draft["content"].strip() for draft in mailbox.drafts] == ["Reply 0", "Reply 1", "Reply 2"]
@@ -0,0 +1,50 @@
+import pytest
+
+from automations import gmail_sync
+from automations.fake_gmail import FakeMailbox, fake_gmail_service
+from automations.gmail_sync import GmailSyncStore, sync_inbox
+
+
+@pytest.fixture
+def inbox(monkeypatch):
+    monkeypatch.setattr(gmail_sync, "PAGE_SIZE", 2)
+    mailbox = FakeMailbox()
+    thread_ids = [mailbox.add_thread(f"sender{i}@example.com", f"Subject {i}", f"Body {i}") for i in range(5)]
+    return mailbox, fake_gmail_service(mailbox), GmailSyncStore(":memory:"), thread_ids
+
+
+def _ids(store):
+    return sorted(thread.id for thread in store.inbox_threads())
+
+
+def test_first_sync_pages_through_the_inbox(inbox):
+    mailbox, service, store, thread_ids = inbox
+    result = sync_inbox(service, store)
+    assert (result.mode, result.updated, result.api_calls) == ("full", 5, 4)  # profile + 3 pages
+    assert _ids(store) == sorted(thread_ids)
+    assert store.get_history_id() == str(mailbox.history_id)
+
+
+def test_incremental_sync_replays_history(inbox):
+    mailbox, service, store, thread_ids = inbox
+    sync_inbox(service, store)
+    new = mailbox.add_thread("new@example.com", "New", "Hello")
+    service.users().threads().modify(userId='me', id=thread_ids[0], body={'removeLabelIds': ['INBOX']}).execute()
+    mailbox.reply(thread_ids[1], "sender1@example.com", "Following up", labels=("INBOX",))
+
+    result = sync_inbox(service, store)
+    assert (result.mode, result.updated, result.removed) == ("incremental", 2, 1)
+    assert result.api_calls == 2 + 1  # 3 history records in pages of 2, one batch of gets
+    assert _ids(store) == sorted(thread_ids[1:] + [new])
+    assert store.history_ids([thread_ids[1]]) == {thread_ids[1]: mailbox.threads[thread_ids[1]]["historyId"]}
+
+
+def test_expired_history_falls_back_to_full_sync(inbox):
+    mailbox, service, store, thread_ids = inbox
+    sync_inbox(service, store)
+    mailbox.add_thread("new@example.com", "New", "Hello")
+    mailbox.oldest_history_id = mailbox.history_id
+
+    result = sync_inbox(service, store)
+    assert (result.mode, result.updated) == ("full", 6)
+    assert len(store.inbox_threads()) == 6
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from automations import gmailmcp
+from automations.fake_gmail import FakeMailbox, fake_gmail_service
+from automations.gmail_sync import GmailSyncStore
+from automations.thread_cache import ThreadCache
+
+
+class RecordingMailbox(FakeMailbox):
+    """Records the format of every threads.get."""
+
+    def __init__(self):
+        super().__init__()
+        self.gets = []
+
+    def get_thread(self, query, body, id):
+        self.gets.append((id, query.get("format", ["full"])[0]))
+        return super().get_thread(query, body, id)
+
+
+@pytest.fixture
+def gmail(monkeypatch):
+    mailbox = RecordingMailbox()
+    service = fake_gmail_service(mailbox)
+    store, cache = GmailSyncStore(":memory:"), ThreadCache(":memory:")
+    monkeypatch.setattr(gmailmcp, "get_gmail_service", lambda: service)
+    monkeypatch.setattr(gmailmcp, "get_sync_store", lambda: store)
+    monkeypatch.setattr(gmailmcp, "get_thread_cache", lambda: cache)
+    return mailbox, cache
+
+
+def _read(thread_ids):
+    return asyncio.run(gmailmcp._read_gmail_threads(thread_ids))
+
+
+def test_inbox_thread_is_served_from_cache_until_it_changes(gmail):
+    mailbox, cache = gmail
+    thread_id = mailbox.add_thread("alice@example.com", "Lunch?", "Are you free on Friday?")
+    assert _read([thread_id])[thread_id].reply_content == "Are you free on Friday?"
+    mailbox.gets.clear()
+
+    assert _read([thread_id])[thread_id].reply_content == "Are you free on Friday?"
+    assert [fmt for _, fmt in mailbox.gets if fmt == "full"] == []
+
+    mailbox.reply(thread_id, "alice@example.com", "Or Saturday?", labels=("INBOX", "UNREAD"))
+    assert _read([thread_id])[thread_id].reply_content == "Or Saturday?"
+
+
+def test_archived_thread_is_validated_with_a_minimal_get(gmail):
+    mailbox, cache = gmail
+    thread_id = mailbox.add_thread("alice@example.com", "Receipt", "Thanks for your order", labels=("UNREAD",))
+    _read([thread_id])
+    mailbox.gets.clear()
+
+    assert _read([thread_id])[thread_id].reply_content == "Thanks for your order"
+    assert mailbox.gets == [(thread_id, "minimal")]
+    assert cache.stats()["hits"] == 1
+
+    mailbox.reply(thread_id, "alice@example.com", "Your order shipped", labels=("UNREAD",))
+    mailbox.gets.clear()
+    assert _read([thread_id])[thread_id].reply_content == "Your order shipped"
+    # after the sync's own minimal get of the changed thread
+    assert mailbox.gets[-2:] == [(thread_id, "minimal"), (thread_id, "full")]
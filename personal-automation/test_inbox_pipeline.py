@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from automations.gmail_categorization import GmailClassification, GmailClassificationResponse
+from automations.gmail_types import GmailThread, GmailThreadHeader
+from automations.inbox_pipeline import run_inbox_pipeline
+
+
+def _headers(n):
+    return [GmailThreadHeader(id=f"t{i}", snippet=f"Email {i}", historyId=str(i)) for i in range(n)]
+
+
+def _classify(chunks):
+    def classify(threads):
+        chunks.append([thread.id for thread in threads])
+        # even threads get a reply, odd ones are archived
+        return GmailClassificationResponse(emails=threads, thinking="", classifications=[
+            GmailClassification(reason="", classification="draft_reply" if int(t.id[1:]) % 2 == 0 else "archive")
+            for t in threads])
+    return classify
+
+
+def test_pipeline_drafts_and_archives_in_batches():
+    chunks, reads, written, archived = [], [], [], []
+
+    async def read_threads(thread_ids):
+        reads.append(thread_ids)
+        return {thread_id: ValueError("gone") if thread_id == "t2" else
+                GmailThread(id=thread_id, reply_email="a@example.com", reply_subject="Hi", reply_content=thread_id)
+                for thread_id in thread_ids}
+
+    async def draft_reply(thread):
+        if thread.id == "t4":
+            raise RuntimeError("LLM error")
+        return {"threadId": thread.id}
+
+    async def write_drafts(drafts):
+        written.extend(draft["threadId"] for draft in drafts)
+        return drafts
+
+    async def archive_threads(thread_ids):
+        archived.extend(thread_ids)
+        return {thread_id: {} for thread_id in thread_ids}
+
+    report = asyncio.run(run_inbox_pipeline(
+        _headers(10), classify=_classify(chunks), read_threads=read_threads, draft_reply=draft_reply,
+        write_drafts=write_drafts, archive_threads=archive_threads,
+        classify_chunk_size=4, draft_concurrency=2, batch_size=3, linger=0.01,
+    ))
+
+    assert chunks == [["t0", "t1", "t2", "t3"], ["t4", "t5", "t6", "t7"], ["t8", "t9"]]
+    assert sorted(archived) == ["t1", "t3", "t5", "t7", "t9"]
+    assert sorted(written) == ["t0", "t6", "t8"]
+    assert all(len(batch) <= 3 for batch in reads)
+    assert (report["read"]["items"], report["read"]["failures"]) == (5, 1)
+    assert (report["draft"]["items"], report["draft"]["failures"]) == (4, 1)
+    assert report["archive"]["items"] == 5
+    assert report["total"]["items"] == 10
+
+
+def test_failing_stage_cancels_the_pipeline():
+    async def read_threads(thread_ids):
+        raise ConnectionError("Gmail is down")
+
+    async def unused(*args):
+        raise AssertionError("not reached")
+
+    async def archive_threads(thread_ids):
+        return {}
+
+    with pytest.raises(ExceptionGroup) as excinfo:
+        asyncio.run(run_inbox_pipeline(
+            _headers(2), classify=_classify([]), read_threads=read_threads, draft_reply=unused,
+            write_drafts=unused, archive_threads=archive_threads, linger=0.01,
+        ))
+    assert excinfo.group_contains(ConnectionError)
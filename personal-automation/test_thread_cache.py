@@ -0,0 +1,43 @@
+import itertools
+import types
+
+from automations import thread_cache
+from automations.gmail_types import GmailThread
+from automations.thread_cache import ThreadCache
+
+
+def _thread(thread_id, content="Hello"):
+    return GmailThread(id=thread_id, reply_email="alice@example.com", reply_subject="Hi", reply_content=content)
+
+
+def test_entry_at_an_older_history_id_is_stale():
+    cache = ThreadCache(":memory:")
+    cache.put("t1", "100", _thread("t1"))
+    assert cache.get("t1", "100") == _thread("t1")
+    assert cache.get("t1", "101") is None
+    assert cache.get("t2", "100") is None
+    assert cache.get("t1", None) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale"], stats["misses"], stats["entries"]) == (1, 1, 2, 1)
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    monkeypatch.setattr(thread_cache, "time", types.SimpleNamespace(time=itertools.count().__next__))
+    size = len(_thread("t0").model_dump_json())
+    cache = ThreadCache(":memory:", max_bytes=3 * size)
+    for thread_id in ("t0", "t1", "t2"):
+        cache.put(thread_id, "1", _thread(thread_id))
+    cache.get("t0", "1")
+    cache.put("t3", "1", _thread("t3"))
+
+    assert cache.cached_ids(["t0", "t1", "t2", "t3"]) == {"t0", "t2", "t3"}
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 3 * size
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "threads.db")
+    ThreadCache(path).put("t1", "5", _thread("t1", "Saved"))
+    cache = ThreadCache(path)
+    assert cache.get("t1", "5").reply_content == "Saved"
+    assert cache.stats()["bytes"] == len(_thread("t1", "Saved").model_dump_json())
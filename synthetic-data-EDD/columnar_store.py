@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Columnar (Parquet) store for questions, responses and judgments.
+
+The JSON files in data/ have to be parsed in full before you can ask anything
+of them. This script converts them into Parquet files with typed columns
+(`user_type`, `scenario`, `model` and `judgment` are dictionary-encoded) so
+they can be read column-by-column, filtered on read and aggregated with Arrow.
+
+Usage (run from project root):
+    python synthetic-data-EDD/columnar_store.py convert
+    python synthetic-data-EDD/columnar_store.py pass-rates --by user_type scenario
+    python synthetic-data-EDD/columnar_store.py benchmark --repeats 20
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from eval_data import DATA_PATH, flatten_records
+
+COLUMNAR_PATH = os.path.join(DATA_PATH, 'columnar') # Subdirectory for Parquet output
+
+_CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('question', pa.string()),
+    ('user_type', _CATEGORY),
+    ('scenario', _CATEGORY),
+    ('model', _CATEGORY),
+    ('answer', pa.large_string()),
+    ('sources', pa.large_string()),
+    ('judgment', _CATEGORY),
+    ('reason', pa.string()),
+    ('evaluation_type', _CATEGORY),
+    ('duration_ms', pa.float64()),
+    ('context_tokens', pa.int64()),
+    ('completion_tokens', pa.int64()),
+    ('timestamp', pa.timestamp('us')),
+    ('source_file', _CATEGORY),
+])
+
+
+def _parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def records_to_table(rows):
+    """Build an Arrow table (with SCHEMA) from flattened records."""
+    columns = {name: [] for name in SCHEMA.names}
+    for row in rows:
+        for name in SCHEMA.names:
+            value = row.get(name)
+            if name == 'timestamp':
+                value = _parse_timestamp(value)
+            columns[name].append(value)
+    return pa.Table.from_pydict(columns, schema=SCHEMA)
+
+
+def convert_file(json_path, output_dir=COLUMNAR_PATH):
+    """Convert one JSON data file to Parquet. Returns the output path."""
+    os.makedirs(output_dir, exist_ok=True)
+    table = records_to_table(flatten_records(json_path))
+    stem = os.path.splitext(os.path.basename(json_path))[0]
+    output_path = os.path.join(output_dir, f"{stem}.parquet")
+    pq.write_table(table, output_path, compression='zstd')
+    return output_path
+
+
+def convert_all(data_dir=DATA_PATH, output_dir=COLUMNAR_PATH):
+    """Convert every record file in `data_dir` (personas/scenarios are skipped)."""
+    output_paths = []
+    for json_path in sorted(glob.glob(os.path.join(data_dir, '*.json'))):
+        name = os.path.basename(json_path)
+        if name in ('personas.json', 'scenarios.json'):
+            continue
+        output_paths.append(convert_file(json_path, output_dir))
+        print(f"- Converted {name}")
+    return output_paths
+
+
+def read_table(source=COLUMNAR_PATH, columns=None, **equals):
+    """Read the store (a directory or list of Parquet files) as one table.
+
+    Keyword arguments filter on read, e.g. `read_table(model='gemini', evaluation_type='llm')`.
+    """
+    dataset = ds.dataset(source, format='parquet', schema=SCHEMA)
+    expression = None
+    for name, value in equals.items():
+        condition = ds.field(name) == value
+        expression = condition if expression is None else expression & condition
+    return dataset.to_table(columns=columns, filter=expression)
+
+
+def pass_rates(table, by=('user_type', 'scenario')):
+    """Pass rate of judged rows grouped by `by` columns.
+
+    Rows without a pass/fail judgment are ignored. Returns a table with
+    `n`, `passed` and `pass_rate` columns.
+    """
+    by = list(by)
+    judged = table.select(by + ['judgment']).filter(
+        pc.is_in(pc.cast(table['judgment'], pa.string()), value_set=pa.array(['pass', 'fail']))
+    )
+    # Group keys must be plain strings for group_by
+    keyed = pa.table({
+        **{name: pc.cast(judged[name], pa.string()) for name in by},
+        'is_pass': pc.cast(pc.equal(pc.cast(judged['judgment'], pa.string()), 'pass'), pa.int64()),
+    })
+    grouped = keyed.group_by(by).aggregate([('is_pass', 'count'), ('is_pass', 'sum')])
+    n = grouped['is_pass_count']
+    passed = grouped['is_pass_sum']
+    result = pa.table({
+        **{name: grouped[name] for name in by},
+        'n': n,
+        'passed': passed,
+        'pass_rate': pc.divide(pc.cast(passed, pa.float64()), pc.cast(n, pa.float64())),
+    })
+    return result.sort_by([(name, 'ascending') for name in by])
+
+
+def _json_pass_rates(data_dir, by):
+    """Reference implementation over the raw JSON files (used by the benchmark)."""
+    counts = defaultdict(lambda: [0, 0])
+    for json_path in sorted(glob.glob(os.path.join(data_dir, '*.json'))):
+        with open(json_path, 'r') as f:
+            records = json.load(f)
+        if not isinstance(records, list):
+            continue
+        for record in records:
+            if record.get('judgment') not in ('pass', 'fail'):
+                continue
+            key = tuple(record.get(name) for name in by)
+            counts[key][0] += 1
+            counts[key][1] += record['judgment'] == 'pass'
+    return {key: passed / n for key, (n, passed) in counts.items()}
+
+
+def benchmark(data_dir=DATA_PATH, output_dir=COLUMNAR_PATH, repeats=10, by=('user_type', 'scenario')):
+    """Time a pass-rate query over the JSON files vs the Parquet store."""
+    if not glob.glob(os.path.join(output_dir, '*.parquet')):
+        convert_all(data_dir, output_dir)
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        _json_pass_rates(data_dir, by)
+    json_s = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        # Only the columns the query needs are read from disk
+        pass_rates(read_table(output_dir, columns=list(by) + ['judgment']), by=by)
+    parquet_s = (time.perf_counter() - start) / repeats
+
+    json_bytes = sum(os.path.getsize(p) for p in glob.glob(os.path.join(data_dir, '*.json')))
+    parquet_bytes = sum(os.path.getsize(p) for p in glob.glob(os.path.join(output_dir, '*.parquet')))
+    print(f"JSON:    {json_s * 1000:8.2f} ms/query  ({json_bytes / 1024:.0f} KiB on disk)")
+    print(f"Parquet: {parquet_s * 1000:8.2f} ms/query  ({parquet_bytes / 1024:.0f} KiB on disk)")
+    print(f"Speedup: {json_s / parquet_s:.1f}x")
+    return json_s, parquet_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar store for evaluation data.")
+    parser.add_argument("--data-dir", default=DATA_PATH, help="Directory holding the JSON data files.")
+    parser.add_argument("--output-dir", default=COLUMNAR_PATH, help="Directory for the Parquet files.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("convert", help="Convert the JSON data files to Parquet.")
+
+    rates_parser = subparsers.add_parser("pass-rates", help="Print pass rates from the Parquet store.")
+    rates_parser.add_argument("--by", nargs="+", default=["user_type", "scenario"],
+                              help="Columns to group by (e.g. model user_type scenario).")
+    rates_parser.add_argument("--model", help="Only include this model.")
+    rates_parser.add_argument("--evaluation-type", help="Only include this evaluation type (human/llm).")
+
+    bench_parser = subparsers.add_parser("benchmark", help="Compare query time against the JSON files.")
+    bench_parser.add_argument("--repeats", type=int, default=10)
+
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        paths = convert_all(args.data_dir, args.output_dir)
+        print(f"Wrote {len(paths)} Parquet files to {args.output_dir}")
+    elif args.command == "pass-rates":
+        filters = {}
+        if args.model:
+            filters['model'] = args.model
+        if args.evaluation_type:
+            filters['evaluation_type'] = args.evaluation_type
+        table = read_table(args.output_dir, columns=args.by + ['judgment'], **filters)
+        for row in pass_rates(table, by=args.by).to_pylist():
+            group = " / ".join(str(row[name]) for name in args.by)
+            print(f"{group}: {row['pass_rate'] * 100:.1f}% ({row['passed']}/{row['n']})")
+    elif args.command == "benchmark":
+        benchmark(args.data_dir, args.output_dir, repeats=args.repeats)
+
+
+if __name__ == "__main__":
+    main()
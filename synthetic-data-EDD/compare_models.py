@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Compare several generator models on the same questions with shared retrieval.
+
+Each question is retrieved once (and cached in data/cache/retrieval_cache.json,
+so re-runs with new models skip retrieval entirely); the same chunks are then
+sent to every generator model concurrently. The output stores each retrieved
+chunk once under "sources" and rows reference chunks by ID:
+
+    {
+      "models": {"openai": "openai:gpt-4o-mini", ...},
+      "sources": {"<chunk id>": {"text": ..., "metadata": {...}}},
+      "comparisons": [
+        {"id": ..., "question": ..., "sources": [{"id": ..., "relevance": ...}],
+         "openai_response": ..., "openai_duration_ms": ..., "openai_tokens": ...}
+      ]
+    }
+
+Usage (run from project root):
+    python synthetic-data-EDD/compare_models.py --models openai:gpt-4o-mini gemini:models/gemini-2.0-flash
+    python synthetic-data-EDD/compare_models.py --models mini=openai:gpt-4o-mini big=openai:gpt-4o --limit 5
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from dotenv import load_dotenv
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from rag_backend import BACKENDS, DEFAULT_PERSIST_DIR, DEFAULT_TOP_K, node_to_chunk
+
+BASE_PATH = os.path.dirname(__file__) # Directory of this script
+DATA_PATH = os.path.join(BASE_PATH, 'data')
+# Kept out of data/ itself, where every *.json is a record file
+RETRIEVAL_CACHE_PATH = os.path.join(DATA_PATH, 'cache', 'retrieval_cache.json')
+DEFAULT_MODELS = ["openai:gpt-4o-mini", "gemini:models/gemini-2.0-flash"]
+MAX_WORKERS = 8 # Questions processed concurrently
+
+
+def _openai_llm(model):
+    from llama_index.llms.openai import OpenAI
+    return OpenAI(model=model)
+
+
+def _gemini_llm(model):
+    from llama_index.llms.gemini import Gemini
+    return Gemini(model=model, api_key=os.getenv("GEMINI_API_KEY"))
+
+
+# Generator providers selectable in --models as provider:model
+LLM_PROVIDERS = {
+    "openai": _openai_llm,
+    "gemini": _gemini_llm,
+}
+
+
+def parse_model_spec(spec):
+    """Parse `[label=]provider:model`; the label defaults to the provider name."""
+    label, _, target = spec.rpartition('=')
+    provider, _, model = target.partition(':')
+    if provider not in LLM_PROVIDERS or not model:
+        raise ValueError(f"Expected [label=]provider:model with provider in {sorted(LLM_PROVIDERS)}, got {spec!r}")
+    return label or provider, provider, model
+
+
+def index_identity(persist_dir=None, docs_dir=None):
+    """Identify the index retrieval runs against, so a rebuilt index misses the cache.
+
+    A persisted index is identified by its directory and the modification time
+    of its docstore; an in-memory one by its documents directory and the newest
+    file in it.
+    """
+    docstore = os.path.join(persist_dir, 'docstore.json') if persist_dir else None
+    if docstore and os.path.exists(docstore):
+        return f"{os.path.abspath(persist_dir)}@{os.stat(docstore).st_mtime_ns}"
+    if docs_dir:
+        newest = max((os.stat(os.path.join(root, name)).st_mtime_ns
+                      for root, _, names in os.walk(docs_dir) for name in names), default=0)
+        return f"{os.path.abspath(docs_dir)}@{newest}"
+    return ""
+
+
+class RetrievalCache:
+    """Retrieved chunks keyed by (index, top_k, question), persisted as JSON between runs."""
+
+    def __init__(self, path=RETRIEVAL_CACHE_PATH, index_id=""):
+        self.path = path
+        self.index_id = index_id
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                self._entries = json.load(f)
+
+    def key(self, question, top_k):
+        return hashlib.sha256(f"{self.index_id}\n{top_k}\n{question}".encode('utf-8')).hexdigest()
+
+    def get_or_retrieve(self, rag, question, top_k):
+        """Return (chunks, retrieval_ms); retrieval_ms is 0 on a cache hit."""
+        key = self.key(question, top_k)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key], 0.0
+        start = time.perf_counter()
+        chunks = [node_to_chunk(n) for n in rag.retrieve(question)]
+        retrieval_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = chunks
+        return chunks, retrieval_ms
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._lock:
+            with open(self.path, 'w') as f:
+                json.dump(self._entries, f)
+
+
+def _chunks_to_nodes(chunks):
+    return [
+        NodeWithScore(node=TextNode(id_=c['id'], text=c['text'], metadata=c.get('metadata') or {}), score=c.get('relevance'))
+        for c in chunks
+    ]
+
+
+def compare_question(rag, cache, llms, item, top_k, model_executor):
+    """Retrieve once for `item`, then generate with every model concurrently."""
+    chunks, retrieval_ms = cache.get_or_retrieve(rag, item['question'], top_k)
+    nodes = _chunks_to_nodes(chunks)
+
+    def generate(label):
+        start = time.perf_counter()
+        try:
+            answer = rag.generate(item['question'], nodes, llm=llms[label])
+        except Exception as e:
+            answer = f"Error: {e}"
+        return label, answer, (time.perf_counter() - start) * 1000
+
+    row = {
+        'id': item['id'],
+        'question': item['question'],
+        'user_type': item['user_type'],
+        'scenario': item['scenario'],
+        'sources': [{'id': c['id'], 'relevance': c.get('relevance')} for c in chunks],
+        'retrieval_ms': round(retrieval_ms, 1),
+    }
+    for label, answer, duration_ms in model_executor.map(generate, llms):
+        row[f'{label}_response'] = answer
+        row[f'{label}_duration_ms'] = round(duration_ms, 1)
+        row[f'{label}_tokens'] = rag.count_tokens(answer)
+    row['timestamp'] = datetime.now().isoformat()
+    return row, chunks
+
+
+def run_comparison(rag, questions, models, top_k=DEFAULT_TOP_K, max_workers=MAX_WORKERS, cache=None):
+    """Compare `models` ({label: (provider, model)}) on `questions`; returns the output document."""
+    cache = cache or RetrievalCache(path=None)
+    llms = {label: LLM_PROVIDERS[provider](model) for label, (provider, model) in models.items()}
+    sources = {}
+    comparisons = []
+    with ThreadPoolExecutor(max_workers=max_workers) as question_executor, \
+            ThreadPoolExecutor(max_workers=max_workers * len(llms)) as model_executor:
+        rows = question_executor.map(
+            lambda item: compare_question(rag, cache, llms, item, top_k, model_executor), questions
+        )
+        for i, (row, chunks) in enumerate(rows, start=1):
+            for chunk in chunks:
+                sources.setdefault(chunk['id'], {'text': chunk['text'], 'metadata': chunk.get('metadata') or {}})
+            comparisons.append(row)
+            timings = ", ".join(f"{label} {row[f'{label}_duration_ms']:.0f} ms" for label in llms)
+            print(f"[{i}/{len(questions)}] {row['id']}: retrieval {row['retrieval_ms']:.0f} ms, {timings}")
+    return {
+        'models': {label: f"{provider}:{model}" for label, (provider, model) in models.items()},
+        'sources': sources,
+        'comparisons': comparisons,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare generator models on shared retrieval.")
+    parser.add_argument("--questions-file", default=os.path.join(DATA_PATH, 'questions.json'),
+                        help="Path to the questions JSON file.")
+    parser.add_argument("--models", nargs="+", default=DEFAULT_MODELS,
+                        help="Generators as [label=]provider:model (providers: %s)." % ", ".join(sorted(LLM_PROVIDERS)))
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="llama_index", help="RAG backend to use.")
+    parser.add_argument("--docs-dir", help="Directory of documents to index (only needed the first time).")
+    parser.add_argument("--persist-dir", default=DEFAULT_PERSIST_DIR, help="Where the built index is cached.")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="Chunks retrieved per question.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Questions processed concurrently.")
+    parser.add_argument("--no-cache", action="store_true", help="Don't read or write the retrieval cache.")
+    parser.add_argument("--limit", type=int, help="Only compare the first N questions.")
+    parser.add_argument("--output-file", help="Output path (defaults to data/model_comparison_<timestamp>.json).")
+    args = parser.parse_args()
+
+    load_dotenv(os.path.join(BASE_PATH, os.path.pardir, '.env'))
+
+    models = {}
+    for spec in args.models:
+        label, provider, model = parse_model_spec(spec)
+        if label in models:
+            parser.error(f"Duplicate model label {label!r}; use label=provider:model to disambiguate.")
+        models[label] = (provider, model)
+
+    with open(args.questions_file, 'r') as f:
+        questions = json.load(f)
+    if args.limit and args.limit > 0:
+        questions = questions[:args.limit]
+    print(f"Comparing {', '.join(models)} on {len(questions)} questions")
+
+    rag = BACKENDS[args.backend](docs_dir=args.docs_dir, persist_dir=args.persist_dir, top_k=args.top_k)
+    cache = RetrievalCache(path=None if args.no_cache else RETRIEVAL_CACHE_PATH,
+                           index_id=index_identity(args.persist_dir, args.docs_dir))
+
+    start = time.perf_counter()
+    document = run_comparison(rag, questions, models, top_k=args.top_k, max_workers=args.workers, cache=cache)
+    cache.save()
+    elapsed = time.perf_counter() - start
+    print(f"\nDone in {elapsed:.1f}s. Retrieval cache: {cache.hits} hits, {cache.misses} misses. "
+          f"{len(document['sources'])} unique source chunks stored once.")
+
+    output_path = args.output_file or os.path.join(
+        DATA_PATH, f"model_comparison_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(output_path, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"Saved comparison to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
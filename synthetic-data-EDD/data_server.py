@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Local data server for the evaluation viewers.
+
+Indexes the JSON files in data/ once (re-indexing a file only when it changes
+on disk) and serves filtered, paginated slices so the viewers never have to
+download or parse whole files. It also serves the viewers themselves, so it
+replaces `python -m http.server`.
+
+API (all filters are optional and accept comma-separated values; use
+`none` to match an empty judgment):
+    GET  /api/files                (files that can't be read are listed under "skipped")
+    GET  /api/records?file=NAME&user_type=&scenario=&judgment=&model=&page=1&page_size=20
+    GET  /api/compare?a=NAME&b=NAME&user_type=&scenario=&agreement=all|agree|disagree|pass|fail&page=1
+    POST /api/evaluations   {"file": NAME, "edits": {"<index>": {"judgment": ..., "reason": ...}}}
+
+Responses carry an ETag (304 on If-None-Match) and are gzip-compressed when
+the client accepts it.
+
+Usage (run from project root):
+    python synthetic-data-EDD/data_server.py --port 8000
+    # then open http://localhost:8000/viewers/compare_viewer.html
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import threading
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from eval_data import DATA_PATH, comparison_models, infer_model, load_records
+
+BASE_PATH = os.path.dirname(os.path.abspath(__file__)) # Served as the web root
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 500
+GZIP_MIN_BYTES = 1024
+FILTER_FIELDS = ('user_type', 'scenario', 'judgment', 'model')
+SKIP_FILES = ('personas.json', 'scenarios.json')
+
+
+class IndexedFile:
+    """One data file held in memory with an inverted index per filter field."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        stat = os.stat(path)
+        self.stamp = (stat.st_mtime_ns, stat.st_size)
+        self.records = load_records(path)
+        if not isinstance(self.records, list) or not all(isinstance(r, dict) for r in self.records):
+            raise ValueError(f"{self.name} is not a list of records")
+        self.index = {field: {} for field in FILTER_FIELDS}
+        for i, record in enumerate(self.records):
+            self._index_record(i, record)
+
+    def _index_record(self, i, record):
+        values = {
+            'user_type': [record.get('user_type')],
+            'scenario': [record.get('scenario')],
+            'judgment': [record.get('judgment') or 'none'],
+            'model': comparison_models(record) if 'response' not in record else [infer_model(self.path, record)],
+        }
+        for field, field_values in values.items():
+            for value in field_values:
+                self.index[field].setdefault(value, set()).add(i)
+
+    def version(self):
+        return f"{self.stamp[0]}:{self.stamp[1]}"
+
+    def filter(self, filters):
+        """Return the sorted row indices matching every field in `filters` ({field: [values]})."""
+        matches = None
+        for field, values in filters.items():
+            rows = set()
+            for value in values:
+                rows |= self.index[field].get(value, set())
+            matches = rows if matches is None else matches & rows
+        return sorted(range(len(self.records)) if matches is None else matches)
+
+    def facets(self):
+        return {field: sorted(str(v) for v in values if v is not None) for field, values in self.index.items()}
+
+    def edited_records(self, edits):
+        """A copy of the records with judgment/reason set on rows ({index: {...}}).
+
+        Every index is checked before anything is copied, so a bad edit
+        leaves nothing half-applied; the in-memory records are never changed.
+        """
+        rows = {}
+        for key, edit in edits.items():
+            i = int(key)
+            if not 0 <= i < len(self.records):
+                raise IndexError(f"record index {i} out of range")
+            if not isinstance(edit, dict):
+                raise ValueError(f"edit for record {i} must be an object")
+            rows[i] = edit
+        records = list(self.records)
+        for i, edit in rows.items():
+            records[i] = {**records[i], 'judgment': edit.get('judgment', ''), 'reason': edit.get('reason', '')}
+        return records
+
+
+class DataIndex:
+    """All data files, loaded lazily and reloaded when they change on disk."""
+
+    def __init__(self, data_dir=DATA_PATH):
+        self.data_dir = data_dir
+        self._files = {}
+        self._joins = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        return sorted(
+            os.path.basename(p) for p in glob.glob(os.path.join(self.data_dir, '*.json'))
+            if os.path.basename(p) not in SKIP_FILES
+        )
+
+    def get(self, name):
+        if name not in self.names():
+            raise KeyError(name)
+        path = os.path.join(self.data_dir, name)
+        stat = os.stat(path)
+        with self._lock:
+            indexed = self._files.get(name)
+            if indexed is None or indexed.stamp != (stat.st_mtime_ns, stat.st_size):
+                indexed = self._files[name] = IndexedFile(path)
+            return indexed
+
+    def invalidate(self, name):
+        """Forget a file so it is re-read, e.g. after the server rewrote it."""
+        with self._lock:
+            self._files.pop(name, None)
+
+    def join(self, a, b):
+        """Rows of `a` and `b` matched on question id (cached until either file changes)."""
+        file_a, file_b = self.get(a), self.get(b)
+        key = (a, file_a.version(), b, file_b.version())
+        with self._lock:
+            if key not in self._joins:
+                b_by_id = {record.get('id'): record for record in file_b.records}
+                rows = []
+                for record in file_a.records:
+                    other = b_by_id.get(record.get('id'))
+                    if other is None:
+                        continue
+                    rows.append({
+                        'id': record.get('id'),
+                        'question': record.get('question'),
+                        'user_type': record.get('user_type'),
+                        'scenario': record.get('scenario'),
+                        'a': {k: record.get(k) for k in ('response', 'judgment', 'reason')},
+                        'b': {k: other.get(k) for k in ('response', 'judgment', 'reason')},
+                        'agree': record.get('judgment') == other.get('judgment'),
+                    })
+                self._joins = {key: rows} # Only the latest pair is kept
+            return self._joins[key]
+
+
+def _page_params(query):
+    page = max(1, int(query.get('page', ['1'])[0]))
+    page_size = min(MAX_PAGE_SIZE, max(1, int(query.get('page_size', [str(DEFAULT_PAGE_SIZE)])[0])))
+    return page, page_size
+
+
+def _paginate(rows, page, page_size):
+    total = len(rows)
+    start = (page - 1) * page_size
+    return {
+        'total': total,
+        'page': page,
+        'page_size': page_size,
+        'pages': max(1, -(-total // page_size)),
+        'records': rows[start:start + page_size],
+    }
+
+
+def _filters(query, fields=FILTER_FIELDS):
+    filters = {}
+    for field in fields:
+        raw = query.get(field, [''])[0]
+        if raw and raw != 'all':
+            filters[field] = raw.split(',')
+    return filters
+
+
+def _join_stats(rows):
+    total = len(rows)
+    count = lambda predicate: sum(1 for row in rows if predicate(row)) # noqa: E731
+    return {
+        'total': total,
+        'a_pass': count(lambda r: r['a']['judgment'] == 'pass'),
+        'b_pass': count(lambda r: r['b']['judgment'] == 'pass'),
+        'agree': count(lambda r: r['agree']),
+        'both_pass': count(lambda r: r['a']['judgment'] == 'pass' and r['b']['judgment'] == 'pass'),
+        'both_fail': count(lambda r: r['a']['judgment'] == 'fail' and r['b']['judgment'] == 'fail'),
+    }
+
+
+_AGREEMENT = {
+    'agree': lambda r: r['agree'],
+    'disagree': lambda r: not r['agree'],
+    'pass': lambda r: r['a']['judgment'] == 'pass' and r['b']['judgment'] == 'pass',
+    'fail': lambda r: r['a']['judgment'] == 'fail' and r['b']['judgment'] == 'fail',
+}
+
+
+class DataRequestHandler(SimpleHTTPRequestHandler):
+    """Serves /api/* from the shared DataIndex and everything else as static files."""
+
+    data_index = None # Set by make_server
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if not url.path.startswith('/api/'):
+            return super().do_GET()
+        query = parse_qs(url.query)
+        try:
+            if url.path == '/api/files':
+                names = self.data_index.names()
+                etag_source = "|".join(f"{n}:{os.stat(os.path.join(self.data_index.data_dir, n)).st_mtime_ns}" for n in names)
+                if self._not_modified(etag_source):
+                    return
+                files, skipped = [], []
+                for name in names:
+                    try:
+                        indexed = self.data_index.get(name)
+                    except Exception as e: # One unreadable file shouldn't hide the rest
+                        skipped.append({'name': name, 'error': str(e)})
+                        continue
+                    files.append({'name': name, 'count': len(indexed.records), 'facets': indexed.facets()})
+                return self._send_json({'files': files, 'skipped': skipped})
+
+            if url.path == '/api/records':
+                indexed = self.data_index.get(query['file'][0])
+                if self._not_modified(f"{indexed.name}:{indexed.version()}?{url.query}"):
+                    return
+                page, page_size = _page_params(query)
+                rows = indexed.filter(_filters(query))
+                result = _paginate(rows, page, page_size)
+                result['records'] = [{**indexed.records[i], '_index': i} for i in result['records']]
+                result['file'] = indexed.name
+                return self._send_json(result)
+
+            if url.path == '/api/compare':
+                a, b = query['a'][0], query['b'][0]
+                etag_source = f"{a}:{self.data_index.get(a).version()}|{b}:{self.data_index.get(b).version()}?{url.query}"
+                if self._not_modified(etag_source):
+                    return
+                rows = self.data_index.join(a, b)
+                filters = _filters(query, fields=('user_type', 'scenario'))
+                agreement = _AGREEMENT.get(query.get('agreement', ['all'])[0], lambda r: True)
+                filtered = [
+                    row for row in rows
+                    if all(row[field] in values for field, values in filters.items()) and agreement(row)
+                ]
+                page, page_size = _page_params(query)
+                result = _paginate(filtered, page, page_size)
+                result['stats'] = _join_stats(rows)
+                return self._send_json(result)
+        except (KeyError, ValueError) as e:
+            return self._send_json({'error': f"Bad request: {e}"}, status=HTTPStatus.BAD_REQUEST)
+        self._send_json({'error': 'Not found'}, status=HTTPStatus.NOT_FOUND)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/api/evaluations':
+            return self._send_json({'error': 'Not found'}, status=HTTPStatus.NOT_FOUND)
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length))
+            indexed = self.data_index.get(payload['file'])
+            records = indexed.edited_records(payload.get('edits', {}))
+        except (KeyError, ValueError, IndexError, AttributeError) as e:
+            return self._send_json({'error': f"Bad request: {e}"}, status=HTTPStatus.BAD_REQUEST)
+        name = indexed.name if indexed.name.startswith('evaluated_') else f"evaluated_{indexed.name}"
+        output_path = os.path.join(self.data_index.data_dir, name)
+        with open(output_path, 'w') as f:
+            json.dump(records, f, indent=2)
+        self.data_index.invalidate(name)
+        self._send_json({'saved': name, 'count': len(records)})
+
+    def _not_modified(self, etag_source):
+        """Set the ETag for this response; send 304 and return True if the client has it."""
+        self._etag = '"' + hashlib.sha1(etag_source.encode('utf-8')).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == self._etag:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', self._etag)
+            self.end_headers()
+            return True
+        return False
+
+    def _send_json(self, payload, status=HTTPStatus.OK):
+        body = json.dumps(payload).encode('utf-8')
+        gzipped = 'gzip' in self.headers.get('Accept-Encoding', '') and len(body) >= GZIP_MIN_BYTES
+        if gzipped:
+            body = gzip.compress(body)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Cache-Control', 'no-cache') # Revalidate with the ETag every time
+        if status == HTTPStatus.OK and getattr(self, '_etag', None):
+            self.send_header('ETag', self._etag)
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(host='127.0.0.1', port=8000, data_dir=DATA_PATH):
+    handler = partial(DataRequestHandler, directory=BASE_PATH)
+    DataRequestHandler.data_index = DataIndex(data_dir)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the evaluation viewers with a paginated data API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--data-dir", default=DATA_PATH, help="Directory holding the JSON data files.")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.data_dir)
+    print(f"Serving viewers and data API at http://{args.host}:{args.port}/viewers/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Helpers for reading the JSON files in data/.
+
+The files come in a few shapes (questions, single-model responses, judged
+responses and side-by-side model comparisons). These helpers flatten all of
+them into one record per (question, model) so other scripts don't need to
+care which shape they were handed.
+"""
+
+import json
+import os
+
+BASE_PATH = os.path.dirname(__file__) # Directory of this script
+DATA_PATH = os.path.join(BASE_PATH, 'data')
+
+# Model used to produce responses when a file doesn't say otherwise
+DEFAULT_MODEL = "openai"
+
+
+def load_records(path):
+    """Load a JSON array of records from a data file.
+
+    Comparison files written by compare_models.py store sources once at the
+    top level; they are expanded back into the row-per-question shape.
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if isinstance(data, dict) and 'comparisons' in data:
+        return expand_comparisons(data)
+    return data
+
+
+def resolve_sources(refs, sources):
+    """Turn a row's `[{"id", "relevance"}]` source references back into chunks."""
+    return [{**sources[ref['id']], 'id': ref['id'], 'relevance': ref.get('relevance')} for ref in refs]
+
+
+def expand_comparisons(data):
+    """Expand a shared-sources comparison file into `<model>_response` rows."""
+    rows = []
+    for row in data['comparisons']:
+        chunks = resolve_sources(row.get('sources', []), data['sources'])
+        sources_text = format_sources(chunks)
+        expanded = {key: value for key, value in row.items() if key != 'sources'}
+        for model in data['models']:
+            if f'{model}_response' in row:
+                expanded[f'{model}_response'] = [row[f'{model}_response'], sources_text]
+        rows.append(expanded)
+    return rows
+
+
+def split_response(response):
+    """Split a stored response into (answer, sources_text, metadata).
+
+    Responses are stored as `[answer, sources_text]` or
+    `[answer, sources_text, metadata]`; older files may hold a plain string.
+    """
+    if isinstance(response, list):
+        answer = response[0] if len(response) > 0 else ""
+        sources = response[1] if len(response) > 1 else ""
+        metadata = response[2] if len(response) > 2 and isinstance(response[2], dict) else {}
+        return str(answer), str(sources), metadata
+    if response is None:
+        return "", "", {}
+    return str(response), "", {}
+
+
+def infer_model(path, record):
+    """Work out which generator produced a record."""
+    if record.get('model_provider'):
+        return record['model_provider']
+    if 'gemini' in os.path.basename(path).lower():
+        return 'gemini'
+    return DEFAULT_MODEL
+
+
+def comparison_models(record):
+    """Return the model names in a side-by-side comparison record (e.g. `gemini_response`)."""
+    return [key[:-len('_response')] for key in record if key.endswith('_response')]
+
+
+def _as_float(value):
+    if value in (None, ""):
+        return None
+    return float(value)
+
+
+def _as_int(value):
+    if value in (None, ""):
+        return None
+    return int(value)
+
+
+def flatten_records(path, records=None):
+    """Yield one flat record per (question, model) for any of the data file shapes."""
+    if records is None:
+        records = load_records(path)
+    source_file = os.path.basename(path)
+    for record in records:
+        base = {
+            'id': record.get('id'),
+            'question': record.get('question'),
+            'user_type': record.get('user_type'),
+            'scenario': record.get('scenario'),
+            'source_file': source_file,
+        }
+        models = comparison_models(record) if 'response' not in record else []
+        if models:
+            # Side-by-side comparison: one row per model
+            for model in models:
+                answer, sources, metadata = split_response(record.get(f'{model}_response'))
+                yield {
+                    **base,
+                    'model': model,
+                    'answer': answer,
+                    'sources': sources,
+                    'judgment': None,
+                    'reason': None,
+                    'evaluation_type': None,
+                    'duration_ms': _as_float(record.get(f'{model}_duration_ms')),
+                    'context_tokens': _as_int(metadata.get('context_tokens')),
+                    'completion_tokens': _as_int(record.get(f'{model}_tokens') or metadata.get('completion_tokens')),
+                    'timestamp': record.get('timestamp'),
+                }
+            continue
+
+        if 'response' not in record:
+            # Bare question (questions.json)
+            yield {**base, 'model': None, 'answer': None, 'sources': None,
+                   'judgment': None, 'reason': None, 'evaluation_type': None,
+                   'duration_ms': None, 'context_tokens': None,
+                   'completion_tokens': None, 'timestamp': None}
+            continue
+
+        answer, sources, metadata = split_response(record['response'])
+        judgment = record.get('judgment') or None
+        evaluation_type = record.get('evaluation_type')
+        if judgment and not evaluation_type:
+            # Judgments without an evaluation_type were labelled by hand
+            evaluation_type = 'human'
+        yield {
+            **base,
+            'model': infer_model(path, record),
+            'answer': answer,
+            'sources': sources,
+            'judgment': judgment,
+            'reason': record.get('reason') or None,
+            'evaluation_type': evaluation_type,
+            'duration_ms': _as_float(record.get('duration_ms')),
+            'context_tokens': _as_int(record.get('context_tokens', metadata.get('context_tokens'))),
+            'completion_tokens': _as_int(record.get('completion_tokens', metadata.get('completion_tokens'))),
+            'timestamp': record.get('timestamp'),
+        }
+
+
+def format_sources(chunks):
+    """Render chunks as the human-readable "Sources" block stored with each response."""
+    if not chunks:
+        return "No source information available."
+    lines = ["Sources (most similar first, lower distance = more similar):"]
+    for i, chunk in enumerate(chunks, start=1):
+        metadata = chunk.get('metadata') or {}
+        # Retrievers report similarity; store it as a distance like the original pipeline
+        relevance = chunk.get('relevance')
+        distance = 1.0 - relevance if relevance is not None else float('nan')
+        header = f"{i}. [Distance: {distance:.4f}] [Chunk {metadata.get('position', i)}]"
+        if metadata.get('speaker'):
+            header += f" Speaker: {metadata['speaker']}."
+        body = "\n".join(f"    {line}" for line in chunk['text'].split("\n"))
+        lines.append(f"{header} \n{body}\n")
+    return "\n".join(lines)
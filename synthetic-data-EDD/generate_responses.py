@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Run synthetic questions through a RAG system to produce responses.
+
+Reads questions.json, answers every question with one shared index and
+writes a responses_<timestamp>.json file in the same schema as
+data/responses_20250328_190348.json (ready for manual labelling or
+simple_llm_judge.py). Retrieval and generation latency are recorded per
+question.
+
+Usage (run from project root):
+    python synthetic-data-EDD/generate_responses.py --docs-dir path/to/transcripts
+    python synthetic-data-EDD/generate_responses.py --workers 16 --limit 5
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from eval_data import format_sources
+from rag_backend import BACKENDS, DEFAULT_PERSIST_DIR, DEFAULT_TOP_K, node_to_chunk
+
+BASE_PATH = os.path.dirname(__file__) # Directory of this script
+DATA_PATH = os.path.join(BASE_PATH, 'data')
+MAX_WORKERS = 8 # Questions answered concurrently
+
+
+def answer_question(rag, item):
+    """Answer one question, returning a record in the responses_*.json schema."""
+    start = time.perf_counter()
+    try:
+        nodes = rag.retrieve(item['question'])
+        retrieved = time.perf_counter()
+        answer = rag.generate(item['question'], nodes)
+        finished = time.perf_counter()
+        chunks = [node_to_chunk(n) for n in nodes]
+        metadata = {
+            'num_chunks': len(chunks),
+            'context_tokens': sum(rag.count_tokens(c['text']) for c in chunks),
+            'completion_tokens': rag.count_tokens(answer),
+            'embedding_tokens': rag.count_tokens(item['question']),
+            'chunks': chunks,
+        }
+        response = [answer, format_sources(chunks), metadata]
+        success = True
+        retrieval_ms = round((retrieved - start) * 1000, 1)
+        generation_ms = round((finished - retrieved) * 1000, 1)
+    except Exception as e:
+        finished = time.perf_counter()
+        response = [f"Error: {e}", "No source information available."]
+        success = False
+        retrieval_ms = generation_ms = None
+    return {
+        'question': item['question'],
+        'response': response,
+        'success': success,
+        'duration_ms': int((finished - start) * 1000),
+        'retrieval_ms': retrieval_ms,
+        'generation_ms': generation_ms,
+        'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'id': item['id'],
+        'user_type': item['user_type'],
+        'scenario': item['scenario'],
+        'judgment': '',
+        'reason': '',
+    }
+
+
+def generate_responses(rag, questions, max_workers=MAX_WORKERS):
+    """Answer `questions` concurrently; results keep the input order."""
+    results = [None] * len(questions)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(answer_question, rag, item): i for i, item in enumerate(questions)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            results[i] = future.result()
+            status = "ok" if results[i]['success'] else "FAILED"
+            print(f"[{done}/{len(questions)}] {results[i]['id']}: {status} ({results[i]['duration_ms']} ms)")
+    return results
+
+
+def _percentile(values, pct):
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def print_latency_summary(results, elapsed_s):
+    print(f"\nAnswered {len(results)} questions in {elapsed_s:.1f}s "
+          f"({len(results) / max(elapsed_s, 1e-9):.2f} questions/sec)")
+    for stage in ('retrieval_ms', 'generation_ms', 'duration_ms'):
+        values = [r[stage] for r in results]
+        print(f"  {stage:<14} p50 {_percentile(values, 50):8.0f}  p95 {_percentile(values, 95):8.0f}")
+    failures = sum(not r['success'] for r in results)
+    if failures:
+        print(f"  {failures} questions failed (success: false)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate RAG responses for synthetic questions.")
+    parser.add_argument("--questions-file", default=os.path.join(DATA_PATH, 'questions.json'),
+                        help="Path to the questions JSON file.")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="llama_index", help="RAG backend to use.")
+    parser.add_argument("--docs-dir", help="Directory of documents to index (only needed the first time).")
+    parser.add_argument("--persist-dir", default=DEFAULT_PERSIST_DIR, help="Where the built index is cached.")
+    parser.add_argument("--top-k", type=int, default=DEFAULT_TOP_K, help="Chunks retrieved per question.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Questions answered concurrently.")
+    parser.add_argument("--limit", type=int, help="Only answer the first N questions.")
+    parser.add_argument("--output-file", help="Output path (defaults to data/responses_<timestamp>.json).")
+    args = parser.parse_args()
+
+    load_dotenv(os.path.join(BASE_PATH, os.path.pardir, '.env'))
+
+    with open(args.questions_file, 'r') as f:
+        questions = json.load(f)
+    if args.limit and args.limit > 0:
+        questions = questions[:args.limit]
+    print(f"Loaded {len(questions)} questions from {args.questions_file}")
+
+    # The index is built (or loaded) once and shared by every worker
+    rag = BACKENDS[args.backend](docs_dir=args.docs_dir, persist_dir=args.persist_dir, top_k=args.top_k)
+
+    start = time.perf_counter()
+    results = generate_responses(rag, questions, max_workers=args.workers)
+    print_latency_summary(results, time.perf_counter() - start)
+
+    output_path = args.output_file or os.path.join(
+        DATA_PATH, f"responses_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved responses to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Agreement between judges: human labels, the GPT judge and the Gemini judge.
+
+Every judgment file is joined on question ID into one label matrix (one row
+per question, one column per judge, -1 where a judge has no pass/fail
+label). Agreement, Cohen's kappa, confusion matrices and pass rates are
+computed from counts, and bootstrap confidence intervals resample those
+counts directly (a multinomial draw over the four confusion cells, or a
+binomial draw for a pass rate), so the cost of a bootstrap does not grow with
+the number of items.
+
+Usage (run from project root):
+    python synthetic-data-EDD/judge_agreement.py report
+    python synthetic-data-EDD/judge_agreement.py report --by user_type scenario --bootstrap 10000
+    python synthetic-data-EDD/judge_agreement.py report --judge human=data/evaluated_responses_20250328_190348.json \\
+        --judge gpt=data/llm_evaluated_20250328_220744.json
+    python synthetic-data-EDD/judge_agreement.py benchmark --items 100000 --bootstrap 10000
+"""
+
+import argparse
+import os
+import re
+import time
+from itertools import combinations
+
+import numpy as np
+
+from eval_data import DATA_PATH, load_records
+
+MISSING, FAIL, PASS = -1, 0, 1
+LABEL_CODES = {'pass': PASS, 'fail': FAIL} # Anything else (blank, "unknown") counts as missing
+DEFAULT_BOOTSTRAP = 2000 # Resamples per confidence interval
+CI_LEVEL = 0.95
+
+# Judges found automatically in data/ when --judge isn't given (latest file wins)
+# Timestamped runs only (<prefix>_YYYYMMDD_HHMMSS.json), not the judge's
+# _all.json or _compare_<timestamp>.json outputs
+DEFAULT_JUDGE_PATTERNS = {
+    'human': re.compile(r'^evaluated_responses_(\d{8}_\d{6})\.json$'),
+    'gpt': re.compile(r'^llm_evaluated_(\d{8}_\d{6})\.json$'),
+    'gemini': re.compile(r'^gemini_llm_evaluated_(\d{8}_\d{6})\.json$'),
+}
+
+
+class JudgmentMatrix:
+    """Labels from several judges joined on question ID.
+
+    `labels` is an int8 array of shape (n_items, n_judges) holding PASS, FAIL
+    or MISSING; `user_type` and `scenario` are integer codes into
+    `levels['user_type']` and `levels['scenario']`.
+    """
+
+    def __init__(self, judges):
+        self.judges = list(judges)
+        self.ids = []
+        self._row = {} # question ID -> row in `labels`
+        self._columns = {'user_type': [], 'scenario': []}
+        self.levels = {'user_type': [], 'scenario': []}
+        self._level_codes = {'user_type': {}, 'scenario': {}}
+        self.labels = np.empty((0, len(self.judges)), dtype=np.int8)
+
+    @classmethod
+    def from_records(cls, records_by_judge):
+        """Build from `{judge: [record, ...]}`; records are matched on their `id`."""
+        matrix = cls(records_by_judge)
+        # First pass assigns every ID a row; the labels are then written in place
+        for records in records_by_judge.values():
+            for record in records:
+                matrix._row_for(record)
+        matrix.labels = np.full((len(matrix.ids), len(matrix.judges)), MISSING, dtype=np.int8)
+        for column, records in enumerate(records_by_judge.values()):
+            rows = np.fromiter((matrix._row[record.get('id')] for record in records), dtype=np.int64, count=len(records))
+            codes = np.fromiter((LABEL_CODES.get(record.get('judgment'), MISSING) for record in records),
+                                dtype=np.int8, count=len(records))
+            matrix.labels[rows, column] = codes
+        for name in matrix._columns:
+            matrix._columns[name] = np.asarray(matrix._columns[name], dtype=np.int32)
+        return matrix
+
+    @classmethod
+    def from_files(cls, paths_by_judge):
+        return cls.from_records({judge: load_records(path) for judge, path in paths_by_judge.items()})
+
+    def _row_for(self, record):
+        key = record.get('id')
+        row = self._row.get(key)
+        if row is None:
+            row = self._row[key] = len(self.ids)
+            self.ids.append(key)
+            for name in self._columns:
+                self._columns[name].append(self._code(name, record.get(name)))
+        return row
+
+    def _code(self, name, value):
+        codes = self._level_codes[name]
+        if value not in codes:
+            codes[value] = len(self.levels[name])
+            self.levels[name].append(value)
+        return codes[value]
+
+    def column(self, judge):
+        return self.labels[:, self.judges.index(judge)]
+
+    def groups(self, by):
+        """Return (group code per item, list of group keys) for the `by` columns."""
+        if not by:
+            return np.zeros(len(self.ids), dtype=np.int64), [()]
+        codes = np.zeros(len(self.ids), dtype=np.int64)
+        for name in by:
+            codes = codes * len(self.levels[name]) + self._columns[name]
+        present, inverse = np.unique(codes, return_inverse=True)
+        keys = []
+        for code in present:
+            key = []
+            for name in reversed(by):
+                code, level = divmod(int(code), len(self.levels[name]))
+                key.append(self.levels[name][level])
+            keys.append(tuple(reversed(key)))
+        return inverse, keys
+
+
+# --- Metrics from counts (all broadcast over leading axes) ---
+
+def confusion_matrix(a, b, groups=None, n_groups=1):
+    """2x2 counts of (a, b) labels over items both judges labelled, per group.
+
+    Rows are judge `a` (fail, pass), columns judge `b`. Returns shape
+    (n_groups, 2, 2).
+    """
+    both = (a != MISSING) & (b != MISSING)
+    groups = np.zeros(len(a), dtype=np.int64) if groups is None else groups
+    cells = groups[both] * 4 + a[both].astype(np.int64) * 2 + b[both]
+    return np.bincount(cells, minlength=n_groups * 4).reshape(n_groups, 2, 2)
+
+
+def agreement(confusion):
+    n = confusion.sum(axis=(-2, -1))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (confusion[..., 0, 0] + confusion[..., 1, 1]) / n
+
+
+def cohens_kappa(confusion):
+    """Cohen's kappa; NaN when chance agreement is 1 (e.g. both judges always pass)."""
+    n = confusion.sum(axis=(-2, -1)).astype(np.float64)
+    rows = confusion.sum(axis=-1)
+    cols = confusion.sum(axis=-2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        observed = (confusion[..., 0, 0] + confusion[..., 1, 1]) / n
+        expected = (rows * cols).sum(axis=-1) / (n * n)
+        return (observed - expected) / (1 - expected)
+
+
+def pass_counts(labels, groups=None, n_groups=1):
+    """(labelled, passed) counts per group for one judge's labels."""
+    labelled = labels != MISSING
+    groups = np.zeros(len(labels), dtype=np.int64) if groups is None else groups
+    n = np.bincount(groups[labelled], minlength=n_groups)
+    passed = np.bincount(groups[labelled], weights=labels[labelled] == PASS, minlength=n_groups).astype(np.int64)
+    return n, passed
+
+
+# --- Bootstrap ---
+
+def _interval(samples, level=CI_LEVEL):
+    tail = (1 - level) / 2 * 100
+    with np.errstate(invalid='ignore'):
+        return np.nanpercentile(samples, [tail, 100 - tail], axis=0)
+
+
+def bootstrap_confusion(confusion, n_resamples=DEFAULT_BOOTSTRAP, rng=None):
+    """Resample items with replacement, expressed as multinomial draws over the 4 cells.
+
+    `confusion` has shape (n_groups, 2, 2); returns (n_resamples, n_groups, 2, 2).
+    """
+    rng = np.random.default_rng(rng)
+    flat = confusion.reshape(-1, 4)
+    n = flat.sum(axis=1)
+    samples = np.zeros((n_resamples, len(flat), 4), dtype=np.int64)
+    for g in np.flatnonzero(n):
+        samples[:, g] = rng.multinomial(n[g], flat[g] / n[g], size=n_resamples)
+    return samples.reshape(n_resamples, *confusion.shape)
+
+
+def bootstrap_pass_rate(n, passed, n_resamples=DEFAULT_BOOTSTRAP, rng=None):
+    """Bootstrap pass rates per group as binomial draws; returns (n_resamples, n_groups)."""
+    rng = np.random.default_rng(rng)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p = np.where(n > 0, passed / np.maximum(n, 1), 0.0)
+        return rng.binomial(n, p, size=(n_resamples, len(n))) / n
+
+
+# --- Reports ---
+
+def agreement_report(matrix, judge_a, judge_b, by=(), n_resamples=DEFAULT_BOOTSTRAP, rng=None):
+    """Agreement and kappa (with bootstrap CIs) between two judges, per group."""
+    groups, keys = matrix.groups(by)
+    confusion = confusion_matrix(matrix.column(judge_a), matrix.column(judge_b), groups, len(keys))
+    samples = bootstrap_confusion(confusion, n_resamples, rng)
+    agreement_ci = _interval(agreement(samples))
+    kappa_ci = _interval(cohens_kappa(samples))
+    rows = []
+    for g, key in enumerate(keys):
+        rows.append({
+            **dict(zip(by, key)),
+            'n': int(confusion[g].sum()),
+            'agreement': float(agreement(confusion[g])),
+            'agreement_ci': (float(agreement_ci[0, g]), float(agreement_ci[1, g])),
+            'kappa': float(cohens_kappa(confusion[g])),
+            'kappa_ci': (float(kappa_ci[0, g]), float(kappa_ci[1, g])),
+            'confusion': confusion[g].tolist(),
+        })
+    return rows
+
+
+def pass_rate_report(matrix, judge, by=(), n_resamples=DEFAULT_BOOTSTRAP, rng=None):
+    """Pass rate (with bootstrap CI) for one judge, per group."""
+    groups, keys = matrix.groups(by)
+    n, passed = pass_counts(matrix.column(judge), groups, len(keys))
+    ci = _interval(bootstrap_pass_rate(n, passed, n_resamples, rng))
+    rows = []
+    for g, key in enumerate(keys):
+        if not n[g]:
+            continue
+        rows.append({
+            **dict(zip(by, key)),
+            'n': int(n[g]),
+            'passed': int(passed[g]),
+            'pass_rate': passed[g] / n[g],
+            'pass_rate_ci': (float(ci[0, g]), float(ci[1, g])),
+        })
+    return rows
+
+
+def default_judge_files(data_dir=DATA_PATH):
+    """Newest timestamped run in `data_dir` for each of DEFAULT_JUDGE_PATTERNS."""
+    paths = {}
+    names = sorted(os.listdir(data_dir))
+    for judge, pattern in DEFAULT_JUDGE_PATTERNS.items():
+        runs = [(match.group(1), name) for name in names if (match := pattern.match(name))]
+        if runs:
+            paths[judge] = os.path.join(data_dir, max(runs)[1])
+    return paths
+
+
+def _group_label(row, by):
+    return " / ".join(str(row[name]) for name in by) if by else "overall"
+
+
+def print_report(matrix, by=(), n_resamples=DEFAULT_BOOTSTRAP, seed=None):
+    rng = np.random.default_rng(seed)
+    print(f"Joined {len(matrix.ids)} questions across judges: {', '.join(matrix.judges)}")
+
+    print("\n--- Pass rates ---")
+    for judge in matrix.judges:
+        for row in pass_rate_report(matrix, judge, by, n_resamples, rng):
+            low, high = row['pass_rate_ci']
+            print(f"{judge:<8} {_group_label(row, by):<30} {row['pass_rate'] * 100:5.1f}% "
+                  f"[{low * 100:5.1f}, {high * 100:5.1f}]  ({row['passed']}/{row['n']})")
+
+    for judge_a, judge_b in combinations(matrix.judges, 2):
+        print(f"\n--- {judge_a} vs {judge_b} ---")
+        for row in agreement_report(matrix, judge_a, judge_b, by, n_resamples, rng):
+            if not row['n']:
+                continue
+            (ff, fp), (pf, pp) = row['confusion']
+            print(f"{_group_label(row, by):<30} n={row['n']:<5} "
+                  f"agreement {row['agreement'] * 100:5.1f}% [{row['agreement_ci'][0] * 100:5.1f}, {row['agreement_ci'][1] * 100:5.1f}]  "
+                  f"kappa {row['kappa']:6.3f} [{row['kappa_ci'][0]:6.3f}, {row['kappa_ci'][1]:6.3f}]  "
+                  f"confusion (rows {judge_a} fail/pass): [[{ff}, {fp}], [{pf}, {pp}]]")
+
+
+def benchmark(n_items=100_000, n_resamples=10_000, seed=0):
+    """Time joining and bootstrapping synthetic labels for `n_items` questions."""
+    rng = np.random.default_rng(seed)
+    user_types = ['student', 'ml_engineer', 'data_scientist']
+    scenarios = ['general', 'factual', 'technical']
+    truth = rng.random(n_items) < 0.6
+    records = {}
+    for judge, noise in (('human', 0.0), ('gpt', 0.1), ('gemini', 0.2)):
+        flips = rng.random(n_items) < noise
+        labels = np.where(truth ^ flips, 'pass', 'fail')
+        records[judge] = [
+            {'id': f"q{i}", 'user_type': user_types[i % 3], 'scenario': scenarios[(i // 3) % 3], 'judgment': labels[i]}
+            for i in rng.permutation(n_items)
+        ]
+
+    start = time.perf_counter()
+    matrix = JudgmentMatrix.from_records(records)
+    join_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for judge_a, judge_b in combinations(matrix.judges, 2):
+        agreement_report(matrix, judge_a, judge_b, ('user_type', 'scenario'), n_resamples, rng)
+    for judge in matrix.judges:
+        pass_rate_report(matrix, judge, ('user_type', 'scenario'), n_resamples, rng)
+    report_s = time.perf_counter() - start
+
+    print(f"Join of {len(matrix.judges)} judges x {n_items} items: {join_s:.2f}s")
+    print(f"All reports by user_type/scenario with {n_resamples} resamples: {report_s:.2f}s")
+    return join_s, report_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agreement analytics across human and LLM judges.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    report_parser = subparsers.add_parser("report", help="Print pass rates and pairwise agreement.")
+    report_parser.add_argument("--data-dir", default=DATA_PATH, help="Where to look for the default judge files.")
+    report_parser.add_argument("--judge", action="append", metavar="NAME=PATH",
+                               help="Judgment file for a judge (repeatable). Defaults to the latest "
+                                    "human, GPT and Gemini files in data/.")
+    report_parser.add_argument("--by", nargs="*", default=[], choices=["user_type", "scenario"],
+                               help="Break results down by persona and/or scenario.")
+    report_parser.add_argument("--bootstrap", type=int, default=DEFAULT_BOOTSTRAP, help="Bootstrap resamples.")
+    report_parser.add_argument("--seed", type=int, help="Random seed for the bootstrap.")
+
+    bench_parser = subparsers.add_parser("benchmark", help="Time the analytics on synthetic labels.")
+    bench_parser.add_argument("--items", type=int, default=100_000)
+    bench_parser.add_argument("--bootstrap", type=int, default=10_000)
+
+    args = parser.parse_args()
+
+    if args.command == "report":
+        if args.judge:
+            paths = dict(spec.split('=', 1) for spec in args.judge)
+        else:
+            paths = default_judge_files(args.data_dir)
+        for judge, path in paths.items():
+            print(f"{judge}: {path}")
+        matrix = JudgmentMatrix.from_files(paths)
+        print_report(matrix, by=args.by, n_resamples=args.bootstrap, seed=args.seed)
+    elif args.command == "benchmark":
+        benchmark(args.items, args.bootstrap)
+
+
+if __name__ == "__main__":
+    main()
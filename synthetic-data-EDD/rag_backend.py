@@ -0,0 +1,78 @@
+"""
+RAG backends used to turn synthetic questions into responses.
+
+The llama_index backend is the same pipeline as the apps in `apps/`
+(VectorStoreIndex over a directory of documents), except that the index is
+built once and persisted, and retrieval and generation are separate steps so
+they can be timed (and shared across generator models) independently.
+"""
+
+import os
+
+from llama_index.core import (
+    SimpleDirectoryReader,
+    StorageContext,
+    VectorStoreIndex,
+    get_response_synthesizer,
+    load_index_from_storage,
+)
+from llama_index.core.utils import get_tokenizer
+
+BASE_PATH = os.path.dirname(__file__) # Directory of this script
+DEFAULT_PERSIST_DIR = os.path.join(BASE_PATH, 'data', 'index') # Built index is cached here
+DEFAULT_TOP_K = 5
+
+
+class LlamaIndexRAG:
+    """Retrieve-then-synthesize over a llama_index VectorStoreIndex."""
+
+    def __init__(self, docs_dir=None, persist_dir=DEFAULT_PERSIST_DIR, top_k=DEFAULT_TOP_K, llm=None):
+        self.index = self._load_or_build_index(docs_dir, persist_dir)
+        self.retriever = self.index.as_retriever(similarity_top_k=top_k)
+        self.synthesizer = get_response_synthesizer(llm=llm)
+        self._tokenizer = get_tokenizer()
+
+    @staticmethod
+    def _load_or_build_index(docs_dir, persist_dir):
+        if persist_dir and os.path.exists(os.path.join(persist_dir, 'docstore.json')):
+            print(f"Loading index from {persist_dir}...")
+            storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
+            return load_index_from_storage(storage_context)
+        if not docs_dir:
+            raise ValueError(f"No index found at {persist_dir}; pass docs_dir to build one.")
+        print(f"Building index from {docs_dir}...")
+        documents = SimpleDirectoryReader(docs_dir).load_data()
+        index = VectorStoreIndex.from_documents(documents)
+        if persist_dir:
+            index.storage_context.persist(persist_dir=persist_dir)
+            print(f"Saved index to {persist_dir}")
+        return index
+
+    def retrieve(self, question):
+        """Return the retrieved nodes (most similar first)."""
+        return self.retriever.retrieve(question)
+
+    def generate(self, question, nodes, llm=None):
+        """Answer `question` from already-retrieved `nodes`; `llm` overrides the default generator."""
+        synthesizer = self.synthesizer if llm is None else get_response_synthesizer(llm=llm)
+        return synthesizer.synthesize(question, nodes=nodes).response or ""
+
+    def count_tokens(self, text):
+        return len(self._tokenizer(text or ""))
+
+
+# Backends selectable with --backend
+BACKENDS = {
+    "llama_index": LlamaIndexRAG,
+}
+
+
+def node_to_chunk(node_with_score):
+    """Serialise a retrieved node the way the responses_*.json files store chunks."""
+    node = node_with_score.node
+    return {
+        'text': node.get_content(),
+        'metadata': dict(node.metadata),
+        'id': node.node_id,
+        'relevance': node_with_score.score,
+    }
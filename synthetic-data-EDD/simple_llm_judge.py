@@ -11,6 +11,15 @@ import time
 from openai import OpenAI
 from dotenv import load_dotenv
 import argparse # Import argparse
+import math
+import random
+from collections import Counter
+from datetime import datetime
+from statistics import NormalDist
+from typing import Literal
+
+import openai
+from pydantic import BaseModel, Field
 
 # Load environment variables
 load_dotenv()
@@ -18,8 +27,28 @@ load_dotenv()
 # Initialize OpenAI client
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-def evaluate_rag_response(question, new_response, good_examples, bad_examples):
-    """Use GPT-4 to evaluate a RAG response with few-shot examples."""
+JUDGE_MODEL = "gpt-4o"
+REASK_MODEL = "gpt-4o-mini" # Cheaper model used to re-ask only the items whose verdict couldn't be parsed
+
+class JudgeVerdict(BaseModel):
+    """Structured judge output (enforced with the response_format JSON schema)."""
+    # Reason comes first so the model explains itself before committing to a verdict
+    reason: str = Field(description="Brief explanation of the judgment.")
+    judgment: Literal["pass", "fail"] = Field(description='"pass" if the response is acceptable (+1), "fail" if not (-1).')
+
+# Active sampling defaults
+TARGET_CI_WIDTH = 0.1 # Stop when the 95% interval is this wide
+MIN_SAMPLES = 30 # Never stop before judging this many responses per file
+LOOK_GROWTH = 1.25 # After MIN_SAMPLES, re-check the stopping rule each time the sample grows by this factor
+ALPHA = 0.05
+Z_95 = 1.96
+
+def evaluate_rag_response(question, new_response, good_examples, bad_examples, model=JUDGE_MODEL):
+    """Use GPT-4 to evaluate a RAG response with few-shot examples.
+
+    Returns (judgment, reason); judgment is "unknown" only if no valid verdict
+    came back (a refusal, a truncated reply or an API error).
+    """
     
     # Build the prompt with examples and the new response
     prompt = f"""You are evaluating the output of a RAG system for workshop transcripts. 
@@ -60,37 +89,185 @@ A response is unacceptable (-1) if:
 - It hallucinates or fabricates content
 - It fails to address key parts of the question
 
-### Format your reply like this:
-Judgment: "+1" or "-1"
-Reason: (brief explanation)
+### Reply with:
+- reason: a brief explanation
+- judgment: "pass" for an acceptable (+1) response or "fail" for an unacceptable (-1) one
 """
     
-    # Call GPT-4 to evaluate
-    response = client.chat.completions.create(
-        model="gpt-4o",
-        messages=[
-            {"role": "system", "content": "You are an expert evaluator for RAG systems."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.1
+    # Call the judge with the verdict schema as the response format
+    try:
+        response = client.beta.chat.completions.parse(
+            model=model,
+            messages=[
+                {"role": "system", "content": "You are an expert evaluator for RAG systems."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format=JudgeVerdict,
+            temperature=0.1
+        )
+    except (openai.LengthFinishReasonError, openai.ContentFilterFinishReasonError, openai.APIError) as e:
+        return "unknown", f"Judge call failed: {e}"
+    
+    message = response.choices[0].message
+    if message.parsed is None:
+        return "unknown", f"Judge refused: {message.refusal or 'no verdict returned'}"
+    return message.parsed.judgment, message.parsed.reason
+
+def judge_item(item, good_examples, bad_examples, stats=None):
+    """Judge one response record in place and return it.
+
+    If the judge doesn't return a valid verdict the item is re-asked once with
+    REASK_MODEL. `stats` (a Counter) tallies judged items and unknowns.
+    """
+    question = item['question']
+    if isinstance(item['response'], list):
+        response_text = item['response'][0]
+    else:
+        response_text = str(item['response'])
+    
+    print(f"Question: {question[:50]}...")
+    
+    # Evaluate with GPT-4
+    judgment, reason = evaluate_rag_response(
+        question, 
+        response_text, 
+        good_examples, 
+        bad_examples
     )
+    stats = stats if stats is not None else Counter()
+    stats['judged'] += 1
+    if judgment == "unknown":
+        stats['unknown_first_pass'] += 1
+        stats['reasked'] += 1
+        print(f"No verdict ({reason}); re-asking with {REASK_MODEL}...")
+        judgment, reason = evaluate_rag_response(
+            question, 
+            response_text, 
+            good_examples, 
+            bad_examples, 
+            model=REASK_MODEL
+        )
+        if judgment == "unknown":
+            stats['unknown'] += 1
     
-    # Parse the result
-    content = response.choices[0].message.content
+    print(f"Judgment: {judgment}")
+    print(f"Reason: {reason[:100]}...")
     
-    # Extract judgment
-    if "Judgment: \"+1\"" in content or "Judgment: +1" in content:
-        judgment = "pass"
-    elif "Judgment: \"-1\"" in content or "Judgment: -1" in content:
-        judgment = "fail"
-    else:
-        judgment = "unknown"
+    item['judgment'] = judgment
+    item['reason'] = reason
+    item['evaluation_type'] = 'llm'
+    return item
+
+# --- Active sampling ---
+# Judging every response is wasteful when a few hundred judgments already pin
+# down the pass rate (or show which of two configurations is better). Active
+# mode judges responses in random order, so every prefix is a random sample,
+# and stops as soon as the confidence interval is tight enough.
+#
+# Checking a fixed 95% interval after every round and stopping the first time
+# it excludes 0 finds a "difference" far more often than 5% of the time. So
+# the rule is only checked at a few looks (geometrically spaced sample sizes),
+# and each look spends part of the 5% error budget (see look_z): the
+# intervals hold at every look at once, so stopping at any of them is safe.
+
+def look_z(look, alpha=ALPHA):
+    """z for the `look`-th check (from 1) of the stopping rule.
+
+    Look k spends alpha * 6 / (pi^2 k^2) of the error budget; these sum to
+    alpha over any number of looks.
+    """
+    return NormalDist().inv_cdf(1 - alpha * 3 / (math.pi ** 2 * look ** 2))
+
+def wilson_interval(passed, n, z=Z_95):
+    """Wilson score interval for a pass rate; (0, 1) when nothing is judged yet."""
+    if n == 0:
+        return 0.0, 1.0
+    p = passed / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return centre - half_width, centre + half_width
+
+def difference_interval(passed_a, n_a, passed_b, n_b, z=Z_95):
+    """Newcombe's interval for pass_rate_a - pass_rate_b, built from the two Wilson intervals."""
+    p_a = passed_a / n_a if n_a else 0.5
+    p_b = passed_b / n_b if n_b else 0.5
+    low_a, high_a = wilson_interval(passed_a, n_a, z)
+    low_b, high_b = wilson_interval(passed_b, n_b, z)
+    difference = p_a - p_b
+    return (
+        difference - math.sqrt((p_a - low_a) ** 2 + (high_b - p_b) ** 2),
+        difference + math.sqrt((high_a - p_a) ** 2 + (p_b - low_b) ** 2),
+    )
+
+def stopping_reason(counts, target_width, z):
+    """Return why sampling can stop given {config: [passed, n]} counts and the look's z, or None to keep going."""
+    if len(counts) == 1:
+        (passed, n), = counts.values()
+        low, high = wilson_interval(passed, n, z)
+        return f"pass-rate interval width {high - low:.3f} <= {target_width}" if high - low <= target_width else None
+    (passed_a, n_a), (passed_b, n_b) = counts.values()
+    low, high = difference_interval(passed_a, n_a, passed_b, n_b, z)
+    if low > 0 or high < 0:
+        return f"difference interval [{low:+.3f}, {high:+.3f}] excludes 0"
+    if high - low <= target_width:
+        return f"difference interval width {high - low:.3f} <= {target_width}"
+    return None
+
+def active_evaluate(configs, good_examples, bad_examples, target_width=TARGET_CI_WIDTH,
+                    min_samples=MIN_SAMPLES, seed=None, stats=None):
+    """Judge `configs` ({name: responses}, one or two of them) in random order until the
+    stopping rule is met at one of the looks. Returns {name: judged responses}."""
+    rng = random.Random(seed)
+    queues = {name: rng.sample(items, len(items)) for name, items in configs.items()}
+    judged = {name: [] for name in configs}
+    counts = {name: [0, 0] for name in configs} # [passed, n] over pass/fail judgments
+    total = sum(len(items) for items in configs.values())
+    reason = None
+    look, next_look, z = 0, min_samples, look_z(1)
     
-    # Extract reason
-    reason_parts = content.split("Reason:", 1)
-    reason = reason_parts[1].strip() if len(reason_parts) > 1 else "No reason provided"
+    print(f"Active sampling over {total} responses (target width {target_width}, min {min_samples} per file)...")
+    while reason is None and any(queues.values()):
+        # Round-robin so both configurations gain precision at the same rate
+        for name, queue in queues.items():
+            if not queue:
+                continue
+            item = judge_item(queue.pop(), good_examples, bad_examples, stats)
+            judged[name].append(item)
+            if item['judgment'] in ('pass', 'fail'):
+                counts[name][0] += item['judgment'] == 'pass'
+                counts[name][1] += 1
+            time.sleep(1)
+        n_min = min(n for _, n in counts.values())
+        if n_min >= next_look:
+            look += 1
+            next_look = max(n_min + 1, math.ceil(n_min * LOOK_GROWTH))
+            z = look_z(look)
+            reason = stopping_reason(counts, target_width, z)
+        summary = ", ".join(
+            f"{name}: {passed}/{n} pass [{low:.2f}, {high:.2f}]"
+            for name, (passed, n) in counts.items()
+            for low, high in [wilson_interval(passed, n, z)]
+        )
+        print(f"\n[{sum(len(j) for j in judged.values())}/{total} judged] {summary}")
     
-    return judgment, reason
+    calls = sum(len(j) for j in judged.values())
+    print(f"\nStopped: {reason or 'every response judged'}")
+    print(f"Made {calls} judge calls out of {total}; saved {total - calls} ({(total - calls) / max(total, 1) * 100:.0f}%).")
+    if len(counts) == 2:
+        (passed_a, n_a), (passed_b, n_b) = counts.values()
+        low, high = difference_interval(passed_a, n_a, passed_b, n_b, z)
+        print(f"Pass-rate difference ({' - '.join(counts)}): "
+              f"{passed_a / max(n_a, 1) - passed_b / max(n_b, 1):+.3f} [{low:+.3f}, {high:+.3f}]")
+    return judged
+
+def report_unknown_rate(stats):
+    """Print how many verdicts were unknown before and after re-asking."""
+    judged = max(stats['judged'], 1)
+    print(f"\nUnknown verdicts: {stats['unknown_first_pass']}/{stats['judged']} "
+          f"({stats['unknown_first_pass'] / judged * 100:.1f}%) on first pass, "
+          f"{stats['unknown']}/{stats['judged']} ({stats['unknown'] / judged * 100:.1f}%) "
+          f"after re-asking {stats['reasked']} with {REASK_MODEL}.")
 
 def main():
     """Run a simple test of the LLM judge."""
@@ -102,6 +279,16 @@ def main():
     parser.add_argument("--limit", type=int, help="Limit evaluation to the first N responses.")
     parser.add_argument("--output-prefix", default="llm_evaluated",
                         help="Prefix for the timestamped output file and the _all.json file.")
+    parser.add_argument("--active", action="store_true",
+                        help="Judge responses in random order and stop once the pass rate is known precisely enough.")
+    parser.add_argument("--compare-file",
+                        help="With --active: responses from a second RAG configuration; stop once the "
+                             "difference in pass rates is settled.")
+    parser.add_argument("--target-width", type=float, default=TARGET_CI_WIDTH,
+                        help="With --active: stop when the 95%% interval is at most this wide.")
+    parser.add_argument("--min-samples", type=int, default=MIN_SAMPLES,
+                        help="With --active: judge at least this many responses per file before the first look.")
+    parser.add_argument("--seed", type=int, help="With --active: random seed for the judging order.")
     args = parser.parse_args()
 
     print("Loading data...")
@@ -141,49 +328,34 @@ def main():
         bad_examples = [ex for ex in examples if ex.get('judgment') == 'fail'][:1]
         print(f"Using {len(good_examples)} good and {len(bad_examples)} bad examples for few-shot.")
 
-    # Evaluate responses
-    results = []
-    total_responses_to_process = len(to_evaluate)
-    print(f"Starting evaluation of {total_responses_to_process} responses...")
-    
-    for i, item in enumerate(to_evaluate):
-        print(f"\nEvaluating response {i+1}/{total_responses_to_process}...")
-        
-        question = item['question']
-        if isinstance(item['response'], list):
-            response_text = item['response'][0]
-        else:
-            response_text = str(item['response'])
-        
-        print(f"Question: {question[:50]}...")
-        
-        # Evaluate with GPT-4
-        judgment, reason = evaluate_rag_response(
-            question, 
-            response_text, 
-            good_examples, 
-            bad_examples
+    stats = Counter()
+    if args.active:
+        configs = {'primary': to_evaluate}
+        if args.compare_file:
+            with open(args.compare_file, 'r') as f:
+                configs['compare'] = json.load(f)
+            print(f"Loaded {len(configs['compare'])} responses to compare from {args.compare_file}")
+        judged = active_evaluate(
+            configs, good_examples, bad_examples,
+            target_width=args.target_width, min_samples=args.min_samples, seed=args.seed, stats=stats
         )
+        results = judged['primary']
+    else:
+        # Evaluate responses
+        results = []
+        total_responses_to_process = len(to_evaluate)
+        print(f"Starting evaluation of {total_responses_to_process} responses...")
         
-        print(f"Judgment: {judgment}")
-        print(f"Reason: {reason[:100]}...")
-        
-        # Save result
-        item['judgment'] = judgment
-        item['reason'] = reason
-        item['evaluation_type'] = 'llm'
-        results.append(item)
-
-        # TEMPORARY: Limit to 2 evaluations for testing # <<< REMOVED THIS BLOCK
-        # if i >= 1: # i is zero-indexed, so 0 and 1 make 2 iterations
-        #     print("\\nLIMIT REACHED: Stopping after 2 evaluations for testing.")
-        #     break
-        
-        # Wait a bit between calls
-        time.sleep(1)
+        for i, item in enumerate(to_evaluate):
+            print(f"\nEvaluating response {i+1}/{total_responses_to_process}...")
+            results.append(judge_item(item, good_examples, bad_examples, stats))
+            
+            # Wait a bit between calls
+            time.sleep(1)
+    
+    report_unknown_rate(stats)
     
     # Save results to a new file with timestamp
-    from datetime import datetime
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     # Use the prefix from args for output files
     output_dir = os.path.dirname(args.input_file) # Save output in the same dir as input by default
@@ -205,6 +377,24 @@ def main():
         json.dump(results, f, indent=2)
     
     print(f"Also saved results to {all_output_filename}")
+
+    # Keep a per-run record of how often the judge failed to return a verdict
+    runs_filename = os.path.join(output_dir, f"{base_prefix}_runs.jsonl")
+    with open(runs_filename, 'a') as f:
+        f.write(json.dumps({
+            'timestamp': timestamp,
+            'input_file': args.input_file,
+            'output_file': output_filename,
+            'judge_model': JUDGE_MODEL,
+            'reask_model': REASK_MODEL,
+            **{key: stats[key] for key in ('judged', 'unknown_first_pass', 'reasked', 'unknown')},
+        }) + "\n")
+
+    if args.active and 'compare' in judged:
+        compare_filename = os.path.join(output_dir, f"{base_prefix}_compare_{timestamp}.json")
+        with open(compare_filename, 'w') as f:
+            json.dump(judged['compare'], f, indent=2)
+        print(f"Saved comparison judgments to {compare_filename}")
     print("You can view them with the JSON viewer.")
 
 if __name__ == "__main__":
@@ -1,5 +1,11 @@
 import os
+import re
 import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
 from openai import OpenAI
 from dotenv import load_dotenv
 from definitions import personas_data, scenarios_data # Import definitions
@@ -7,74 +13,318 @@ from definitions import personas_data, scenarios_data # Import definitions
 # --- Configuration ---
 # Assumes OPENAI_API_KEY is set as an environment variable OR in .env
 MODEL = "gpt-4o-mini"
+EMBEDDING_MODEL = "text-embedding-3-small"
 NUM_QUESTIONS_PER_COMBO = 2 # How many questions per pair
+SAMPLES_PER_CALL = 2 # Completions requested per API call (n); extra candidates feed deduplication
+MAX_WORKERS = 8 # Persona/scenario pairs generated concurrently
+DEDUP_THRESHOLD = 0.92 # Cosine similarity above which two questions count as duplicates
+EMBEDDING_BATCH_SIZE = 1000 # Inputs per embeddings request
 BASE_PATH = os.path.dirname(__file__) # Directory of this script (scratch)
 OUTPUT_DATA_PATH = os.path.join(BASE_PATH, 'data') # Subdirectory for output
-
-# --- Load .env file (should be in project root, one level up) ---
-dotenv_path = os.path.join(BASE_PATH, os.path.pardir, '.env') # Go up ONE directory
-if os.path.exists(dotenv_path):
-    print(f"Loading environment variables from: {dotenv_path}")
-    load_dotenv(dotenv_path=dotenv_path)
-else:
-    print(f"Warning: .env file not found at {dotenv_path}. Relying on environment variables.")
+CANDIDATES_PATH = os.path.join(OUTPUT_DATA_PATH, 'questions.jsonl') # Streamed candidates, one per line
+CHECKPOINT_PATH = os.path.join(OUTPUT_DATA_PATH, 'questions.checkpoint.jsonl') # One line per finished pair
 
 # --- Use Imported Definitions (No longer hardcoded here) ---
 # personas_data and scenarios_data are imported from definitions.py
 
 workshop_topic = "Building Reliable LLM Applications (RAG, evaluation, synthetic data, SDLC, prompt engineering, observability, tools like LlamaIndex/Gradio)"
 
-# --- Ensure output directory exists (needed for questions.json) ---
-os.makedirs(OUTPUT_DATA_PATH, exist_ok=True)
-
-# --- Generate Questions ---
-print("Initializing OpenAI client...")
-# OpenAI client now correctly reads from env vars loaded by dotenv or system env vars
-client = OpenAI() 
-generated_questions = []
-print("Generating questions using imported definitions...")
-
-for p_name, p_data in personas_data.items(): # Use imported data
-    p_desc = p_data['description'] 
-    for s_name, s_data in scenarios_data.items(): # Use imported data
-        s_desc = s_data['description']
-        print(f"- Generating: {p_name}/{s_name}")
-        prompt = (
-            f"Workshop Topic: {workshop_topic}\n"
-            f"Persona: {p_name} ({p_desc})\n"
-            f"Scenario: {s_name} ({s_desc})\n"
-            f"Generate {NUM_QUESTIONS_PER_COMBO} distinct questions this user might ask. "
-            f"List one question per line, no numbering/bullets."
-        )
-        # No error handling for API call
-        completion = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": "Generate realistic user questions about a workshop based on persona/scenario.",},
-                {"role": "user", "content": prompt}
-            ],
-            n=1, temperature=0.8
-        )
-        response_lines = completion.choices[0].message.content.strip().split('\n')
-        
-        count = 0
-        for line in response_lines:
-            if line.strip() and count < NUM_QUESTIONS_PER_COMBO:
-                generated_questions.append({
-                    "id": f"synth_{p_name}_{s_name}_{count+1}",
-                    "question": line.strip(),
-                    "user_type": p_name, 
-                    "scenario": s_name
-                })
-                count += 1
-        print(f"  -> Got {count} questions.")
-
-# --- Save Generated Questions ---
-# Note: Saving personas.json and scenarios.json is now handled by definitions.py when run directly
-output_path = os.path.join(OUTPUT_DATA_PATH, 'questions.json') 
-print(f"Saving {len(generated_questions)} questions to {output_path}...")
-# No error handling for file save
-with open(output_path, 'w') as f:
-    json.dump(generated_questions, f, indent=2)
-
-print("Finished.") 
\ No newline at end of file
+# Models sometimes number or bullet lines even when asked not to
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+def build_prompt(p_name, p_desc, s_name, s_desc, num_questions):
+    return (
+        f"Workshop Topic: {workshop_topic}\n"
+        f"Persona: {p_name} ({p_desc})\n"
+        f"Scenario: {s_name} ({s_desc})\n"
+        f"Generate {num_questions} distinct questions this user might ask. "
+        f"List one question per line, no numbering/bullets."
+    )
+
+
+def generate_for_combo(client, p_name, s_name, num_questions, n):
+    """Ask for `num_questions` questions `n` times in one call; returns all candidate lines."""
+    prompt = build_prompt(
+        p_name, personas_data[p_name]['description'],
+        s_name, scenarios_data[s_name]['description'],
+        num_questions,
+    )
+    completion = client.chat.completions.create(
+        model=MODEL,
+        messages=[
+            {"role": "system", "content": "Generate realistic user questions about a workshop based on persona/scenario.",},
+            {"role": "user", "content": prompt}
+        ],
+        n=n, temperature=0.8
+    )
+    candidates = []
+    for choice in completion.choices:
+        for line in (choice.message.content or "").strip().split('\n'):
+            line = _LIST_MARKER.sub("", line).strip()
+            if line:
+                candidates.append(line)
+    return candidates
+
+
+def all_combos():
+    return [(p_name, s_name) for p_name in personas_data for s_name in scenarios_data]
+
+
+def load_checkpoint(checkpoint_path=CHECKPOINT_PATH):
+    """Return the set of (persona, scenario) pairs whose candidates are fully written."""
+    done = set()
+    if not os.path.exists(checkpoint_path):
+        return done
+    with open(checkpoint_path, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue # Torn final line from an interrupted run
+            done.add((entry['user_type'], entry['scenario']))
+    return done
+
+
+def read_candidates(done, candidates_path=CANDIDATES_PATH):
+    """Read streamed candidates for checkpointed pairs, in definition order."""
+    candidates = {combo: [] for combo in all_combos() if combo in done}
+    if not os.path.exists(candidates_path):
+        return candidates
+    with open(candidates_path, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            combo = (entry['user_type'], entry['scenario'])
+            if combo in candidates:
+                candidates[combo].append(entry['question'])
+    return candidates
+
+
+def drop_partial_candidates(done, candidates_path=CANDIDATES_PATH):
+    """Remove lines left behind by pairs that never reached their checkpoint."""
+    if not os.path.exists(candidates_path):
+        return 0
+    with open(candidates_path, 'r') as f:
+        lines = f.readlines()
+    kept = []
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if (entry['user_type'], entry['scenario']) in done:
+            kept.append(line)
+    if len(kept) != len(lines):
+        with open(candidates_path, 'w') as f:
+            f.writelines(kept)
+    return len(lines) - len(kept)
+
+
+def _append_lines(path, entries):
+    # Start on a fresh line if an interrupted run left a torn last line
+    needs_newline = False
+    if os.path.exists(path) and os.path.getsize(path) > 0:
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b"\n"
+    with open(path, 'a') as f:
+        if needs_newline:
+            f.write("\n")
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def stream_candidates(client, combos, num_questions, n, max_workers,
+                      candidates_path=CANDIDATES_PATH, checkpoint_path=CHECKPOINT_PATH):
+    """Generate candidates for `combos` concurrently, appending each pair to disk as it completes.
+
+    A pair's candidates are written before its checkpoint line, so a pair is
+    only treated as done once everything it produced is on disk. Returns
+    (failed pairs, candidates written by this call); re-running picks the
+    failed pairs up.
+    """
+    failed = []
+    written = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(generate_for_combo, client, p_name, s_name, num_questions, n): (p_name, s_name)
+            for p_name, s_name in combos
+        }
+        # Only this thread writes to the files, so no locking is needed
+        for future in as_completed(futures):
+            p_name, s_name = futures[future]
+            try:
+                questions = future.result()
+            except Exception as e:
+                print(f"- Failed: {p_name}/{s_name}: {e}")
+                failed.append((p_name, s_name))
+                continue
+            _append_lines(candidates_path, [
+                {"user_type": p_name, "scenario": s_name, "question": question}
+                for question in questions
+            ])
+            _append_lines(checkpoint_path, [
+                {"user_type": p_name, "scenario": s_name, "candidates": len(questions)}
+            ])
+            written += len(questions)
+            print(f"- Generated: {p_name}/{s_name} -> {len(questions)} candidates")
+    return failed, written
+
+
+def embed(client, texts, batch_size=EMBEDDING_BATCH_SIZE):
+    """Embed texts in batches; returns an (n, d) array of unit-normalised rows."""
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        response = client.embeddings.create(model=EMBEDDING_MODEL, input=texts[start:start + batch_size])
+        vectors.extend(item.embedding for item in response.data)
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def find_duplicates(embeddings, threshold=DEDUP_THRESHOLD, block_size=2048):
+    """Flag rows that are near-duplicates of an earlier row.
+
+    Row j is a duplicate if cosine(i, j) >= threshold for some i < j. The
+    similarity matrix is computed block by block so memory stays at
+    O(n * block_size) for large runs.
+    """
+    n = embeddings.shape[0]
+    duplicate = np.zeros(n, dtype=bool)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        # Similarities of this block of columns against every earlier-or-equal row
+        sims = embeddings[:stop] @ embeddings[start:stop].T
+        earlier = np.arange(stop)[:, None] < np.arange(start, stop)[None, :]
+        duplicate[start:stop] = ((sims >= threshold) & earlier).any(axis=0)
+    return duplicate
+
+
+def select_questions(client, candidates, num_questions, threshold=DEDUP_THRESHOLD):
+    """Drop exact and near-duplicate candidates, then keep up to `num_questions` per pair.
+
+    Duplicates are only looked for within a persona/scenario pair, so similar
+    questions from different pairs both keep their persona-specific phrasing.
+    """
+    flat = []
+    for (p_name, s_name), questions in candidates.items():
+        seen = set()
+        for question in questions:
+            key = question.casefold()
+            if key not in seen:
+                seen.add(key)
+                flat.append((p_name, s_name, question))
+    if not flat:
+        return []
+
+    # One embedding pass for every pair, then near-duplicates within each pair
+    embeddings = embed(client, [q for _, _, q in flat])
+    rows_by_pair = {}
+    for i, (p_name, s_name, _) in enumerate(flat):
+        rows_by_pair.setdefault((p_name, s_name), []).append(i)
+    duplicate = np.zeros(len(flat), dtype=bool)
+    for rows in rows_by_pair.values():
+        duplicate[rows] = find_duplicates(embeddings[rows], threshold)
+    print(f"Removed {int(duplicate.sum())} near-duplicate questions (threshold {threshold}).")
+
+    generated_questions = []
+    counts = {}
+    for (p_name, s_name, question), is_duplicate in zip(flat, duplicate):
+        count = counts.get((p_name, s_name), 0)
+        if is_duplicate or count >= num_questions:
+            continue
+        generated_questions.append({
+            "id": f"synth_{p_name}_{s_name}_{count+1}",
+            "question": question,
+            "user_type": p_name,
+            "scenario": s_name
+        })
+        counts[(p_name, s_name)] = count + 1
+    short = [(pair, counts.get(pair, 0)) for pair in candidates if counts.get(pair, 0) < num_questions]
+    for (p_name, s_name), count in short:
+        print(f"- Short: {p_name}/{s_name} has {count} of {num_questions} questions after deduplication")
+    return generated_questions
+
+
+def compact(client, num_questions, threshold=DEDUP_THRESHOLD, output_path=None):
+    """Deduplicate the streamed candidates and write questions.json for existing consumers."""
+    output_path = output_path or os.path.join(OUTPUT_DATA_PATH, 'questions.json')
+    candidates = read_candidates(load_checkpoint())
+    generated_questions = select_questions(client, candidates, num_questions, threshold)
+    print(f"Saving {len(generated_questions)} questions to {output_path}...")
+    with open(output_path, 'w') as f:
+        json.dump(generated_questions, f, indent=2)
+    return generated_questions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic questions for every persona/scenario pair.")
+    parser.add_argument("--questions-per-combo", type=int, default=NUM_QUESTIONS_PER_COMBO,
+                        help="Questions to keep per persona/scenario pair.")
+    parser.add_argument("--n", type=int, default=SAMPLES_PER_CALL,
+                        help="Completions per API call; each one proposes --questions-per-combo questions.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Concurrent API calls.")
+    parser.add_argument("--dedup-threshold", type=float, default=DEDUP_THRESHOLD,
+                        help="Cosine similarity at or above which questions are treated as duplicates.")
+    parser.add_argument("--fresh", action="store_true",
+                        help="Discard streamed candidates and checkpoints from previous runs.")
+    parser.add_argument("--compact-only", action="store_true",
+                        help="Skip generation and rebuild questions.json from the streamed candidates.")
+    args = parser.parse_args()
+
+    # --- Load .env file (should be in project root, one level up) ---
+    dotenv_path = os.path.join(BASE_PATH, os.path.pardir, '.env') # Go up ONE directory
+    if os.path.exists(dotenv_path):
+        print(f"Loading environment variables from: {dotenv_path}")
+        load_dotenv(dotenv_path=dotenv_path)
+    else:
+        print(f"Warning: .env file not found at {dotenv_path}. Relying on environment variables.")
+
+    # --- Ensure output directory exists (needed for questions.json) ---
+    os.makedirs(OUTPUT_DATA_PATH, exist_ok=True)
+
+    # --- Generate Questions ---
+    print("Initializing OpenAI client...")
+    # OpenAI client now correctly reads from env vars loaded by dotenv or system env vars
+    client = OpenAI()
+
+    if not args.compact_only:
+        if args.fresh:
+            for path in (CANDIDATES_PATH, CHECKPOINT_PATH):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        # --- Resume: only generate pairs without a checkpoint ---
+        done = load_checkpoint()
+        dropped = drop_partial_candidates(done)
+        if dropped:
+            print(f"Dropped {dropped} candidates from unfinished pairs of a previous run.")
+        todo = [combo for combo in all_combos() if combo not in done]
+        if done:
+            print(f"Resuming: {len(done)} pairs already done, {len(todo)} to go.")
+
+        print("Generating questions using imported definitions...")
+        start = time.perf_counter()
+        failed, generated = stream_candidates(client, todo, args.questions_per_combo, args.n, args.workers)
+        elapsed = time.perf_counter() - start
+        # Only this run's candidates, so a resumed run doesn't overstate its rate
+        print(f"Streamed {generated} candidates to {CANDIDATES_PATH} in {elapsed:.1f}s "
+              f"({generated / max(elapsed, 1e-9):.1f} questions/sec).")
+        if failed:
+            print(f"{len(failed)} pairs failed; re-run the script to resume them. Skipping compaction.")
+            return
+
+    # --- Compact streamed candidates into questions.json ---
+    # Note: Saving personas.json and scenarios.json is now handled by definitions.py when run directly
+    compact(client, args.questions_per_combo, args.dedup_threshold)
+
+    print("Finished.")
+
+
+if __name__ == "__main__":
+    main()